@@ -1,33 +1,146 @@
 from functools import lru_cache
 from app.core.config import settings
-from app.infra.qdrant_client import QdrantManager
+from app.infra.qdrant_client import QdrantClientRegistry, QdrantManager
+from app.infra.qdrant_tenants import shared_collection
+from app.infra.qdrant_versions import CollectionVersions
 from app.infra.repos_client import ReposServiceClient
 from app.infra.treesitter_client import TreeSitterManager
+from app.pipeline.chunk_store import ChunkStore
 from app.pipeline.embedder import Embedder
+from app.pipeline.embedding_cache import EmbeddingCache
+from app.pipeline.planner import PlanPool
+from app.pipeline.symbol_index import SymbolIndex
 from app.services.ingest_service import IngestService
+from app.services.search_cache import SearchCache
+from app.services.single_flight import SingleFlight
 from app.infra.git_client import GitClient
+from app.infra.mirror_cache import MirrorCache
 
 
 @lru_cache
 def get_treesitter() -> TreeSitterManager:
     return TreeSitterManager()
 
+@lru_cache
+def get_embedding_cache() -> EmbeddingCache | None:
+    if not settings.embed_cache_path:
+        return None
+    return EmbeddingCache(
+        path=settings.embed_cache_path,
+        max_bytes=settings.embed_cache_max_mb * 1024 * 1024,
+        dtype=settings.embed_cache_dtype,
+    )
+
+@lru_cache
+def get_chunk_store() -> ChunkStore | None:
+    if not settings.chunk_store_path:
+        return None
+    return ChunkStore(settings.chunk_store_path, prune_grace_s=settings.chunk_store_prune_grace_s)
+
+@lru_cache
+def get_symbol_index() -> SymbolIndex | None:
+    if not settings.symbol_index_path:
+        return None
+    return SymbolIndex(settings.symbol_index_path)
+
 @lru_cache
 def get_embedder() -> Embedder:
     # heavy init once per process
-    return Embedder(model_name=settings.jina_model)
+    return Embedder(
+        model_name=settings.jina_model,
+        cache=get_embedding_cache(),
+        batching=settings.embed_scheduler,
+        max_batch=settings.embed_scheduler_max_batch,
+        batch_window_ms=settings.embed_scheduler_window_ms,
+    )
+
+@lru_cache
+def get_plan_pool() -> PlanPool | None:
+    if settings.parse_processes <= 0:
+        return None
+    return PlanPool(workers=settings.parse_processes, model_name=settings.jina_model)
+
+@lru_cache
+def get_search_cache() -> SearchCache | None:
+    if not settings.search_cache:
+        return None
+    return SearchCache(
+        vector_max_entries=settings.query_vector_cache_size,
+        result_max_entries=settings.search_result_cache_size,
+        result_ttl_s=settings.search_result_ttl_s,
+        # re-indexes by durable workers are only visible as a new collection version;
+        # collections they update in place give cached results no way to notice
+        cache_results=use_collection_versions() or settings.job_queue == "local",
+        version_ttl_s=settings.search_version_ttl_s,
+    )
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    # one per process: IngestService instances are created per request
+    return SingleFlight()
+
+@lru_cache
+def get_qdrant_registry() -> QdrantClientRegistry:
+    return QdrantClientRegistry(
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        grpc_port=settings.qdrant_grpc_port,
+        pool_size=settings.qdrant_pool_size,
+        keepalive_s=settings.qdrant_keepalive_s,
+    )
 
 def get_qdrant(collection_name: str) -> QdrantManager:
+    # managers are per collection/job, the underlying clients are shared
+    url = str(settings.qdrant_url)
+    registry = get_qdrant_registry()
+    tenant = None
+    if settings.collection_mode == "shared":
+        # the logical collection (repository slug) becomes a tenant of a shared collection
+        tenant = collection_name
+        collection_name = shared_collection(tenant, settings.shared_collection, settings.shared_collection_shards)
     return QdrantManager(
-        url=str(settings.qdrant_url),
+        url=url,
         api_key=settings.qdrant_api_key,
         collection_name=collection_name,
+        tenant=tenant,
         batch_size=settings.qdrant_batch_size,
+        client=registry.get(url, settings.qdrant_api_key),
+        async_client=registry.get_async(url, settings.qdrant_api_key),
+        upload_workers=settings.qdrant_upload_workers,
+        max_in_flight=settings.qdrant_upload_in_flight,
+        max_retries=settings.qdrant_upload_retries,
+        profile=settings.get_collection_profile(),
+    )
+
+def use_collection_versions() -> bool:
+    # shared collections hold many repositories: they are updated in place
+    return settings.collection_versions and settings.collection_mode == "per_repo"
+
+def get_collection_versions(alias: str) -> CollectionVersions:
+    url = str(settings.qdrant_url)
+    return CollectionVersions(
+        client=get_qdrant_registry().get(url, settings.qdrant_api_key),
+        alias=alias,
+        grace_s=settings.collection_gc_grace_s,
+        stale_build_s=settings.collection_stale_build_s,
+    )
+
+@lru_cache
+def get_mirror_cache() -> MirrorCache | None:
+    if not settings.git_mirror_dir:
+        return None
+    return MirrorCache(
+        root=settings.git_mirror_dir,
+        max_bytes=int(settings.git_mirror_max_gb * 1024 ** 3),
+        fetch_ttl_s=settings.git_mirror_fetch_ttl_s,
     )
 
 @lru_cache
 def get_git_client() -> GitClient:
-    return GitClient()
+    return GitClient(
+        fast_clone=settings.git_fast_clone,
+        mirror_cache=get_mirror_cache(),
+        source=settings.source_mode,
+    )
 
 @lru_cache
 def get_repos_client() -> ReposServiceClient:
@@ -39,5 +152,11 @@ def get_ingest_service() -> IngestService:
         treesitter=get_treesitter(),
         embedder=get_embedder(),
         qdrant_factory=get_qdrant,
+        versions_factory=get_collection_versions if use_collection_versions() else None,
         repos_client=get_repos_client(),
+        plan_pool=get_plan_pool(),
+        search_cache=get_search_cache(),
+        chunk_store=get_chunk_store(),
+        symbol_index=get_symbol_index(),
+        single_flight=get_single_flight() if settings.ingest_coalescing else None,
     )
@@ -5,6 +5,8 @@ class RepoIngestRequest(BaseModel):
     branch: str | None = None
     # MVP: пока нет auth middleware — передаём user_id в теле
     user_id: int
+    # re-index every file even when the previously indexed commit is known
+    full: bool = False
 
 class RepoIngestResponse(BaseModel):
     repo: str
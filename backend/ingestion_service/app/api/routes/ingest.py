@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
 
 from app.api.models import RepoIngestRequest, RepoIngestResponse
+from app.core.config import settings
 from app.services.ingest_service import IngestService
 from app.api.deps import get_ingest_service
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
+# a plain def: FastAPI runs it in the threadpool, so `git ls-remote` and the blocking
+# repos_service / Qdrant calls below never stall the event loop serving /rag/search
 @router.post("/repo", response_model=RepoIngestResponse, status_code=202)
-async def ingest_repo(
+def ingest_repo(
     payload: RepoIngestRequest,
     background_tasks: BackgroundTasks,
     service: IngestService = Depends(get_ingest_service),
@@ -16,8 +19,23 @@ async def ingest_repo(
         # 1) быстро создаём job/state и возвращаем id
         job = service.create_ingest_job(payload)
 
-        # 2) fire-and-forget (в фоне, уже после отдачи ответа)
-        background_tasks.add_task(service.run_ingest_job, job)
+        # the shared collection already holds this commit: nothing to run
+        reused = service.reuse_indexed(job)
+        if reused is not None:
+            return RepoIngestResponse(
+                repo=job.repo_url,
+                vectors_upserted=reused["vectors_upserted"],
+                repository_id=job.repository_id,
+                repo_index_state_id=job.state_id,
+                status="done",
+            )
+
+        # 2) durable queue: any ingestion worker picks the job up;
+        #    local: fire-and-forget (в фоне, уже после отдачи ответа)
+        if settings.job_queue == "durable":
+            service.enqueue_ingest_job(job)
+        else:
+            background_tasks.add_task(service.run_ingest_job, job)
 
         return RepoIngestResponse(
             repo=job.repo_url,
@@ -28,3 +46,27 @@ async def ingest_repo(
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/collections/{collection}/stats")
+def collection_stats(
+    collection: str,
+    service: IngestService = Depends(get_ingest_service),
+) -> dict:
+    try:
+        return service.index_stats(collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/collections/{collection}", status_code=204)
+def delete_collection(
+    collection: str,
+    service: IngestService = Depends(get_ingest_service),
+) -> Response:
+    # the repository's index states in repos_service are left to the caller
+    try:
+        service.delete_index(collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(status_code=204)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+
+from app.api.deps import get_embedder, get_embedding_cache, get_search_cache, get_single_flight, get_symbol_index
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def metrics() -> dict:
+    embedder = get_embedder()
+    embedding_cache = get_embedding_cache()
+    cache = get_search_cache()
+    symbols = get_symbol_index()
+    return {
+        "embedding_scheduler": embedder.scheduler.stats() if embedder.scheduler else None,
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "search_cache": cache.stats() if cache is not None else None,
+        "symbol_index": symbols.stats() if symbols is not None else None,
+        "ingest_single_flight": get_single_flight().stats(),
+    }
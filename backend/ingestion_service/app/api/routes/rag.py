@@ -1,7 +1,20 @@
-from fastapi import APIRouter, Depends
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 
-from app.api.deps import get_embedder, get_qdrant
+from app.api.deps import (
+    get_chunk_store,
+    get_collection_versions,
+    get_embedder,
+    get_qdrant,
+    get_search_cache,
+    get_symbol_index,
+    use_collection_versions,
+)
+from app.core.config import settings
+from app.pipeline.symbol_index import query_identifiers
+from app.services.rag_postprocess import cutoff, dedupe_bodies, merge_windows
 
 router = APIRouter(prefix="/rag", tags=["rag"])
 
@@ -9,6 +22,9 @@ class RagSearchRequest(BaseModel):
     collection: str
     query: str = Field(min_length=1, max_length=50_000)
     top_k: int = Field(default=8, ge=1, le=50)
+    # tail cutoffs; defaults come from settings
+    score_gap: float | None = Field(default=None, ge=0)
+    token_budget: int | None = Field(default=None, ge=1)
 
 class RagChunk(BaseModel):
     score: float
@@ -24,27 +40,99 @@ class RagChunk(BaseModel):
 class RagSearchResponse(BaseModel):
     chunks: list[RagChunk]
 
+async def _hydrate_bodies(payloads: list[dict]) -> list[str]:
+    """Bodies of the hits: inline `body`, or one batched chunk store read for offset-only points."""
+    bodies = [p.get("body") for p in payloads]
+    external = [i for i, p in enumerate(payloads) if bodies[i] is None and "file_hash" in p]
+    store = get_chunk_store()
+    if external and store is not None:
+        spans = [(payloads[i]["file_hash"], payloads[i]["body_start"], payloads[i]["body_end"]) for i in external]
+        for i, body in zip(external, await asyncio.to_thread(store.read_many, spans)):
+            bodies[i] = body
+    return [b or "" for b in bodies]
+
+async def _symbol_hits(payload: RagSearchRequest, qdrant) -> list[tuple[float, dict]]:
+    """(score, point payload) of exact/prefix symbol matches; [] when the query names no known symbol."""
+    index = get_symbol_index()
+    identifiers = query_identifiers(payload.query) if index is not None else []
+    if not identifiers:
+        return []
+    try:
+        table = await asyncio.to_thread(index.get, payload.collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if table is None:
+        return []
+    matches = table.search(identifiers, payload.top_k, settings.symbol_prefix_min_len)
+    if not matches:
+        return []
+    points = await qdrant.aretrieve([(s.file_hash, s.chunk_index) for _, s in matches])
+    return [(score, p.payload or {}) for (score, _), p in zip(matches, points) if p is not None]
+
+async def _collection_version(collection: str, cache) -> str | None:
+    """Physical collection behind the alias: changes whenever any process re-indexes it."""
+    if not use_collection_versions():
+        return None
+    version = cache.get_version(collection)
+    if version is None:
+        version = await asyncio.to_thread(get_collection_versions(collection).current)
+        if version is not None:
+            cache.put_version(collection, version)
+    return version
+
 @router.post("/search", response_model=RagSearchResponse)
-def rag_search(payload: RagSearchRequest) -> RagSearchResponse:
-    embedder = get_embedder()
+async def rag_search(payload: RagSearchRequest) -> RagSearchResponse:
+    score_gap = payload.score_gap if payload.score_gap is not None else settings.rag_score_gap
+    token_budget = payload.token_budget if payload.token_budget is not None else settings.rag_token_budget
+    cache_filters = (score_gap, token_budget)
+
+    cache = get_search_cache()
+    result_key = None
+    if cache is not None and cache.cache_results:
+        version = await _collection_version(payload.collection, cache)
+        result_key = cache.result_key(payload.collection, payload.query, payload.top_k, cache_filters, version)
+        cached = cache.get_results(result_key)
+        if cached is not None:
+            return RagSearchResponse(chunks=list(cached))
+
     qdrant = get_qdrant(payload.collection)
 
-    # ВАЖНО: query prompt (парный к document)
-    vec = embedder.encode([payload.query], prompt_name="code2code_query")[0].astype(float).tolist()
-    hits = qdrant.search(vec, limit=payload.top_k)
+    # identifier lookups ("where is `NewServer` defined") are answered from the symbol
+    # table; the encoder and ANN search run only when no symbol matches
+    scored = await _symbol_hits(payload, qdrant)
+    if not scored:
+        embedder = get_embedder()
+        # ВАЖНО: query prompt (парный к document)
+        vec = cache.get_vector(payload.query, "code2code_query") if cache is not None else None
+        if vec is None:
+            vec = (await embedder.aencode([payload.query], prompt_name="code2code_query"))[0].astype(float).tolist()
+            if cache is not None:
+                cache.put_vector(payload.query, "code2code_query", vec)
+        hits = await qdrant.asearch(vec, limit=payload.top_k)
+        scored = [(float(h.score), h.payload or {}) for h in hits]
+
+    if settings.rag_merge_windows:
+        scored = merge_windows(scored)
+    payloads = [p for _, p in scored]
+    bodies = await _hydrate_bodies(payloads)
+    hits = [(score, p, body) for (score, p), body in zip(scored, bodies)]
+    if settings.rag_dedupe:
+        hits = dedupe_bodies(hits)
+    hits = cutoff(hits, score_gap, token_budget, settings.rag_chars_per_token)
 
     chunks: list[RagChunk] = []
-    for h in hits:
-        p = h.payload or {}
+    for score, p, body in hits:
         chunks.append(RagChunk(
-            score=float(h.score),
+            score=score,
             file_path=p.get("file_path"),
             language=p.get("language"),
-            body=p.get("body", ""),
+            body=body,
             chunk_index=p.get("chunk_index"),
             start_code_line=p.get("start_code_line"),
             end_code_line=p.get("end_code_line"),
             name=p.get("name"),
             kind=p.get("kind"),
         ))
+    if cache is not None:
+        cache.put_results(result_key, tuple(chunks))
     return RagSearchResponse(chunks=chunks)
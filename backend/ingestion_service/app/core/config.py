@@ -1,5 +1,60 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import AnyUrl
+from pydantic import AnyUrl, BaseModel
+
+
+class CollectionProfile(BaseModel):
+    """How a Qdrant collection is stored and searched (see QdrantManager)."""
+
+    # storage
+    vectors_on_disk: bool = False
+    on_disk_payload: bool = False
+    quantization: Literal["none", "scalar", "binary"] = "none"
+    quantization_always_ram: bool = True
+    hnsw_m: int | None = None
+    hnsw_ef_construct: int | None = None
+    hnsw_on_disk: bool = False
+    # field -> keyword | integer | text ...
+    payload_indexes: dict[str, str] = {
+        "file_path": "keyword",
+        "language": "keyword",
+        "kind": "keyword",
+        "name": "keyword",
+    }
+
+    # search
+    hnsw_ef: int | None = None
+    rescore: bool = True
+    oversampling: float | None = None
+    # brute-force search for collections with fewer points (0 = never)
+    exact_search_below: int = 10_000
+
+
+DEFAULT_COLLECTION_PROFILES: dict[str, CollectionProfile] = {
+    # Qdrant defaults: full-precision vectors and payload in RAM
+    "default": CollectionProfile(),
+    # int8 vectors in RAM, originals and payload on disk; ~4x less vector RAM
+    "compact": CollectionProfile(
+        vectors_on_disk=True,
+        on_disk_payload=True,
+        quantization="scalar",
+        hnsw_m=16,
+        hnsw_ef_construct=100,
+        hnsw_ef=128,
+        oversampling=2.0,
+    ),
+    # 1 bit per dimension in RAM; rescoring with the on-disk originals restores precision
+    "binary": CollectionProfile(
+        vectors_on_disk=True,
+        on_disk_payload=True,
+        quantization="binary",
+        hnsw_m=16,
+        hnsw_ef_construct=100,
+        hnsw_ef=128,
+        oversampling=3.0,
+    ),
+}
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_prefix="INGEST_", extra="ignore")
@@ -10,6 +65,11 @@ class Settings(BaseSettings):
 
     qdrant_url: AnyUrl = "http://172.17.0.1:6333"
     qdrant_api_key: str | None = None
+    # shared, pooled Qdrant clients (see QdrantClientRegistry)
+    qdrant_prefer_grpc: bool = False
+    qdrant_grpc_port: int = 6334
+    qdrant_pool_size: int = 32
+    qdrant_keepalive_s: float = 60.0
 
     jina_model: str = "jinaai/jina-code-embeddings-0.5b"
 
@@ -17,8 +77,110 @@ class Settings(BaseSettings):
     overlap: int = 64
     vector_size: int = 896
     qdrant_batch_size: int = 64
+    # named storage/search profiles for collections and the one used for new collections
+    collection_profiles: dict[str, CollectionProfile] = DEFAULT_COLLECTION_PROFILES
+    collection_profile: str = "default"
+    # blue/green ingest: a full run builds a new `<collection>__v<ms>` version and switches the
+    # alias `<collection>` to it when complete (incremental runs patch the live version in
+    # place); replaced versions are deleted after the grace period
+    collection_versions: bool = True
+    collection_gc_grace_s: float = 3600.0
+    collection_stale_build_s: float = 86400.0
+    # "per_repo": a collection per repository slug; "shared": every repository in
+    # `shared_collection` (or `shared_collection_shards` collections `<name>_<i>`),
+    # partitioned by a tenant payload key. Shared collections are updated in place
+    # (no versions). Moving per-repo collections in: python -m app.tenants migrate
+    collection_mode: Literal["per_repo", "shared"] = "per_repo"
+    shared_collection: str = "code_chunks"
+    shared_collection_shards: int = 1
+    # background uploader: parallel wait=False upserts, bounded in-flight batches, retries
+    qdrant_upload_workers: int = 4
+    qdrant_upload_in_flight: int = 8
+    qdrant_upload_retries: int = 3
+
+    # shallow, blob-filtered, sparse clones
+    git_fast_clone: bool = True
+    # "worktree": check out files and walk them; "git_objects": stream blobs via `git cat-file`
+    source_mode: str = "worktree"
+    # persistent bare-mirror cache with delta fetch (disabled when dir is not set)
+    git_mirror_dir: str | None = None
+    git_mirror_max_gb: float = 20.0
+    git_mirror_fetch_ttl_s: float = 30.0
+
+    # persistent content-addressed embedding cache (disabled when path is not set)
+    embed_cache_path: str | None = None
+    embed_cache_max_mb: int = 2048
+    embed_cache_dtype: str = "float16"
+
+    # content-addressed store of file contents; points then carry body offsets instead of
+    # bodies (disabled when path is not set). Must be shared by ingest workers and the API.
+    chunk_store_path: str | None = None
+    # records no collection refers to any more are deleted once older than this
+    chunk_store_prune_grace_s: float = 86400.0
+
+    # per-collection symbol tables (disabled when path is not set): /rag/search answers
+    # identifier queries from them without running the encoder
+    symbol_index_path: str | None = None
+    symbol_prefix_min_len: int = 3
+
+    # cross-file embedding batches: chunks are grouped by token length
+    embed_batch_size: int = 32
+    embed_bucket_width: int = 64
+
+    # in-process embedding scheduler: concurrent requests are micro-batched, queries first
+    embed_scheduler: bool = True
+    embed_scheduler_max_batch: int = 64
+    embed_scheduler_window_ms: float = 5.0
+
+    # /rag/search cache: query text -> vector (LRU), and search results (LRU + TTL)
+    search_cache: bool = True
+    query_vector_cache_size: int = 4096
+    search_result_cache_size: int = 1024
+    search_result_ttl_s: float = 300.0
+    # how long the physical collection behind an alias is memoized for result cache keys
+    search_version_ttl_s: float = 2.0
+
+    # /rag/search post-processing: merge consecutive windows of an entity, drop duplicate
+    # bodies, and optionally trim the tail by score gap or by a token budget (per-request
+    # values override these)
+    rag_merge_windows: bool = True
+    rag_dedupe: bool = True
+    rag_score_gap: float | None = None
+    rag_token_budget: int | None = None
+    rag_chars_per_token: float = 4.0
+
+    # staged ingest pipeline: planner threads and bounded queue sizes (backpressure)
+    parse_workers: int = 4
+    pipeline_queue_size: int = 64
+    upload_queue_size: int = 8
+    # >0: parse and chunk-plan files in a pool of this many worker processes
+    parse_processes: int = 0
+
+    # "local": run jobs in the API process (BackgroundTasks);
+    # "durable": enqueue into repos_service, jobs are run by `python -m app.worker`
+    job_queue: str = "local"
+    worker_id: str | None = None  # defaults to <hostname>-<pid>
+    worker_concurrency: int = 1
+    job_lease_s: int = 120
+    job_heartbeat_s: float = 30.0
+    job_poll_s: float = 2.0
+
+    # single flight: ingests of the same (slug, branch, commit) run once; requests for a
+    # commit that is already indexed reuse the collection. The commit is resolved with
+    # `git ls-remote` when the request arrives.
+    ingest_coalescing: bool = True
+    git_ls_remote_timeout_s: float = 15.0
+
+    # durable jobs: seconds between checkpoints (upload barrier + completed files recorded)
+    checkpoint_interval_s: float = 30.0
 
     host: str = "127.0.0.1"
     port: int = 8000
 
+    def get_collection_profile(self) -> CollectionProfile:
+        try:
+            return self.collection_profiles[self.collection_profile]
+        except KeyError:
+            raise ValueError(f"unknown collection profile {self.collection_profile!r}") from None
+
 settings = Settings()
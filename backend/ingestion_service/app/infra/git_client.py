@@ -1,9 +1,20 @@
+import logging
 import tempfile
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
+from shutil import rmtree
+from typing import AbstractSet, Callable, Iterator, Optional
 
 from git import Repo
 
+from app.infra.git_objects import diff_name_status, ensure_commit, remote_commit, resolve_commit
+from app.infra.mirror_cache import MirrorCache
+from app.pipeline.sources import SourceFile, iterate_git_blobs, iterate_worktree_files
+from app.pipeline.traversal import is_indexable_path, sparse_checkout_patterns
+
+logger = logging.getLogger(__name__)
+
 
 class RepoCloneError(RuntimeError):
     pass
@@ -14,20 +25,163 @@ class CloneResult:
     path: Path
 
 
+@dataclass(frozen=True)
+class ChangeSet:
+    """Indexable paths that differ between an indexed commit and a checkout."""
+
+    base: str
+    # added or modified: indexed again
+    changed: frozenset[str]
+    # modified or deleted: their old points are deleted first
+    removed: frozenset[str]
+
+
+class RepoCheckout(ABC):
+    """One revision of a repository, ready to be indexed. Must be closed after use."""
+
+    def __init__(self, git_dir: Path, commit: str, on_close: Callable[[], None]):
+        self.git_dir = git_dir
+        self.commit = commit
+        self._on_close = on_close
+
+    @abstractmethod
+    def files(self, only: Optional[AbstractSet[str]] = None) -> Iterator[SourceFile]:
+        """Indexable files of the revision (only those in `only`, when given)."""
+
+    def changes_since(self, base: str) -> ChangeSet | None:
+        """Diff against a previously indexed commit; None when `base` is not available."""
+        if not ensure_commit(self.git_dir, base):
+            return None
+        changed, removed = set(), set()
+        for status, path in diff_name_status(self.git_dir, base, self.commit):
+            if not is_indexable_path(path):
+                continue
+            if status != "D":
+                changed.add(path)
+            if status != "A":
+                removed.add(path)
+        return ChangeSet(base=base, changed=frozenset(changed), removed=frozenset(removed))
+
+    def close(self) -> None:
+        self._on_close()
+
+
+class WorktreeCheckout(RepoCheckout):
+    def __init__(self, path: Path, commit: str, on_close: Callable[[], None]):
+        super().__init__(path, commit, on_close)
+        self.path = path
+
+    def files(self, only: Optional[AbstractSet[str]] = None) -> Iterator[SourceFile]:
+        return iterate_worktree_files(self.path, only)
+
+
+class GitObjectsCheckout(RepoCheckout):
+    """Reads files straight from the object store of a bare repo; nothing is checked out."""
+
+    def files(self, only: Optional[AbstractSet[str]] = None) -> Iterator[SourceFile]:
+        return iterate_git_blobs(self.git_dir, self.commit, only)
+
+
 class GitClient:
     """
     Thin wrapper around GitPython to make cloning testable/mocked and to keep
     git-specific details out of the HTTP layer.
+
+    With fast_clone=True the clone is shallow (depth 1, single branch), filters out
+    blobs on the wire and uses a sparse checkout limited to the files the traversal
+    indexes, so only the needed blobs are ever downloaded and written to disk.
+
+    With a mirror_cache, clone() instead returns a worktree of a cached bare mirror
+    that is only fetched incrementally. Callers must hand the path back to release().
+
+    open() returns a RepoCheckout; with source="git_objects" it skips the working tree
+    entirely and streams blobs from a bare (mirror or temporary) repository.
     """
 
-    def clone(self, repo_url: str, branch: str | None = None) -> Path:
+    def __init__(self, fast_clone: bool = True, mirror_cache: MirrorCache | None = None,
+                 source: str = "worktree"):
+        if source not in ("worktree", "git_objects"):
+            raise ValueError(f"unknown ingest source {source!r}")
+        self.fast_clone = fast_clone
+        self.mirror_cache = mirror_cache
+        self.source = source
+
+    def open(self, repo_url: str, branch: str | None = None, commit: str | None = None) -> RepoCheckout:
+        """Check out `branch`; with `commit` (from resolve_remote) a cached mirror is fetched if it is behind."""
+        if self.source == "worktree":
+            path = self.clone(repo_url, branch, commit)
+            try:
+                commit = resolve_commit(path, "HEAD")
+            except Exception as e:
+                self.release(path)
+                raise RepoCloneError(f"Failed to clone repo {repo_url!r}: {e}") from e
+            return WorktreeCheckout(path, commit, lambda: self.release(path))
+
+        on_close = None
         try:
+            if self.mirror_cache is not None:
+                git_dir, on_close = self.mirror_cache.lease(repo_url, branch, commit)
+            else:
+                git_dir = Path(tempfile.mkdtemp(prefix="repo_", suffix=".git"))
+                on_close = lambda: rmtree(git_dir, ignore_errors=True)  # noqa: E731
+                options = {"bare": True, "depth": 1, "single_branch": True, "filter": "blob:none"}
+                if branch:
+                    options["branch"] = branch
+                Repo.clone_from(repo_url, git_dir, **options)
+            return GitObjectsCheckout(git_dir, resolve_commit(git_dir, branch or "HEAD"), on_close)
+        except Exception as e:
+            # no checkout to close: release the lease / temporary clone here
+            if on_close is not None:
+                on_close()
+            raise RepoCloneError(f"Failed to clone repo {repo_url!r}: {e}") from e
+
+    def resolve_remote(self, repo_url: str, branch: str | None = None, timeout_s: float = 15.0) -> str | None:
+        """Commit the branch currently points at on the remote; None when it cannot be resolved."""
+        try:
+            return remote_commit(repo_url, branch, timeout_s)
+        except Exception as e:
+            logger.warning("Could not resolve %s of %s: %s", branch or "HEAD", repo_url, e)
+            return None
+
+    def clone(self, repo_url: str, branch: str | None = None, commit: str | None = None) -> Path:
+        temp_dir: Path | None = None
+        try:
+            if self.mirror_cache is not None:
+                patterns = sparse_checkout_patterns() if self.fast_clone else None
+                return self.mirror_cache.add_worktree(repo_url, branch, sparse_patterns=patterns, commit=commit)
+
             temp_dir = Path(tempfile.mkdtemp(prefix="repo_"))
-            if branch:
+            if self.fast_clone:
+                self._fast_clone(repo_url, branch, temp_dir)
+            elif branch:
                 Repo.clone_from(repo_url, temp_dir, branch=branch)
             else:
                 Repo.clone_from(repo_url, temp_dir)
             return temp_dir
         except Exception as e:
+            if temp_dir is not None:
+                # a failed (partial) clone must not leak its temp directory
+                rmtree(temp_dir, ignore_errors=True)
             # keep error message, but wrap it for domain-level handling
             raise RepoCloneError(f"Failed to clone repo {repo_url!r}: {e}") from e
+
+    def release(self, path: Path) -> None:
+        """Dispose of a checkout returned by clone()."""
+        if self.mirror_cache is not None:
+            self.mirror_cache.remove_worktree(path)
+        else:
+            rmtree(path, ignore_errors=True)
+
+    def _fast_clone(self, repo_url: str, branch: str | None, dest: Path) -> None:
+        options = {
+            "depth": 1,
+            "single_branch": True,
+            "filter": "blob:none",
+            "no_checkout": True,
+        }
+        if branch:
+            options["branch"] = branch
+        repo = Repo.clone_from(repo_url, dest, **options)
+        # blobs are fetched lazily by checkout, only for paths matching the sparse patterns
+        repo.git.sparse_checkout("set", "--no-cone", *sparse_checkout_patterns())
+        repo.git.checkout()
@@ -0,0 +1,168 @@
+import subprocess
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+
+
+class GitObjectError(RuntimeError):
+    pass
+
+
+def _git(git_dir: Path, *args: str, input: bytes | None = None) -> bytes:
+    proc = subprocess.run(
+        ["git", *args],
+        cwd=str(git_dir),
+        input=input,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if proc.returncode != 0:
+        raise GitObjectError(f"git {args[0]} failed: {proc.stderr.decode(errors='replace').strip()}")
+    return proc.stdout
+
+
+def resolve_commit(git_dir: Path, rev: str) -> str:
+    return _git(git_dir, "rev-parse", "--verify", f"{rev}^{{commit}}").decode().strip()
+
+
+def remote_commit(url: str, branch: str | None, timeout_s: float = 15.0) -> str:
+    """Commit a branch (or tag, or the default HEAD) of a remote points at, without cloning."""
+
+    patterns = [branch, f"{branch}^{{}}"] if branch else ["HEAD"]
+    try:
+        proc = subprocess.run(
+            ["git", "ls-remote", "--", url, *patterns],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout_s,
+        )
+    except subprocess.TimeoutExpired:
+        raise GitObjectError(f"git ls-remote timed out after {timeout_s}s") from None
+    if proc.returncode != 0:
+        raise GitObjectError(f"git ls-remote failed: {proc.stderr.decode(errors='replace').strip()}")
+    refs = {}
+    for line in proc.stdout.decode().splitlines():
+        sha, _, ref = line.partition("\t")
+        refs[ref] = sha
+    # a branch wins over a tag of the same name; an annotated tag resolves to its commit
+    wanted = [f"refs/heads/{branch}", f"refs/tags/{branch}^{{}}", f"refs/tags/{branch}"] if branch else ["HEAD"]
+    for ref in wanted:
+        if ref in refs:
+            return refs[ref]
+    raise GitObjectError(f"ref {branch or 'HEAD'!r} not found on the remote")
+
+
+def ensure_commit(git_dir: Path, commit: str) -> bool:
+    """Make `commit` available locally; False when it cannot be had.
+
+    Shallow clones only hold the checked-out commit, so a missing one is fetched as
+    one more shallow root (trees only). Full mirrors are never deepened or made shallow.
+    """
+
+    try:
+        _git(git_dir, "cat-file", "-e", f"{commit}^{{commit}}")
+        return True
+    except GitObjectError:
+        pass
+    if _git(git_dir, "rev-parse", "--is-shallow-repository").strip() != b"true":
+        return False
+    try:
+        _git(
+            git_dir,
+            "fetch", "origin", commit, "--depth=1", "--no-tags", "--no-write-fetch-head",
+            "--recurse-submodules=no", "--filter=blob:none",
+        )
+        _git(git_dir, "cat-file", "-e", f"{commit}^{{commit}}")
+        return True
+    except GitObjectError:
+        return False
+
+
+def diff_name_status(git_dir: Path, base: str, commit: str) -> Iterator[Tuple[str, str]]:
+    """Yield (status, path) of files that differ between two commits.
+
+    Renames are reported as a delete plus an add, so statuses are A, M, D or T.
+    Only trees are compared; no blobs are needed.
+    """
+
+    out = _git(git_dir, "diff", "--name-status", "--no-renames", "-z", base, commit)
+    fields = out.split(b"\0")
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if status:
+            yield status.decode(), path.decode("utf-8", errors="surrogateescape")
+
+
+def list_tree(git_dir: Path, commit: str) -> Iterator[Tuple[str, str]]:
+    """Yield (blob_sha, path) for every regular file in the commit's tree."""
+
+    out = _git(git_dir, "ls-tree", "-r", "-z", "--full-tree", commit)
+    for entry in out.split(b"\0"):
+        if not entry:
+            continue
+        meta, path = entry.split(b"\t", 1)
+        mode, obj_type, sha = meta.split(b" ")
+        # skip submodules (commit) and symlinks
+        if obj_type != b"blob" or mode == b"120000":
+            continue
+        yield sha.decode(), path.decode("utf-8", errors="surrogateescape")
+
+
+def prefetch_blobs(git_dir: Path, commit: str, wanted: Iterable[str]) -> int:
+    """Fetch blobs missing from a partial clone in one round-trip.
+
+    Without this, `cat-file` would lazily fetch every missing blob separately.
+    Returns the number of fetched blobs (0 for complete repositories).
+    """
+
+    wanted = set(wanted)
+    out = _git(git_dir, "rev-list", "--objects", "--missing=print", "--no-walk", commit)
+    missing = [
+        line[1:].decode() for line in out.splitlines()
+        if line.startswith(b"?") and line[1:].decode() in wanted
+    ]
+    if missing:
+        # same invocation git itself uses for lazy promisor fetches, batched
+        _git(
+            git_dir,
+            "-c", "fetch.negotiationAlgorithm=noop",
+            "fetch", "origin", "--no-tags", "--no-write-fetch-head",
+            "--recurse-submodules=no", "--filter=blob:none", "--stdin",
+            input="\n".join(missing).encode() + b"\n",
+        )
+    return len(missing)
+
+
+class CatFileBatch:
+    """A single long-lived `git cat-file --batch` process streaming object contents."""
+
+    def __init__(self, git_dir: Path):
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=str(git_dir),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, sha: str) -> bytes:
+        assert self._proc.stdin and self._proc.stdout
+        self._proc.stdin.write(sha.encode() + b"\n")
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline()
+        parts = header.split()
+        if len(parts) != 3:
+            raise GitObjectError(f"cat-file: cannot read {sha}: {header.decode(errors='replace').strip()}")
+        size = int(parts[2])
+        data = self._proc.stdout.read(size)
+        self._proc.stdout.read(1)  # trailing LF
+        return data
+
+    def close(self) -> None:
+        if self._proc.stdin:
+            self._proc.stdin.close()
+        self._proc.wait()
+
+    def __enter__(self) -> "CatFileBatch":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
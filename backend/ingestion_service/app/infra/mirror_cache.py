@@ -0,0 +1,254 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from shutil import rmtree
+from typing import Callable, Iterator, List, Tuple
+
+from git import Git, Repo
+
+logger = logging.getLogger(__name__)
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class MirrorCache:
+    """Persistent per-node cache of bare, blob-filtered repository mirrors.
+
+    Layout under `root`:
+      mirrors/<key>.git   bare partial clone of the repository
+      meta/<key>.json     {url, last_used, last_fetch, size}
+      locks/<key>.lock    flock file guarding fetch / worktree bookkeeping
+
+    The first job for a URL clones the mirror, later jobs only `git fetch` the delta.
+    Jobs that arrive while a fetch is running wait on the lock and then reuse that
+    fetch (anything fetched within `fetch_ttl_s` counts as fresh). Each job gets its
+    own lightweight worktree. Mirrors are evicted least-recently-used first once the
+    recorded sizes exceed `max_bytes`; mirrors with live worktrees are never evicted.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int, fetch_ttl_s: float = 30.0):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.fetch_ttl_s = fetch_ttl_s
+        for sub in ("mirrors", "meta", "locks", "worktrees"):
+            (self.root / sub).mkdir(parents=True, exist_ok=True)
+
+    # ------------------ layout ------------------
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+
+    def mirror_path(self, url: str) -> Path:
+        return self.root / "mirrors" / f"{self._key(url)}.git"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.root / "meta" / f"{key}.json"
+
+    def _read_meta(self, key: str) -> dict:
+        try:
+            return json.loads(self._meta_path(key).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, key: str, meta: dict) -> None:
+        path = self._meta_path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta))
+        tmp.replace(path)
+
+    @contextmanager
+    def _locked(self, key: str, blocking: bool = True) -> Iterator[bool]:
+        with open(self.root / "locks" / f"{key}.lock", "a+") as fh:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(fh, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _git(mirror: Path) -> Git:
+        # run inside the git dir: once sparse worktrees move core.bare into config.worktree,
+        # Repo(mirror) no longer recognizes the mirror as bare
+        return Git(str(mirror))
+
+    # ------------------ mirrors ------------------
+    def ensure(self, url: str, branch: str | None = None, commit: str | None = None) -> Path:
+        """Return an up-to-date bare mirror for `url`, cloning or fetching as needed.
+
+        With `commit` (what `branch` points at on the remote) the mirror is fetched
+        whenever its branch is not there yet, even within `fetch_ttl_s`.
+        """
+
+        key = self._key(url)
+        with self._locked(key):
+            mirror = self._refresh(url, key, branch, commit)
+        self.evict(keep={key})
+        return mirror
+
+    def lease(self, url: str, branch: str | None = None,
+              commit: str | None = None) -> Tuple[Path, Callable[[], None]]:
+        """Return an up-to-date mirror plus a release callback; leased mirrors are never evicted.
+
+        For jobs that read the mirror's objects directly instead of through a worktree.
+        """
+
+        key = self._key(url)
+        with self._locked(key):
+            mirror = self._refresh(url, key, branch, commit)
+            leases = mirror / "ingest-leases"
+            leases.mkdir(exist_ok=True)
+            fd, lease_path = tempfile.mkstemp(dir=leases)
+            os.close(fd)
+        self.evict(keep={key})
+
+        def release() -> None:
+            Path(lease_path).unlink(missing_ok=True)
+            # blobs read through the lease were fetched lazily into the mirror
+            with self._locked(key):
+                meta = self._read_meta(key)
+                meta["size"] = _dir_size(mirror)
+                self._write_meta(key, meta)
+
+        return mirror, release
+
+    def _refresh(self, url: str, key: str, branch: str | None = None, commit: str | None = None) -> Path:
+        # caller holds the repo lock
+        mirror = self.mirror_path(url)
+        meta = self._read_meta(key)
+        now = time.time()
+        if not (mirror / "HEAD").exists():
+            rmtree(mirror, ignore_errors=True)
+            logger.info("Mirror cache: cloning %s", url)
+            Repo.clone_from(url, mirror, bare=True, filter="blob:none")
+            # bare clones have no fetch refspec; keep branches and tags in sync
+            self._git(mirror).config("remote.origin.fetch", "+refs/heads/*:refs/heads/*")
+            meta = {"url": url, "last_fetch": now}
+        elif now - meta.get("last_fetch", 0) > self.fetch_ttl_s or (
+            commit is not None and self._rev(mirror, branch or "HEAD") != commit
+        ):
+            # a requested commit the mirror's branch does not point at yet was pushed
+            # after the last fetch: fetch regardless of the TTL
+            logger.info("Mirror cache: fetching %s", url)
+            self._git(mirror).fetch("--prune", "--tags", "origin")
+            meta["last_fetch"] = now
+            meta.pop("size", None)
+        if "size" not in meta:
+            # recorded under the lock, so evict() never has to walk this mirror
+            meta["size"] = _dir_size(mirror)
+        meta["url"] = url
+        meta["last_used"] = now
+        self._write_meta(key, meta)
+        return mirror
+
+    def _rev(self, mirror: Path, ref: str) -> str | None:
+        # reads the ref only: probing the object itself would lazily fetch it from the promisor
+        try:
+            return self._git(mirror).rev_parse("--verify", "--quiet", f"{ref}^{{commit}}")
+        except Exception:
+            return None
+
+    def add_worktree(self, url: str, branch: str | None = None, sparse_patterns: List[str] | None = None,
+                     commit: str | None = None) -> Path:
+        """Create a detached worktree of `branch` (default HEAD) in a fresh directory."""
+
+        mirror = self.ensure(url, branch, commit)
+        dest = Path(tempfile.mkdtemp(prefix="repo_", dir=self.root / "worktrees"))
+        key = self._key(url)
+        try:
+            with self._locked(key):
+                self._git(mirror).worktree("add", "--detach", "--no-checkout", str(dest), branch or "HEAD")
+                worktree = Repo(dest)
+                if sparse_patterns:
+                    # the first sparse worktree migrates the mirror's shared config
+                    # (extensions.worktreeConfig, core.bare), so this must not race other jobs
+                    worktree.git.sparse_checkout("set", "--no-cone", *sparse_patterns)
+
+            # missing blobs are fetched lazily from the promisor remote into the mirror
+            worktree.git.checkout()
+        except Exception:
+            self.remove_worktree(dest)
+            raise
+        return dest
+
+    def remove_worktree(self, path: Path) -> None:
+        """Drop a worktree created by add_worktree and refresh its mirror's recorded size."""
+
+        mirror = self._mirror_of_worktree(path)
+        if mirror is None:
+            rmtree(path, ignore_errors=True)
+            return
+        key = mirror.name.removesuffix(".git")
+        with self._locked(key):
+            try:
+                self._git(mirror).worktree("remove", "--force", str(path))
+            except Exception:
+                rmtree(path, ignore_errors=True)
+                self._git(mirror).worktree("prune")
+            meta = self._read_meta(key)
+            meta["size"] = _dir_size(mirror)
+            self._write_meta(key, meta)
+
+    @staticmethod
+    def _mirror_of_worktree(path: Path) -> Path | None:
+        # a worktree's .git is a file: "gitdir: <mirror>/worktrees/<name>"
+        try:
+            gitdir = (path / ".git").read_text().strip().removeprefix("gitdir:").strip()
+        except OSError:
+            return None
+        return Path(gitdir).parent.parent
+
+    # ------------------ eviction ------------------
+    def evict(self, keep: set[str] | None = None) -> None:
+        keep = keep or set()
+        entries = []
+        total = 0
+        for meta_path in (self.root / "meta").glob("*.json"):
+            key = meta_path.stem
+            meta = self._read_meta(key)
+            size = meta.get("size")
+            if size is None:
+                size = _dir_size(self.root / "mirrors" / f"{key}.git")
+            total += size
+            entries.append((meta.get("last_used", 0), key, size))
+
+        if total <= self.max_bytes:
+            return
+
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key in keep:
+                continue
+            with self._locked(key, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                mirror = self.root / "mirrors" / f"{key}.git"
+                if mirror.exists():
+                    self._git(mirror).worktree("prune")
+                    if any((mirror / "worktrees").glob("*")) or any((mirror / "ingest-leases").glob("*")):
+                        # a job is still using this mirror
+                        continue
+                logger.info("Mirror cache: evicting %s (%d bytes)", key, size)
+                rmtree(mirror, ignore_errors=True)
+                self._meta_path(key).unlink(missing_ok=True)
+                total -= size
@@ -1,89 +1,611 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct, Distance, VectorParams, ScoredPoint
-from qdrant_client.http.exceptions import UnexpectedResponse
-from typing import List, Dict, Any, Optional
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+import grpc
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+from qdrant_client.http.models import Batch, PointStruct, Distance, VectorParams, ScoredPoint
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 import uuid
 
+from app.core.config import CollectionProfile
+from app.infra.qdrant_tenants import TENANT_KEY, tenant_condition
+
+logger = logging.getLogger(__name__)
+
+# approximate point counts per collection (or tenant), to pick exact search for small ones
+_SIZE_TTL_S = 60.0
+_collection_sizes: Dict[str, Tuple[float, int]] = {}
+
+_TRANSIENT_HTTP_STATUSES = (429, 500, 502, 503, 504)
+_TRANSIENT_GRPC_CODES = (
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+)
+
+
+def _is_transient(e: BaseException) -> bool:
+    """Errors worth retrying: connection problems, timeouts, overload."""
+    if isinstance(e, ResponseHandlingException):
+        return True
+    if isinstance(e, UnexpectedResponse):
+        return e.status_code in _TRANSIENT_HTTP_STATUSES
+    if isinstance(e, grpc.RpcError):
+        return e.code() in _TRANSIENT_GRPC_CODES
+    return False
+
+
+class _VectorBatch:
+    """Slice of a bulk upload: point ids, a (n, dim) float32 array and payloads."""
+
+    __slots__ = ("ids", "vectors", "payloads")
+
+    def __init__(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        self.ids = ids
+        self.vectors = vectors
+        self.payloads = payloads
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def slice(self, start: int, end: int) -> "_VectorBatch":
+        # ndarray slices are views: no vector data is copied until the batch is sent
+        return _VectorBatch(self.ids[start:end], self.vectors[start:end], self.payloads[start:end])
+
+    @staticmethod
+    def concat(parts: List["_VectorBatch"]) -> "_VectorBatch":
+        if len(parts) == 1:
+            return parts[0]
+        return _VectorBatch(
+            [i for p in parts for i in p.ids],
+            np.concatenate([p.vectors for p in parts]),
+            [pl for p in parts for pl in p.payloads],
+        )
+
+    def to_model(self) -> Batch:
+        # one C-level tolist() per batch, like QdrantClient.upload_collection
+        return Batch(ids=self.ids, vectors=self.vectors.tolist(), payloads=self.payloads)
+
+
+_UploadUnit = Union[List[PointStruct], _VectorBatch]
+
+
+class QdrantClientRegistry:
+    """Process-wide, long-lived Qdrant clients shared by all collections and requests.
+
+    One sync and one async client per (url, api_key). Both keep their connections
+    alive between calls. Without explicit limits qdrant-client disables HTTP
+    keep-alive, so every request would open a new connection.
+    """
+
+    def __init__(self, prefer_grpc: bool = False, grpc_port: int = 6334, pool_size: int = 32,
+                 keepalive_s: float = 60.0):
+        self.prefer_grpc = prefer_grpc
+        self.grpc_port = grpc_port
+        self.pool_size = pool_size
+        self.keepalive_s = keepalive_s
+        self._clients: Dict[Tuple[str, Optional[str]], QdrantClient] = {}
+        self._async_clients: Dict[Tuple[str, Optional[str]], AsyncQdrantClient] = {}
+        self._lock = threading.Lock()
+
+    def _options(self) -> Dict[str, Any]:
+        return {
+            "prefer_grpc": self.prefer_grpc,
+            "grpc_port": self.grpc_port,
+            "limits": httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+                keepalive_expiry=self.keepalive_s,
+            ),
+            "grpc_options": {
+                "grpc.keepalive_time_ms": int(self.keepalive_s * 1000),
+                "grpc.keepalive_permit_without_calls": 1,
+            },
+        }
+
+    def get(self, url: str, api_key: Optional[str]) -> QdrantClient:
+        key = (url, api_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = QdrantClient(url=url, api_key=api_key, **self._options())
+                self._clients[key] = client
+            return client
+
+    def get_async(self, url: str, api_key: Optional[str]) -> AsyncQdrantClient:
+        key = (url, api_key)
+        with self._lock:
+            client = self._async_clients.get(key)
+            if client is None:
+                client = AsyncQdrantClient(url=url, api_key=api_key, **self._options())
+                self._async_clients[key] = client
+            return client
+
+    async def aclose(self) -> None:
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+            async_clients, self._async_clients = list(self._async_clients.values()), {}
+        for client in clients:
+            client.close()
+        for client in async_clients:
+            await client.close()
+
 
 class QdrantManager:
     """Encapsulates Qdrant connection, collection creation and buffered upsert.
 
+    Pass `client` (and `async_client` for asearch) from a QdrantClientRegistry to reuse
+    pooled connections; otherwise a private client is created.
+
+    With upload_workers > 0, full batches are sent by a pool of background workers
+    with wait=False, at most `max_in_flight` batches at a time (add_point_from_vector
+    blocks when the window is full). finish() waits for them and sends one last
+    wait=True upsert: Qdrant applies updates in order, so once it returns every
+    earlier point is applied too. Transient errors are retried with exponential backoff.
+
+    add_vectors() is the bulk path: it takes a whole (n, dim) float32 array and sends it
+    as columnar Batch upserts without building a PointStruct or float list per point.
+
+    `profile` (CollectionProfile) sets storage of new collections (quantization, HNSW,
+    on-disk flags, payload indexes) and search parameters.
+
+    With `tenant`, `collection_name` is a collection shared by many repositories and the
+    manager only sees the tenant's part of it: points carry the tenant in their payload
+    (a tenant-optimised keyword index) and every search, count and delete is filtered by
+    it. Shared collections build per-tenant HNSW graphs (payload_m) instead of a global one.
+
     Usage:
         mgr = QdrantManager(url, api_key, collection_name, batch_size=64)
         mgr.ensure_collection(vector_size)
         mgr.add_point_from_vector(file_hash, chunk_index, vector, metadata)
-        mgr.flush()
+        mgr.add_vectors([(file_hash, chunk_index), ...], vectors, payloads)
+        mgr.finish()
     """
 
-    def __init__(self, url: str, api_key: Optional[str], collection_name: str, batch_size: int = 64):
-        self.client = QdrantClient(url=url, api_key=api_key)
+    def __init__(self, url: str, api_key: Optional[str], collection_name: str, batch_size: int = 64,
+                 client: Optional[QdrantClient] = None, async_client: Optional[AsyncQdrantClient] = None,
+                 upload_workers: int = 0, max_in_flight: int = 4, max_retries: int = 3,
+                 retry_backoff_s: float = 0.5, profile: Optional[CollectionProfile] = None,
+                 tenant: Optional[str] = None):
+        self.client = client if client is not None else QdrantClient(url=url, api_key=api_key)
+        self.async_client = async_client
         self.collection_name = collection_name
+        self.tenant = tenant
+        self._size_key = collection_name if tenant is None else f"{collection_name}#{tenant}"
         self.batch_size = batch_size
+        self.profile = profile or CollectionProfile()
         self._points_buffer: List[PointStruct] = []
+        self._vector_buffer: List[_VectorBatch] = []
+        self._vector_pending = 0
         self._total_upserted = 0
         self._vector_size: Optional[int] = None
 
+        self.max_retries = max_retries
+        self.retry_backoff_s = retry_backoff_s
+        # background uploader state (upload_workers > 0)
+        self.upload_workers = upload_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = threading.BoundedSemaphore(max(1, max_in_flight))
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+        self._upload_error: Optional[BaseException] = None
+        self._last_batch: Optional[_UploadUnit] = None
+
     def init_collection(self, vector_size: int, distance: Distance = Distance.COSINE):
         """Initializes Qdrant collection of points."""
 
-        collections = self.client.get_collections().collections
-        if any(col.name == self.collection_name for col in collections):
-            print(f"Collection '{self.collection_name}' already exists.")
+        if self.client.collection_exists(self.collection_name):
+            logger.info("Collection '%s' already exists.", self.collection_name)
+        else:
+            logger.info("Creating Qdrant collection '%s' (vector_size=%d) ...", self.collection_name, vector_size)
+            try:
+                self.client.create_collection(
+                    collection_name=self.collection_name,
+                    **self._collection_config(vector_size, distance),
+                )
+                logger.info("Created collection '%s'.", self.collection_name)
+            except Exception:
+                # a shared collection may have been created by a concurrent job
+                if not self.client.collection_exists(self.collection_name):
+                    raise
+        self._vector_size = vector_size
+        self._ensure_payload_indexes()
+
+    def _collection_config(self, vector_size: int, distance: Distance) -> Dict[str, Any]:
+        p = self.profile
+        quantization = None
+        if p.quantization == "scalar":
+            quantization = models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=p.quantization_always_ram,
+            ))
+        elif p.quantization == "binary":
+            quantization = models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+                always_ram=p.quantization_always_ram,
+            ))
+        if self.tenant is None:
+            hnsw = models.HnswConfigDiff(m=p.hnsw_m, ef_construct=p.hnsw_ef_construct, on_disk=p.hnsw_on_disk)
+        else:
+            # every search is filtered by tenant: one graph per tenant, no global graph
+            hnsw = models.HnswConfigDiff(
+                m=0, payload_m=p.hnsw_m or 16, ef_construct=p.hnsw_ef_construct, on_disk=p.hnsw_on_disk,
+            )
+        return {
+            "vectors_config": VectorParams(size=vector_size, distance=distance, on_disk=p.vectors_on_disk),
+            "hnsw_config": hnsw,
+            "quantization_config": quantization,
+            "on_disk_payload": p.on_disk_payload,
+        }
+
+    def _ensure_payload_indexes(self) -> None:
+        if not self.profile.payload_indexes and self.tenant is None:
             return
+        existing = self.client.get_collection(self.collection_name).payload_schema or {}
+        if self.tenant is not None and TENANT_KEY not in existing:
+            # tenant points are stored together on disk and searched with their own graph
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=TENANT_KEY,
+                field_schema=models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+            )
+        for field, schema in self.profile.payload_indexes.items():
+            if field in existing:
+                continue
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field,
+                field_schema=models.PayloadSchemaType(schema),
+            )
 
-        print(f"Creating Qdrant collection '{self.collection_name}' (vector_size={vector_size}) ...")
-        self.client.create_collection(
-            collection_name=self.collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=distance),
+    def _filter(self, *conditions: models.Condition) -> Optional[models.Filter]:
+        """`conditions` limited to the tenant's points (None when there is nothing to filter)."""
+        must = list(conditions)
+        if self.tenant is not None:
+            must.insert(0, tenant_condition(self.tenant))
+        return models.Filter(must=must) if must else None
+
+    def exists(self) -> bool:
+        if not self.client.collection_exists(self.collection_name):
+            return False
+        if self.tenant is None:
+            return True
+        points, _ = self.client.scroll(
+            collection_name=self.collection_name, scroll_filter=self._filter(), limit=1,
+            with_payload=False, with_vectors=False,
         )
-        self._vector_size = vector_size
-        print("Created collection.")
+        return bool(points)
+
+    def delete_all(self) -> None:
+        """Delete the tenant's points, or the whole collection without a tenant."""
+        if self.tenant is None:
+            self.client.delete_collection(self.collection_name)
+        elif self.client.collection_exists(self.collection_name):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.FilterSelector(filter=self._filter()),
+                wait=True,
+            )
+        _collection_sizes.pop(self._size_key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Exact point count of the collection (or tenant) and the state of the collection."""
+        if not self.client.collection_exists(self.collection_name):
+            return {"collection": self.collection_name, "tenant": self.tenant, "exists": False, "points": 0}
+        info = self.client.get_collection(self.collection_name)
+        points = self.client.count(self.collection_name, count_filter=self._filter(), exact=True).count
+        return {
+            "collection": self.collection_name,
+            "tenant": self.tenant,
+            "exists": True,
+            "points": points,
+            "collection_points": info.points_count,
+            "segments": info.segments_count,
+            "status": info.status,
+        }
+
+    def delete_files(self, file_paths: Sequence[str], batch: int = 256) -> None:
+        """Delete every point of the given files (by the indexed `file_path` payload); waits for completion."""
+
+        file_paths = list(file_paths)
+        for i in range(0, len(file_paths), batch):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.FilterSelector(filter=self._filter(
+                    models.FieldCondition(key="file_path", match=models.MatchAny(any=file_paths[i:i + batch])),
+                )),
+                wait=True,
+            )
+        _collection_sizes.pop(self._size_key, None)
+
+    def copy_points(self, source: str, exclude_file_paths: Sequence[str] = ()) -> int:
+        """Queue every point of collection `source` (vectors and payloads as stored), except
+        those of the given files; returns the number of points queued.
+
+        Used to move a per-repository collection into a tenant of a shared one (ids are
+        then scoped by the tenant). Upload and retries go through the regular
+        uploader (call finish()).
+        """
+
+        scroll_filter = None
+        if exclude_file_paths:
+            scroll_filter = models.Filter(must_not=[
+                models.FieldCondition(key="file_path", match=models.MatchAny(any=list(exclude_file_paths))),
+            ])
+        copied = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=source,
+                scroll_filter=scroll_filter,
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if points:
+                payloads = [p.payload or {} for p in points]
+                if self.tenant is not None:
+                    for payload in payloads:
+                        payload[TENANT_KEY] = self.tenant
+                self._dispatch(_VectorBatch(
+                    [self._scoped_id(str(p.id)) for p in points],
+                    np.asarray([p.vector for p in points], dtype=np.float32),
+                    payloads,
+                ))
+                copied += len(points)
+            if offset is None:
+                return copied
 
     def _make_point_id(self, file_hash: str, chunk_index: int) -> str:
         """Deterministic UUIDv5 based on file_hash and chunk index.
         Returns canonical UUID string which Qdrant accepts as a point id.
         """
-        return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{file_hash}:{chunk_index}"))
+        return self._scoped_id(str(uuid.uuid5(uuid.NAMESPACE_OID, f"{file_hash}:{chunk_index}")))
+
+    def _scoped_id(self, point_id: str) -> str:
+        # the same file in two repositories is two points of a shared collection
+        if self.tenant is None:
+            return point_id
+        return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{self.tenant}:{point_id}"))
 
     def add_point_from_vector(self, file_hash: str, chunk_index: int, vector: List[float], payload: Dict[str, Any]):
         """Create PointStruct and append to internal buffer. Flushes automatically when buffer >= batch_size."""
 
         pt_id = self._make_point_id(file_hash, chunk_index)
+        if self.tenant is not None:
+            payload[TENANT_KEY] = self.tenant
         point = PointStruct(id=pt_id, vector=list(map(float, vector)), payload=payload)
         self._points_buffer.append(point)
         if len(self._points_buffer) >= self.batch_size:
             self.flush()
 
-    def flush(self):
-        """Upload buffered points to Qdrant and clear buffer."""
+    def add_vectors(self, keys: Sequence[Tuple[str, int]], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        """Queue points given as (file_hash, chunk_index) keys, a (n, dim) array and payloads.
+
+        Full batch_size batches are sent as soon as they are complete; the rest waits for
+        more vectors or flush().
+        """
 
-        if not self._points_buffer:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(keys) or len(payloads) != len(keys):
+            raise ValueError("keys, vectors and payloads must have the same length")
+        ids = [self._make_point_id(file_hash, chunk_index) for file_hash, chunk_index in keys]
+        if self.tenant is not None:
+            for payload in payloads:
+                payload[TENANT_KEY] = self.tenant
+        self._vector_buffer.append(_VectorBatch(ids, vectors, list(payloads)))
+        self._vector_pending += len(ids)
+        if self._vector_pending >= self.batch_size:
+            self._flush_vectors(full_only=True)
+
+    def _flush_vectors(self, full_only: bool) -> None:
+        if not self._vector_buffer:
             return
-        try:
-            self.client.upsert(collection_name=self.collection_name, points=self._points_buffer)
-            self._total_upserted += len(self._points_buffer)
-            print(f"Upserted {len(self._points_buffer)} points (total {self._total_upserted})")
-        except UnexpectedResponse as e:
-            print("Qdrant upsert failed:", e)
-            # attempt to show server detail
+        merged = _VectorBatch.concat(self._vector_buffer)
+        n = len(merged)
+        end = n - n % self.batch_size if full_only else n
+        for start in range(0, end, self.batch_size):
+            self._dispatch(merged.slice(start, min(start + self.batch_size, end)))
+        rest = merged.slice(end, n)
+        self._vector_buffer = [rest] if len(rest) else []
+        self._vector_pending = len(rest)
+
+    def _upsert(self, unit: _UploadUnit, wait: bool) -> None:
+        points = unit.to_model() if isinstance(unit, _VectorBatch) else unit
+        attempt = 0
+        while True:
             try:
-                print("Response content:", getattr(e, "response", None) or getattr(e, "http_response", None))
-            except Exception:
-                pass
-            raise
+                self.client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+                return
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_transient(e):
+                    logger.error("Qdrant upsert of %d points to '%s' failed: %s", len(unit), self.collection_name, e)
+                    raise
+                delay = self.retry_backoff_s * 2 ** attempt
+                attempt += 1
+                logger.warning("Qdrant upsert failed (%s), retry %d/%d in %.1fs", e, attempt, self.max_retries, delay)
+                time.sleep(delay)
+
+    def _count(self, unit: _UploadUnit) -> None:
+        with self._lock:
+            self._total_upserted += len(unit)
+            total = self._total_upserted
+            self._last_batch = unit
+        logger.debug("Upserted %d points (total %d)", len(unit), total)
+
+    def _upload_in_background(self, unit: _UploadUnit) -> None:
+        try:
+            self._upsert(unit, wait=False)
+            self._count(unit)
+        except BaseException as e:
+            with self._lock:
+                if self._upload_error is None:
+                    self._upload_error = e
         finally:
+            self._in_flight.release()
+
+    def _raise_upload_error(self) -> None:
+        with self._lock:
+            error = self._upload_error
+        if error is not None:
+            raise error
+
+    def _dispatch(self, unit: _UploadUnit) -> None:
+        if self.upload_workers <= 0:
+            self._upsert(unit, wait=True)
+            self._count(unit)
+            return
+
+        self._raise_upload_error()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.upload_workers, thread_name_prefix="qdrant-upload")
+        # backpressure: wait for a free slot in the in-flight window
+        self._in_flight.acquire()
+        self._futures = [f for f in self._futures if not f.done()]
+        self._futures.append(self._executor.submit(self._upload_in_background, unit))
+
+    def flush(self):
+        """Upload buffered points (or hand them to the background uploader) and clear the buffers."""
+
+        if self._points_buffer:
+            # in synchronous mode a failed upsert leaves the buffer in place
+            self._dispatch(self._points_buffer)
+            self._points_buffer = []
+        self._flush_vectors(full_only=False)
+
+    def sync(self):
+        """Send everything queued so far and wait until Qdrant acknowledged it.
+
+        Unlike finish() the background uploader keeps running; used as a checkpoint barrier.
+        """
+
+        self.flush()
+        if self._executor is not None:
+            wait_futures(self._futures)
+            self._futures = []
+            self._raise_upload_error()
+
+    def finish(self):
+        """Flush everything and return once all points are uploaded and applied.
+
+        Raises the error of any background upload that failed for good.
+        """
+
+        try:
+            # the background uploader may hold nothing yet (a job smaller than one batch):
+            # the remaining points then go out below, with wait=True, in this thread
+            wait_futures(self._futures)
+            self._futures = []
+            self._raise_upload_error()
+            # consistency barrier: the remaining points (or the last batch again, ids are
+            # deterministic) are upserted with wait=True after all earlier updates
+            remaining: List[_UploadUnit] = []
+            if self._points_buffer:
+                remaining.append(self._points_buffer)
+            if self._vector_buffer:
+                remaining.append(_VectorBatch.concat(self._vector_buffer))
+            if not remaining and self._last_batch is not None and self.upload_workers > 0:
+                self._upsert(self._last_batch, wait=True)
+            for unit in remaining:
+                self._upsert(unit, wait=True)
+                self._count(unit)
             self._points_buffer = []
+            self._vector_buffer = []
+            self._vector_pending = 0
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def close(self):
+        """Stop the background uploader without waiting for a barrier (e.g. the job failed)."""
+
+        if self._executor is not None:
+            for f in self._futures:
+                # a cancelled upload never runs, so its in-flight slot is released here
+                if f.cancel():
+                    self._in_flight.release()
+            self._futures = []
+            self._executor.shutdown(wait=True)
+            self._executor = None
 
     @property
     def total_upserted(self) -> int:
         return self._total_upserted
 
+    # ------------------ search ------------------
+    def _search_params(self, size: Optional[int]) -> models.SearchParams:
+        p = self.profile
+        exact = size is not None and size < p.exact_search_below
+        quantization = None
+        if p.quantization != "none" and not exact:
+            quantization = models.QuantizationSearchParams(rescore=p.rescore, oversampling=p.oversampling)
+        return models.SearchParams(hnsw_ef=p.hnsw_ef, exact=exact, quantization=quantization)
+
+    def _cached_size(self) -> Tuple[bool, Optional[int]]:
+        """(fresh, size) of the collection from the process-wide cache."""
+        item = _collection_sizes.get(self._size_key)
+        if item is None or time.monotonic() - item[0] > _SIZE_TTL_S:
+            return False, item[1] if item else None
+        return True, item[1]
+
+    def _collection_size(self) -> Optional[int]:
+        if self.profile.exact_search_below <= 0:
+            return None
+        fresh, size = self._cached_size()
+        if not fresh:
+            size = self.client.count(self.collection_name, count_filter=self._filter(), exact=False).count
+            _collection_sizes[self._size_key] = (time.monotonic(), size)
+        return size
+
+    async def _acollection_size(self) -> Optional[int]:
+        if self.profile.exact_search_below <= 0:
+            return None
+        fresh, size = self._cached_size()
+        if not fresh:
+            size = (await self.async_client.count(self.collection_name, count_filter=self._filter(), exact=False)).count
+            _collection_sizes[self._size_key] = (time.monotonic(), size)
+        return size
+
     def search(self, query_vector: list[float], limit: int = 8) -> list:
         res = self.client.query_points(
             collection_name=self.collection_name,
             query=query_vector,  # важно: query, не query_vector
+            query_filter=self._filter(),
             limit=limit,
             with_payload=True,
+            search_params=self._search_params(self._collection_size()),
         )
         # В 1.16.x обычно возвращается объект, у которого .points
-        return list(res.points)
\ No newline at end of file
+        return list(res.points)
+
+    async def asearch(self, query_vector: list[float], limit: int = 8) -> list:
+        if self.async_client is None:
+            raise RuntimeError("QdrantManager was created without an async client")
+        res = await self.async_client.query_points(
+            collection_name=self.collection_name,
+            query=query_vector,
+            query_filter=self._filter(),
+            limit=limit,
+            with_payload=True,
+            search_params=self._search_params(await self._acollection_size()),
+        )
+        return list(res.points)
+
+    async def aretrieve(self, keys: Sequence[Tuple[str, int]]) -> list:
+        """Points with payloads by (file_hash, chunk_index), aligned with `keys` (None if missing)."""
+        if self.async_client is None:
+            raise RuntimeError("QdrantManager was created without an async client")
+        ids = [self._make_point_id(file_hash, chunk_index) for file_hash, chunk_index in keys]
+        points = await self.async_client.retrieve(
+            collection_name=self.collection_name,
+            ids=ids,
+            with_payload=True,
+            with_vectors=False,
+        )
+        by_id = {str(p.id): p for p in points}
+        return [by_id.get(i) for i in ids]
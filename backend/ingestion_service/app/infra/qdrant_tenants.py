@@ -0,0 +1,25 @@
+import zlib
+
+from qdrant_client.http import models
+
+# payload key partitioning a shared collection by repository (the logical collection name)
+TENANT_KEY = "tenant"
+
+
+def shared_collection(tenant: str, name: str, shards: int = 1) -> str:
+    """Shared collection holding `tenant`: `name`, or `name_<i>` with several shards.
+
+    The shard is a stable hash of the tenant; changing `shards` moves tenants to other
+    collections, so it means re-indexing them.
+    """
+    if shards <= 1:
+        return name
+    return f"{name}_{zlib.crc32(tenant.encode()) % shards}"
+
+
+def shared_collections(name: str, shards: int = 1) -> list[str]:
+    return [name] if shards <= 1 else [f"{name}_{i}" for i in range(shards)]
+
+
+def tenant_condition(tenant: str) -> models.FieldCondition:
+    return models.FieldCondition(key=TENANT_KEY, match=models.MatchValue(value=tenant))
@@ -0,0 +1,141 @@
+import logging
+import re
+import time
+from typing import List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+logger = logging.getLogger(__name__)
+
+_VERSION_SEP = "__v"
+_RETIRED_SEP = "__retired_"
+
+
+class CollectionVersions:
+    """Blue/green versions of one logical collection behind a Qdrant alias.
+
+    Every full ingest builds `<alias>__v<ms>` and, once it is complete, repoints the alias
+    with one atomic alias update, so searches through the alias see either the old or
+    the new index and never a mix. The replaced version gets a `<version>__retired_<s>`
+    alias recording when it was retired; gc() deletes it after `grace_s`, and deletes
+    builds that were abandoned (crashed workers) after `stale_build_s`.
+
+    A plain collection named like the alias (indexed before versioning) is served
+    as the current version until the first switch replaces it.
+    """
+
+    def __init__(self, client: QdrantClient, alias: str, grace_s: float = 3600.0,
+                 stale_build_s: float = 86400.0):
+        self.client = client
+        self.alias = alias
+        self.grace_s = grace_s
+        self.stale_build_s = stale_build_s
+        self._version_re = re.compile(rf"^{re.escape(alias)}{_VERSION_SEP}(\d+)$")
+
+    def _aliases(self) -> List[models.AliasDescription]:
+        return self.client.get_aliases().aliases
+
+    def current(self) -> Optional[str]:
+        """Collection the alias resolves to (or the legacy plain collection); None if not indexed yet."""
+        for a in self._aliases():
+            if a.alias_name == self.alias:
+                return a.collection_name
+        if self.client.collection_exists(self.alias):
+            return self.alias
+        return None
+
+    def exists(self, version: str) -> bool:
+        return self.client.collection_exists(version)
+
+    def new_version(self) -> str:
+        return f"{self.alias}{_VERSION_SEP}{int(time.time() * 1000)}"
+
+    def switch(self, version: str) -> Optional[str]:
+        """Atomically point the alias at `version`; returns the retired collection, if any."""
+
+        previous = self.current()
+        if previous == version:
+            # a resumed job whose earlier attempt already switched
+            return None
+        ops: list = []
+        if previous == self.alias:
+            # a legacy collection holds the alias name; it has to go before the alias can exist
+            logger.info("Replacing unversioned collection '%s' with '%s'", self.alias, version)
+            self.client.delete_collection(self.alias)
+            previous = None
+        elif previous is not None:
+            ops.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=self.alias)))
+            ops.append(models.CreateAliasOperation(create_alias=models.CreateAlias(
+                collection_name=previous,
+                alias_name=f"{previous}{_RETIRED_SEP}{int(time.time())}",
+            )))
+        ops.append(models.CreateAliasOperation(create_alias=models.CreateAlias(
+            collection_name=version, alias_name=self.alias,
+        )))
+        self.client.update_collection_aliases(change_aliases_operations=ops)
+        logger.info("Alias '%s' -> '%s' (was %s)", self.alias, version, previous)
+        return previous
+
+    def drop(self, version: str) -> None:
+        """Delete a version that will never be switched to (its build failed)."""
+        try:
+            self.client.delete_collection(version)
+        except Exception as e:
+            logger.warning("Could not delete failed build '%s': %s", version, e)
+
+    def delete_all(self) -> List[str]:
+        """Delete every version (current, retired, in progress) and a legacy collection."""
+
+        deleted: List[str] = []
+        for c in self.client.get_collections().collections:
+            if c.name == self.alias or self._version_re.match(c.name):
+                self.client.delete_collection(c.name)
+                deleted.append(c.name)
+        if deleted:
+            logger.info("Deleted all versions of '%s': %s", self.alias, ", ".join(deleted))
+        return deleted
+
+    @staticmethod
+    def logical_names(client: QdrantClient) -> List[str]:
+        """Logical collections: version aliases and plain (unversioned) collections."""
+
+        names = set()
+        for a in client.get_aliases().aliases:
+            if _RETIRED_SEP not in a.alias_name:
+                names.add(a.alias_name)
+        for c in client.get_collections().collections:
+            base, sep, ms = c.name.rpartition(_VERSION_SEP)
+            if not (sep and ms.isdigit()):
+                names.add(c.name)
+        return sorted(names)
+
+    def gc(self) -> List[str]:
+        """Delete retired versions past the grace period and stale abandoned builds."""
+
+        now = time.time()
+        aliases = self._aliases()
+        current = next((a.collection_name for a in aliases if a.alias_name == self.alias), None)
+        retired = {}
+        for a in aliases:
+            name, sep, retired_at = a.alias_name.rpartition(_RETIRED_SEP)
+            if sep and self._version_re.match(name) and retired_at.isdigit():
+                retired[a.collection_name] = int(retired_at)
+
+        deleted: List[str] = []
+        for c in self.client.get_collections().collections:
+            m = self._version_re.match(c.name)
+            if m is None or c.name == current:
+                continue
+            if c.name in retired:
+                expired = now - retired[c.name] > self.grace_s
+            else:
+                # never switched to: a build in progress, or one abandoned by a crashed worker
+                expired = now - int(m.group(1)) / 1000 > self.stale_build_s
+            if expired:
+                # the collection's aliases are removed together with it
+                self.client.delete_collection(c.name)
+                deleted.append(c.name)
+        if deleted:
+            logger.info("Deleted old versions of '%s': %s", self.alias, ", ".join(deleted))
+        return deleted
@@ -43,6 +43,17 @@ class ReposServiceClient:
         r.raise_for_status()
         return r.json()
 
+    def get_latest_indexed_state(self, repository_id: int) -> dict[str, Any] | None:
+        r = requests.get(
+            self._url("/repo-index-states/latest-indexed"),
+            params={"repository_id": repository_id},
+            timeout=self.timeout_s,
+        )
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return r.json()
+
     def touch_repository_indexed(self, repository_id: int) -> dict[str, Any]:
         r = requests.post(
             self._url(f"/repos/{repository_id}/touch-indexed"),
@@ -50,3 +61,68 @@ class ReposServiceClient:
         )
         r.raise_for_status()
         return r.json()
+
+    # ------------------ durable ingest job queue ------------------
+    def enqueue_ingest_job(self, user_id: int, repository_id: int, state_id: int, payload: dict[str, Any],
+                           coalesce_key: str | None = None) -> dict[str, Any]:
+        r = requests.post(
+            self._url("/ingest-jobs"),
+            json={
+                "user_id": user_id,
+                "repository_id": repository_id,
+                "state_id": state_id,
+                "payload": payload,
+                "coalesce_key": coalesce_key,
+            },
+            timeout=self.timeout_s,
+        )
+        r.raise_for_status()
+        return r.json()
+
+    def claim_ingest_job(self, worker_id: str, lease_s: int) -> dict[str, Any] | None:
+        r = requests.post(
+            self._url("/ingest-jobs/claim"),
+            json={"worker_id": worker_id, "lease_s": lease_s},
+            timeout=self.timeout_s,
+        )
+        r.raise_for_status()
+        if r.status_code == 204:
+            return None
+        return r.json()
+
+    def heartbeat_ingest_job(self, job_id: int, worker_id: str, lease_s: int) -> dict[str, Any]:
+        r = requests.post(
+            self._url(f"/ingest-jobs/{job_id}/heartbeat"),
+            json={"worker_id": worker_id, "lease_s": lease_s},
+            timeout=self.timeout_s,
+        )
+        r.raise_for_status()
+        return r.json()
+
+    def checkpoint_ingest_job(self, job_id: int, worker_id: str, meta: dict[str, Any] | None = None,
+                              files: list[str] | None = None, reset: bool = False) -> dict[str, Any]:
+        r = requests.post(
+            self._url(f"/ingest-jobs/{job_id}/checkpoint"),
+            json={"worker_id": worker_id, "meta": meta, "files": files or [], "reset": reset},
+            timeout=self.timeout_s,
+        )
+        r.raise_for_status()
+        return r.json()
+
+    def complete_ingest_job(self, job_id: int, worker_id: str) -> dict[str, Any]:
+        r = requests.post(
+            self._url(f"/ingest-jobs/{job_id}/complete"),
+            json={"worker_id": worker_id},
+            timeout=self.timeout_s,
+        )
+        r.raise_for_status()
+        return r.json()
+
+    def fail_ingest_job(self, job_id: int, worker_id: str, error: str, retryable: bool = True) -> dict[str, Any]:
+        r = requests.post(
+            self._url(f"/ingest-jobs/{job_id}/fail"),
+            json={"worker_id": worker_id, "error": error, "retryable": retryable},
+            timeout=self.timeout_s,
+        )
+        r.raise_for_status()
+        return r.json()
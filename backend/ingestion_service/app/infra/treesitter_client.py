@@ -1,47 +1,116 @@
+import importlib
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
-from collections import deque
 
-from tree_sitter import Language, Parser
-
-# import grammars you need here
-import tree_sitter_go
-# import tree_sitter_html
-# import tree_sitter_json
-# import tree_sitter_typescript
-# import tree_sitter_toml
-# import tree_sitter_yaml
+from tree_sitter import Language, Parser, Query, QueryCursor
+
+# grammars by language key: (module, language function), imported on first use.
+# Enable more languages here; a missing grammar package just disables that language.
+_GRAMMARS: Dict[str, Tuple[str, str]] = {
+    "go": ("tree_sitter_go", "language"),
+    # "html": ("tree_sitter_html", "language"),
+    # "json": ("tree_sitter_json", "language"),
+    # "typescript": ("tree_sitter_typescript", "language_typescript"),
+    # "toml": ("tree_sitter_toml", "language"),
+    # "yaml": ("tree_sitter_yaml", "language"),
+    # "dockerfile": ("tree_sitter_dockerfile", "language"),
+    # "markdown": ("tree_sitter_markdown", "language"),
+    # "css": ("tree_sitter_css", "language"),
+}
+
+
+# ------------------ extraction queries ------------------
+# Captures: @package, @import, @name, and one entity capture per match whose
+# name is the entity kind (@function, @method, @type with its @type_body).
+GO_QUERY = """
+(package_clause (package_identifier) @package)
+(import_spec path: (_) @import)
+(function_declaration name: (identifier) @name) @function
+(method_declaration name: (field_identifier) @name) @method
+(type_declaration (type_spec name: (type_identifier) @name type: (_) @type_body) @type)
+"""
+
+_QUERIES: Dict[str, str] = {
+    "go": GO_QUERY,
+}
+
+_ENTITY_CAPTURES = ("function", "method", "type")
+# kinds whose bodies are not searched for nested entities (like the old BFS, which stopped there)
+_OPAQUE_KINDS = ("function", "method")
+_TYPE_BODY_KINDS = {"struct_type": "struct", "interface_type": "interface"}
+
+
+class Entity:
+    """Byte/line offsets of one extracted entity; text lives in the shared Extraction buffer."""
+
+    __slots__ = ("kind", "name_start", "name_end", "start_byte", "end_byte", "start_line", "end_line")
+
+    def __init__(self, kind: str, name_start: int, name_end: int, start_byte: int, end_byte: int,
+                 start_line: int, end_line: int):
+        self.kind = kind
+        self.name_start = name_start
+        self.name_end = name_end
+        self.start_byte = start_byte
+        self.end_byte = end_byte
+        self.start_line = start_line
+        self.end_line = end_line
+
+
+class Extraction:
+    """Result of parsing one file once: offsets into `buf`, text decoded only on demand."""
+
+    __slots__ = ("buf", "package_span", "import_spans", "entities")
+
+    def __init__(self, buf: bytes):
+        self.buf = buf
+        self.package_span: Optional[Tuple[int, int]] = None
+        self.import_spans: List[Tuple[int, int]] = []
+        self.entities: List[Entity] = []
+
+    def text(self, start: int, end: int) -> str:
+        return self.buf[start:end].decode("utf8", errors="replace")
+
+    @property
+    def package(self) -> Optional[str]:
+        return self.text(*self.package_span) if self.package_span else None
+
+    @property
+    def imports(self) -> List[str]:
+        # remove quotes
+        return [self.text(s, e).strip('`"') for s, e in self.import_spans]
+
+    def name(self, entity: Entity) -> Optional[str]:
+        if entity.name_start < 0:
+            return None
+        return self.text(entity.name_start, entity.name_end)
 
-# import tree_sitter_dockerfile
-# import tree_sitter_markdown
-# import tree_sitter_css
+    def src(self, entity: Entity) -> str:
+        return self.text(entity.start_byte, entity.end_byte)
 
 
 class TreeSitterManager:
     """Manager for tree-sitter languages and parsing.
 
     Responsibilities:
-    - Build a language registry mapping canonical keys to Language objects.
-    - Maintain a Parser cache (one Parser per language key).
+    - Load grammars lazily: a language is imported and compiled on first use.
+    - Hand out Parsers per thread (one Parser per language key and thread), so
+      concurrent ingest jobs and planner threads parse in parallel.
     - Provide extraction helpers like extract_functions_or_blocks(text, file_path).
+    - extract(): one parse per file driven by compiled tree-sitter Query patterns,
+      returning an Extraction of byte/line offsets over the file buffer.
 
     The manager is conservative: for languages that don't have "function" nodes it
     returns an empty list so callers can fall back to file-level chunking.
     """
 
     def __init__(self):
-        # build the language registry (key -> Language)
-        self._language_registry: Dict[str, Language] = {
-            "go": Language(tree_sitter_go.language()),
-            # "html": Language(tree_sitter_html.language()),
-            # "json": Language(tree_sitter_json.language()),
-            # "typescript": Language(tree_sitter_typescript.language()), # fix no language() in ts library
-            # "toml": Language(tree_sitter_toml.language()),
-            # "yaml": Language(tree_sitter_yaml.language()),
-            # "dockerfile": Language(tree_sitter_dockerfile.language()),
-            # "markdown": Language(tree_sitter_markdown.language()),
-            # "css": Language(tree_sitter_css.language()),
-        }
+        # key -> Language, filled on first use; None marks a grammar that failed to load
+        self._language_registry: Dict[str, Optional[Language]] = {}
+        # compiled extraction queries by language key, filled together with the language;
+        # languages without a query yield no entities -> callers fall back to file-level chunking
+        self._queries: Dict[str, Query] = {}
+        self._registry_lock = threading.Lock()
 
         # extension -> key mapping
         self._ext_to_key: Dict[str, str] = {
@@ -59,24 +128,8 @@ class TreeSitterManager:
             ".css": "css",
         }
 
-        # node types to search by language key
-        # Extend this dictionary if you want to support more node names
-        self._node_selection: Dict[str, Tuple[str, ...]] = {
-            "go": ("function_declaration", "method_declaration"),
-            "ts": ("function_declaration", "method_definition", "method_signature"),
-            "tsx": ("function_declaration", "method_definition", "method_signature"),
-            # others intentionally empty -> fallback to chunking
-            "html": tuple(),
-            "json": tuple(),
-            "toml": tuple(),
-            "yaml": tuple(),
-            "md": tuple(),
-            "css": tuple(),
-            "dockerfile": tuple(),
-        }
-
-        # parser cache
-        self._parsers: Dict[str, Parser] = {}
+        # per-thread parser cache: a Parser must not be used from several threads at once
+        self._local = threading.local()
 
     def _key_for_path(self, path: Path) -> Optional[str]:
         """Return registry key for given path (handles special names like Dockerfile)."""
@@ -87,19 +140,103 @@ class TreeSitterManager:
         ext = path.suffix.lower()
         return self._ext_to_key.get(ext)
 
+    def _language(self, key: str) -> Optional[Language]:
+        if key in self._language_registry:
+            return self._language_registry[key]
+        with self._registry_lock:
+            if key in self._language_registry:
+                return self._language_registry[key]
+            lang = None
+            grammar = _GRAMMARS.get(key)
+            if grammar:
+                module_name, func = grammar
+                try:
+                    lang = Language(getattr(importlib.import_module(module_name), func)())
+                except ImportError:
+                    lang = None
+            if lang is not None and key in _QUERIES:
+                self._queries[key] = Query(lang, _QUERIES[key])
+            self._language_registry[key] = lang
+            return lang
+
     def get_parser_for_path(self, path: Path) -> Optional[Parser]:
+        """Return the calling thread's parser for the file's language."""
         key = self._key_for_path(path)
         if not key:
             return None
-        lang = self._language_registry.get(key)
+        lang = self._language(key)
         if not lang:
             return None
-        parser = self._parsers.get(key)
+        parsers = getattr(self._local, "parsers", None)
+        if parsers is None:
+            parsers = self._local.parsers = {}
+        parser = parsers.get(key)
         if parser is None:
             parser = Parser(lang)
-            self._parsers[key] = parser
+            parsers[key] = parser
         return parser
 
+    # ------------------ query-driven extraction ------------------
+    def extract(self, data: bytes, path: Path) -> Optional[Extraction]:
+        """Parse `data` once and collect package, imports and entities as offsets.
+
+        Returns None when the file's language has no parser or query.
+        """
+        parser = self.get_parser_for_path(path)
+        query = self._queries.get(self._key_for_path(path)) if parser else None
+        if query is None:
+            return None
+
+        result = Extraction(data)
+        try:
+            tree = parser.parse(data)
+        except Exception:
+            return result
+
+        entities: List[Entity] = []
+        for _, captures in QueryCursor(query).matches(tree.root_node):
+            if "package" in captures:
+                if result.package_span is None:
+                    n = captures["package"][0]
+                    result.package_span = (n.start_byte, n.end_byte)
+                continue
+            if "import" in captures:
+                n = captures["import"][0]
+                result.import_spans.append((n.start_byte, n.end_byte))
+                continue
+
+            for capture in _ENTITY_CAPTURES:
+                nodes = captures.get(capture)
+                if not nodes:
+                    continue
+                node = nodes[0]
+                kind = capture
+                if capture == "type":
+                    body = captures.get("type_body")
+                    kind = _TYPE_BODY_KINDS.get(body[0].type, "type") if body else "type"
+                name = captures.get("name")
+                entities.append(Entity(
+                    kind=kind,
+                    name_start=name[0].start_byte if name else -1,
+                    name_end=name[0].end_byte if name else -1,
+                    start_byte=node.start_byte,
+                    end_byte=node.end_byte,
+                    start_line=node.start_point.row + 1,
+                    end_line=node.end_point.row + 1,
+                ))
+                break
+
+        # document order; drop entities nested inside function/method bodies
+        entities.sort(key=lambda e: e.start_byte)
+        opaque_end = -1
+        for e in entities:
+            if e.start_byte < opaque_end:
+                continue
+            result.entities.append(e)
+            if e.kind in _OPAQUE_KINDS:
+                opaque_end = e.end_byte
+        return result
+
     # ------------------ Go-specific extractor ------------------
     def extract_go_entities(self, text: str, path: Path) -> Dict[str, Any]:
         """
@@ -107,124 +244,26 @@ class TreeSitterManager:
           - 'package': package_name or None
           - 'imports': list of import paths
           - 'entities': list of dicts {kind, name, start, end, src}
-        """
-        parser = self.get_parser_for_path(path)
-        if not parser:
-            return {"package": None, "imports": [], "entities": []}
 
-        btext = text.encode("utf8")
-        try:
-            tree = parser.parse(btext)
-        except Exception:
+        Compatibility wrapper over extract(); materializes every entity's text.
+        """
+        ex = self.extract(text.encode("utf8"), path)
+        if ex is None:
             return {"package": None, "imports": [], "entities": []}
-        root = tree.root_node
-
-        package_name = None
-        imports: List[str] = []
-        entities: List[Dict[str, Any]] = []
-
-        # helper to decode bytes slice
-        def decode_slice(s: int, e: int) -> str:
-            try:
-                return btext[s:e].decode("utf8", errors="replace")
-            except Exception:
-                return ""
-
-        # 1) extract package and imports (top-level)
-        for child in root.children:
-            # package_clause -> contains identifier node with package name
-            if child.type == "package_clause":
-                for gc in child.children:
-                    if gc.type == "package_identifier":
-                        package_name = decode_slice(gc.start_byte, gc.end_byte)
-                        break
-            # import_declaration -> collect import_spec(s)
-            elif child.type == "import_declaration":
-                for gc in child.children:
-                    if gc.type in ("import_spec_list", "import_spec"):
-                        for spec in gc.children:
-                            if spec.type == "import_spec":
-                                # import_spec may have string_literal or interpreted_string_literal
-                                for s_ch in spec.children:
-                                    if s_ch.type in ("interpreted_string_literal", "string_literal"):
-                                        # remove quotes
-                                        val = decode_slice(s_ch.start_byte, s_ch.end_byte)
-                                        val = val.strip('`"')
-                                        imports.append(val)
-                            elif spec.type in ("string_literal", "interpreted_string_literal"):
-                                val = decode_slice(spec.start_byte, spec.end_byte).strip('`"')
-                                imports.append(val)
-
-        # 2) traverse AST for entities (functions, methods, types)
-        dq = deque([root])
-        while dq:
-            n = dq.popleft()
-
-            # functions / methods
-            if n.type in ("function_declaration", "method_declaration"):
-                start, end = n.start_point.row + 1, n.end_point.row + 1
-                name = None
-                # find identifier for name
-                for c in n.children:
-                    if c.type in ("field_identifier", "identifier"):
-                        name = decode_slice(c.start_byte, c.end_byte)
-                        break
-
-                src = decode_slice(n.start_byte, n.end_byte)
-                entities.append({
-                    "kind": "method" if n.type == "method_declaration" else "function",
-                    "name": name,
-                    "start": start,
-                    "end": end,
-                    "src": src,
-                })
-
-            # type declarations (structs, interfaces, aliases)
-            elif n.type == "type_declaration":
-                # iterate children to find type_spec nodes
-                for ts in n.children:
-                    if ts.type == "type_spec":
-                        # type_spec children include 'type' and name identifier
-                        type_name = None
-                        type_kind = "type"
-                        for c in ts.children:
-                            if c.type in ("type_identifier", "type_name", "identifier"):
-                                # name of the type (varies by grammar)
-                                type_name = decode_slice(c.start_byte, c.end_byte)
-                                # continue searching for the actual type node
-                            if c.type in ("struct_type", "interface_type"):
-                                if c.type == "struct_type":
-                                    type_kind = "struct"
-                                elif c.type == "interface_type":
-                                    type_kind = "interface"
-                                # src for the whole type_spec:
-                                start, end = ts.start_point.row + 1, ts.end_point.row + 1
-                                src = decode_slice(ts.start_byte, ts.end_byte)
-                                entities.append({
-                                    "kind": type_kind,
-                                    "name": type_name,
-                                    "start": start,
-                                    "end": end,
-                                    "src": src,
-                                })
-                                break
-                        # if no struct/interface matched, still record the type_spec as generic
-                        else:
-                            start, end = ts.start_point.row + 1, ts.end_point.row + 1
-                            src = decode_slice(ts.start_byte, ts.end_byte)
-                            entities.append({
-                                "kind": "type",
-                                "name": type_name,
-                                "start": start,
-                                "end": end,
-                                "src": src,
-                            })
-
-            else:
-                # continue traversal
-                dq.extend(n.children)
-
-        return {"package": package_name, "imports": imports, "entities": entities}
+        return {
+            "package": ex.package,
+            "imports": ex.imports,
+            "entities": [
+                {
+                    "kind": e.kind,
+                    "name": ex.name(e),
+                    "start": e.start_line,
+                    "end": e.end_line,
+                    "src": ex.src(e),
+                }
+                for e in ex.entities
+            ],
+        }
 
     def extract_functions_or_blocks(self, text: str, path: Path) -> List[Tuple[int, int, Optional[str], str]]:
         """Return list of (start_byte, end_byte, name_or_None, source_text).
@@ -232,69 +271,16 @@ class TreeSitterManager:
         For languages with function-like nodes, returns those nodes. For others returns []
         (caller should fall back to file-level chunking).
         """
-        parser = self.get_parser_for_path(path)
-        if not parser:
-            return []
-        try:
-            # keep the bytes we pass to parser so byte offsets align
-            btext = text.encode("utf8")
-            tree = parser.parse(bytes(text, "utf8"))
-        except Exception:
-            return []
-        root = tree.root_node
-
-        key = self._key_for_path(path)
-        node_types = self._node_selection.get(key, tuple())
-        if not node_types:
+        ex = self.extract(text.encode("utf8"), path)
+        if ex is None:
             return []
-
-        results: List[Tuple[int, int, Optional[str], str]] = []
-        dq = deque([root])
-        # common child node types that can hold names in various grammars:
-        name_node_types = ("identifier", "name", "property_identifier", "field_identifier", "field_name")
-
-        while dq:
-            n = dq.popleft()
-            if n.type in node_types:
-                start, end = n.start_byte, n.end_byte
-                # look for a name-ish child (search deeper if needed)
-                name = None
-
-                # first try direct children
-                for c in n.children:
-                    if c.type in name_node_types:
-                        try:
-                            # slice from the bytes, then decode to str
-                            name = btext[c.start_byte:c.end_byte].decode("utf8", errors="replace")
-                        except Exception:
-                            name = None
-                        break
-
-                # as fallback, search grandchildren (some grammars nest the identifier)
-                if name is None:
-                    # shallow BFS limited depth 2
-                    for c in n.children:
-                        for gc in c.children:
-                            if gc.type in name_node_types:
-                                try:
-                                    name = btext[gc.start_byte:gc.end_byte].decode("utf8", errors="replace")
-                                except Exception:
-                                    name = None
-                                break
-                        if name:
-                            break
-
-                try:
-                    src = btext[start:end].decode("utf8", errors="replace")
-                except Exception:
-                    src = ""
-                results.append((start, end, name, src))
-            else:
-                dq.extend(n.children)
-        return results
+        return [
+            (e.start_byte, e.end_byte, ex.name(e), ex.src(e))
+            for e in ex.entities
+            if e.kind in _OPAQUE_KINDS
+        ]
 
     # convenience helper for callers that only have extension string
     def extract_by_extension(self, text: str, extension: str) -> List[Tuple[int, int, Optional[str], str]]:
         fake_path = Path(f"/tmp/file{extension}")
         return self.extract_functions_or_blocks(text, fake_path)
-
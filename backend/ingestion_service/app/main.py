@@ -7,18 +7,14 @@ from fastapi import FastAPI
 
 from app.api.routes.ingest import router as ingest_router
 from app.api.routes.rag import router as rag_router
+from app.api.routes.metrics import router as metrics_router
 from app.core.config import settings
-from app.api.deps import get_embedder, get_treesitter
+from app.core.logging import setup_logging
+from app.api.deps import get_embedder, get_plan_pool, get_qdrant_registry, get_treesitter
 
 logger = logging.getLogger("ingestion_service")
 
 
-def setup_logging() -> None:
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
-    )
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging()
@@ -35,6 +31,9 @@ async def lifespan(app: FastAPI):
         get_treesitter()
         logger.info("Warmup: tree-sitter initialized.")
 
+        if get_plan_pool() is not None:
+            logger.info("Warmup: parse process pool started (workers=%d).", settings.parse_processes)
+
         try:
             emb.encode(["warmup"], prompt_name="code2code_document")
             logger.info("Warmup: embedder encode OK.")
@@ -51,6 +50,10 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("Service shutting down: %s", settings.service_name)
+    pool = get_plan_pool()
+    if pool is not None:
+        pool.shutdown()
+    await get_qdrant_registry().aclose()
 
 
 def create_app() -> FastAPI:
@@ -62,6 +65,7 @@ def create_app() -> FastAPI:
 
     app.include_router(ingest_router)
     app.include_router(rag_router)
+    app.include_router(metrics_router)
     return app
 
 
@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+
+@dataclass(slots=True)
+class PendingChunk:
+    """A chunk waiting for its embedding together with everything needed to upsert it."""
+
+    file_hash: str
+    chunk_index: int
+    text: str
+    n_tokens: int
+    payload: Dict[str, Any]
+
+
+class LengthBucketBatcher:
+    """Collects chunks from many files and emits length-homogeneous embedding batches.
+
+    Chunks are routed into buckets `bucket_width` tokens wide; a bucket is emitted as
+    soon as it holds `batch_size` chunks, so every forward pass runs over sequences of
+    similar length instead of padding small chunks up to the longest one.
+
+    Chunk lengths are bounded by `max_tokens`, so at most
+    ceil(max_tokens / bucket_width) * batch_size chunks are ever held back.
+    """
+
+    def __init__(self, batch_size: int, bucket_width: int):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be > 0")
+        if bucket_width <= 0:
+            raise ValueError("bucket_width must be > 0")
+        self.batch_size = batch_size
+        self.bucket_width = bucket_width
+        self._buckets: Dict[int, List[PendingChunk]] = {}
+
+    def _bucket_key(self, n_tokens: int) -> int:
+        return max(0, n_tokens - 1) // self.bucket_width
+
+    def add(self, chunk: PendingChunk) -> List[List[PendingChunk]]:
+        """Add a chunk; returns the batches that became full (usually none or one)."""
+
+        key = self._bucket_key(chunk.n_tokens)
+        bucket = self._buckets.setdefault(key, [])
+        bucket.append(chunk)
+        if len(bucket) >= self.batch_size:
+            return [self._buckets.pop(key)]
+        return []
+
+    def drain(self) -> List[List[PendingChunk]]:
+        """Flush all partially filled buckets.
+
+        Leftovers are sorted by length before being cut into batches, so neighbouring
+        buckets end up packed together rather than emitted as many tiny batches.
+        """
+
+        leftovers = [c for key in sorted(self._buckets) for c in self._buckets[key]]
+        self._buckets = {}
+        leftovers.sort(key=lambda c: c.n_tokens)
+        return [leftovers[i:i + self.batch_size] for i in range(0, len(leftovers), self.batch_size)]
+
+    @property
+    def pending(self) -> int:
+        return sum(len(b) for b in self._buckets.values())
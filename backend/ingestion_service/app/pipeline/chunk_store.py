@@ -0,0 +1,250 @@
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import AbstractSet, Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkStore:
+    """Content-addressed, memory-mapped store of indexed file contents.
+
+    One record per file, keyed by its git blob sha: the utf-8 text the chunks were cut
+    from, plus small shared metadata (package, imports). Qdrant points then carry only
+    (file_hash, body_start, body_end) byte offsets instead of the chunk body, and
+    read_many() hydrates the bodies of the final search hits in one batch.
+
+    Layout under `root`:
+      segments/<id>.seg   append-only record data; each writer process appends to its own
+                          segment, so writers never contend on a file
+      index.sqlite        files: file_hash -> (segment, offset, length, meta, added_at)
+                          refs:  (collection, file_path) -> file_hash
+
+    Readers mmap segments and slice them. Records are immutable, and identical files
+    across repos, branches and re-indexes are stored once.
+
+    A finished ingest records which file each path of its collection refers to
+    (set_refs). prune() deletes records no collection refers to once they are older
+    than `prune_grace_s` (younger ones may belong to an ingest still running), and
+    segments left without records. Records stored before refs existed are never pruned.
+    """
+
+    def __init__(self, root: str | Path, segment_max_bytes: int = 256 * 1024 * 1024,
+                 prune_grace_s: float = 86400.0):
+        self.root = Path(root)
+        self.segment_max_bytes = segment_max_bytes
+        self.prune_grace_s = prune_grace_s
+        (self.root / "segments").mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " key TEXT PRIMARY KEY,"
+            " segment TEXT NOT NULL,"
+            " offset INTEGER NOT NULL,"
+            " length INTEGER NOT NULL,"
+            " meta TEXT NOT NULL,"
+            " added_at INTEGER"
+            ") WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+        if "added_at" not in columns:
+            # stores created before pruning: their records keep added_at NULL (never pruned)
+            self._conn.execute("ALTER TABLE files ADD COLUMN added_at INTEGER")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refs ("
+            " collection TEXT NOT NULL,"
+            " file_path TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " PRIMARY KEY (collection, file_path)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_refs_key ON refs(key)")
+
+        self._segment: Optional[str] = None
+        self._segment_fh = None
+        self._segment_size = 0
+        # segment -> mmap; remapped when a record lies beyond the mapped size
+        self._maps: Dict[str, mmap.mmap] = {}
+
+    # ------------------ write ------------------
+    def has(self, file_hash: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM files WHERE key = ?", (file_hash,)).fetchone()
+        return row is not None
+
+    def put(self, file_hash: str, data: bytes, meta: Dict[str, Any]) -> None:
+        """Store a file record; a no-op when the content is already stored."""
+
+        now = time.time_ns()
+        with self._lock:
+            row = self._conn.execute("SELECT added_at FROM files WHERE key = ?", (file_hash,)).fetchone()
+            if row is not None:
+                if row[0] is None:
+                    # a record from before pruning, indexed again: from now on it is tracked
+                    self._conn.execute("UPDATE files SET added_at = ? WHERE key = ?", (now, file_hash))
+                return
+            segment, offset = self._append(data)
+            # the index row is written after the data, so readers never see a partial record
+            self._conn.execute(
+                "INSERT OR IGNORE INTO files (key, segment, offset, length, meta, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (file_hash, segment, offset, len(data), json.dumps(meta), now),
+            )
+
+    def _append(self, data: bytes) -> Tuple[str, int]:
+        # caller holds the lock; a segment deleted by prune() (st_nlink 0) is not appended to
+        if (
+            self._segment_fh is None
+            or self._segment_size + len(data) > self.segment_max_bytes
+            or os.fstat(self._segment_fh.fileno()).st_nlink == 0
+        ):
+            if self._segment_fh is not None:
+                self._segment_fh.close()
+            self._segment = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+            self._segment_fh = open(self.root / "segments" / f"{self._segment}.seg", "ab")
+            self._segment_size = 0
+        offset = self._segment_size
+        self._segment_fh.write(data)
+        self._segment_fh.flush()
+        self._segment_size += len(data)
+        return self._segment, offset
+
+    # ------------------ read ------------------
+    def _lookup(self, keys: Sequence[str]) -> Dict[str, Tuple[str, int, int, str]]:
+        found: Dict[str, Tuple[str, int, int, str]] = {}
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # sqlite limits bound parameters per statement, so look up in slices
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, segment, offset, length, meta FROM files WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for key, segment, offset, length, meta in rows:
+                    found[key] = (segment, offset, length, meta)
+        return found
+
+    def _map(self, segment: str, end: int) -> mmap.mmap:
+        with self._lock:
+            mm = self._maps.get(segment)
+            if mm is None or len(mm) < end:
+                # the old map is not closed: another thread may still be slicing it
+                with open(self.root / "segments" / f"{segment}.seg", "rb") as fh:
+                    mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mm
+            return mm
+
+    def read_many(self, spans: Sequence[Tuple[str, int, int]]) -> List[Optional[str]]:
+        """Texts of (file_hash, start, end) byte spans, aligned with `spans` (None if unknown)."""
+
+        records = self._lookup([file_hash for file_hash, _, _ in spans])
+        out: List[Optional[str]] = []
+        for file_hash, start, end in spans:
+            rec = records.get(file_hash)
+            if rec is None:
+                out.append(None)
+                continue
+            segment, offset, length, _ = rec
+            start, end = max(0, start), min(length, end)
+            if start >= end:
+                out.append("")
+                continue
+            mm = self._map(segment, offset + length)
+            out.append(mm[offset + start:offset + end].decode("utf-8", errors="replace"))
+        return out
+
+    def get_meta_many(self, file_hashes: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        return {key: json.loads(rec[3]) for key, rec in self._lookup(file_hashes).items()}
+
+    # ------------------ references / pruning ------------------
+    def set_refs(self, collection: str, refs: Mapping[str, str],
+                 replaced_paths: Optional[AbstractSet[str]] = None) -> None:
+        """Record the file_hash of each file_path of `collection` after an ingest.
+
+        A full ingest (`replaced_paths` None) replaces every ref of the collection; an
+        incremental one drops the refs of `replaced_paths` (changed and deleted files) first.
+        """
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if replaced_paths is None:
+                    self._conn.execute("DELETE FROM refs WHERE collection = ?", (collection,))
+                else:
+                    self._conn.executemany(
+                        "DELETE FROM refs WHERE collection = ? AND file_path = ?",
+                        [(collection, path) for path in replaced_paths],
+                    )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO refs (collection, file_path, key) VALUES (?, ?, ?)",
+                    [(collection, path, key) for path, key in refs.items()],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def drop_refs(self, collection: str) -> None:
+        """Forget a deleted collection; its records are pruned once nothing else refers to them."""
+        with self._lock:
+            self._conn.execute("DELETE FROM refs WHERE collection = ?", (collection,))
+
+    def prune(self) -> int:
+        """Delete unreferenced records older than `prune_grace_s` and segments without records.
+
+        Returns the number of records deleted. Segment space is reclaimed only once every
+        record of a segment is gone.
+        """
+
+        cutoff_ns = time.time_ns() - int(self.prune_grace_s * 1e9)
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM files WHERE added_at IS NOT NULL AND added_at < ?"
+                " AND NOT EXISTS (SELECT 1 FROM refs WHERE refs.key = files.key)",
+                (cutoff_ns,),
+            ).rowcount
+            live = {row[0] for row in self._conn.execute("SELECT DISTINCT segment FROM files")}
+            own = self._segment
+
+        removed = []
+        for path in (self.root / "segments").glob("*.seg"):
+            segment = path.stem
+            if segment in live or segment == own:
+                continue
+            try:
+                # a segment another writer just opened has no records yet either
+                if path.stat().st_mtime_ns >= cutoff_ns:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed.append(segment)
+        if removed:
+            with self._lock:
+                for segment in removed:
+                    # not closed: a reader may still be slicing a record it looked up before
+                    self._maps.pop(segment, None)
+        if deleted or removed:
+            logger.info("Chunk store pruned %d records, %d segments", deleted, len(removed))
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment_fh is not None:
+                self._segment_fh.close()
+                self._segment_fh = None
+            for mm in self._maps.values():
+                mm.close()
+            self._maps.clear()
+            self._conn.close()
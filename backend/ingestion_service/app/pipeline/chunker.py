@@ -0,0 +1,96 @@
+from typing import Iterator, List, Tuple
+
+from transformers import AutoTokenizer
+
+
+class Chunker:
+    """Tokenizer-only half of the Embedder: token counting and token-window chunking.
+
+    Kept separate from the model so parse/plan worker processes can load it
+    without importing torch or the embedding weights.
+
+    Texts are tokenized once, with offset mappings; windows are sliced out of the
+    original string, so chunk text is byte-identical to the source and no decode
+    round-trip is needed.
+    """
+
+    def __init__(self, model_name: str):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True, use_fast=True)
+        # special tokens the model adds around every sequence; they count against max_tokens
+        self.n_special = self.tokenizer.num_special_tokens_to_add(pair=False)
+
+    def count_tokens(self, text: str) -> int:
+        enc = self.tokenizer(text, return_attention_mask=False, add_special_tokens=True)
+        return len(enc["input_ids"])
+
+    @staticmethod
+    def _windows(n: int, size: int, overlap: int) -> Iterator[Tuple[int, int]]:
+        i = 0
+        while i < n:
+            j = min(i + size, n)
+            yield i, j
+            # If we reached the end, break (prevents reset to 0)
+            if j >= n:
+                break
+            # advance - ensure progress (j - overlap > i)
+            i = max(j - overlap, i + 1)
+
+    def split_many(self, texts: List[str], max_tokens: int, overlap: int) -> List[List[Tuple[int, int, int]]]:
+        """
+            For each text returns a list of (char_start, char_end, n_tokens) windows.
+            All texts are tokenized in a single batched call (parallel in the Rust tokenizer).
+            A text that fits into max_tokens yields one window covering the whole string.
+        """
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be > 0")
+        if not texts:
+            return []
+        size = max(1, max_tokens - self.n_special)
+        if overlap >= size:
+            overlap = max(0, size - 1)
+
+        enc = self.tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            truncation=False,
+        )
+
+        result: List[List[Tuple[int, int, int]]] = []
+        for text, offsets in zip(texts, enc["offset_mapping"]):
+            n = len(offsets)
+            if n == 0:
+                result.append([])
+            elif n <= size:
+                result.append([(0, len(text), n + self.n_special)])
+            else:
+                result.append([
+                    (offsets[i][0], offsets[j - 1][1], j - i + self.n_special)
+                    for i, j in self._windows(n, size, overlap)
+                ])
+        return result
+
+    def chunk_by_tokens(self, text: str, max_tokens: int, overlap: int):
+        """
+            Returns list of (start_token_index, end_token_index, chunk_text).
+            Token indices exclude special tokens; chunk_text is a slice of `text`.
+        """
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be > 0")
+        size = max(1, max_tokens - self.n_special)
+        if overlap >= size:
+            overlap = max(0, size - 1)
+
+        enc = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            truncation=False,
+        )
+        offsets = enc["offset_mapping"]
+        return [
+            (i, j, text[offsets[i][0]:offsets[j - 1][1]])
+            for i, j in self._windows(len(offsets), size, overlap)
+        ]
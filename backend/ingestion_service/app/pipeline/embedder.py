@@ -1,10 +1,18 @@
+import asyncio
+
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from transformers import AutoTokenizer
 from torch import cuda, bfloat16
 
+from app.pipeline.chunker import Chunker
+from app.pipeline.embedding_cache import EmbeddingCache
+from app.pipeline.scheduler import EmbeddingScheduler
+
 class Embedder:
-    def __init__(self, model_name: str):
+    def __init__(self, model_name: str, cache: EmbeddingCache | None = None,
+                 cached_prompts: tuple[str, ...] = ("code2code_document",),
+                 batching: bool = True, max_batch: int = 64, batch_window_ms: float = 5.0):
+        self.model_name = model_name
         device = "cuda" if cuda.is_available() else "cpu"
         self.model = SentenceTransformer(
             model_name,
@@ -12,59 +20,51 @@ class Embedder:
             model_kwargs={"dtype": bfloat16} if device == "cuda" else None,
             tokenizer_kwargs={"padding_side": "left"},
         )
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True, use_fast=True)
+        self.chunker = Chunker(model_name)
+        self.tokenizer = self.chunker.tokenizer
+        # only document embeddings go to the disk cache; one-off queries would just churn it
+        self.cache = cache
+        self.cached_prompts = cached_prompts
+        # all forward passes (queries and ingest jobs) go through one micro-batching scheduler
+        self.scheduler = EmbeddingScheduler(
+            self._forward, max_batch=max_batch, window_ms=batch_window_ms,
+        ) if batching else None
 
     def count_tokens(self, text: str) -> int:
-        enc = self.tokenizer(text, return_attention_mask=False, add_special_tokens=True)
-        return len(enc["input_ids"])
+        return self.chunker.count_tokens(text)
 
     def chunk_by_tokens(self, text: str, max_tokens: int, overlap: int):
-        """
-            Returns list of (start_token_index, end_token_index, chunk_text)
-            using the tokenizer so indices align with tokenization used for embeddings.
-            This implementation is simple: it tokenizes then decodes token slices.
-        """
-        if max_tokens <= 0:
-            raise ValueError("max_tokens must be > 0")
-        if overlap >= max_tokens:
-            overlap = max(1, max_tokens - 1)
-
-        # tokenize (get ids)
-        enc = self.tokenizer(text, return_tensors=None, add_special_tokens=True, truncation=False)
-        token_ids = enc["input_ids"]
-        n = len(token_ids)
-        if n == 0:
-            return []
+        return self.chunker.chunk_by_tokens(text, max_tokens, overlap)
 
-        chunks = []
-        i = 0
-        while i < n:
-            j = min(i + max_tokens, n)
-            # Take slice [i:j)
-            chunk_tok_ids = token_ids[i:j]
-            # decode token slice back to string
-            chunk_text = self.tokenizer.decode(chunk_tok_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False)
-            chunks.append((i, j, chunk_text))
+    def encode(self, texts: list[str], prompt_name: str):
+        if self.cache is None or prompt_name not in self.cached_prompts or not texts:
+            return self._encode(texts, prompt_name)
 
-            # If we reached the end, break (prevents reset to 0)
-            if j >= n:
-                break
+        vectors = self.cache.get_many(self.model_name, prompt_name, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = self._encode([texts[i] for i in missing], prompt_name)
+            self.cache.put_many(self.model_name, prompt_name, [texts[i] for i in missing], fresh)
+            for i, v in zip(missing, fresh):
+                vectors[i] = v
+        return np.stack(vectors).astype(np.float32, copy=False)
 
-            # advance - ensure progress (j - overlap > i)
-            next_i = j - overlap
-            if next_i <= i:
-                # fallback: ensure at least move by 1 token to avoid infinite loop
-                next_i = i + 1
-            i = next_i
+    async def aencode(self, texts: list[str], prompt_name: str):
+        """encode() for async callers: waits on the scheduler without holding a thread."""
+        if self.scheduler is None or prompt_name in self.cached_prompts or len(texts) > self.scheduler.max_batch:
+            return await asyncio.to_thread(self.encode, texts, prompt_name)
+        return await asyncio.wrap_future(self.scheduler.submit(texts, prompt_name))
 
-        # return token index ranges and chunk text; caller currently uses only chunk_text.
-        return chunks
+    def _encode(self, texts: list[str], prompt_name: str):
+        if self.scheduler is not None and texts:
+            return self.scheduler.encode(texts, prompt_name)
+        return self._forward(texts, prompt_name)
 
-    def encode(self, texts: list[str], prompt_name: str):
+    def _forward(self, texts: list[str], prompt_name: str):
         emb = self.model.encode(
             texts,
             prompt_name=prompt_name,
-            show_progress_bar=True,
+            show_progress_bar=False,
             convert_to_numpy=True,
         )
         emb = np.asarray(emb)
@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_DTYPES = {"float16": np.float16, "float32": np.float32}
+
+
+class EmbeddingCache:
+    """Disk-backed, content-addressed embedding cache (sqlite).
+
+    Keys are sha256(model_name, prompt_name, text), so identical chunks are embedded
+    once across re-indexes, forks and vendored copies. Vectors are stored as raw
+    float16 (or float32) bytes. When the stored size exceeds `max_bytes` the least
+    recently used entries are evicted down to `low_watermark * max_bytes`.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int, dtype: str = "float16", low_watermark: float = 0.9):
+        if dtype not in _DTYPES:
+            raise ValueError(f"unsupported cache dtype {dtype!r}")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        self._dtype = _DTYPES[dtype]
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY,"
+            " vec BLOB NOT NULL,"
+            " last_used INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings(last_used)")
+        self._size_bytes = self._conn.execute("SELECT COALESCE(SUM(length(vec)), 0) FROM embeddings").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_name: str, prompt_name: str, text: str) -> bytes:
+        h = hashlib.sha256()
+        h.update(model_name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(prompt_name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8", errors="surrogatepass"))
+        return h.digest()
+
+    def get_many(self, model_name: str, prompt_name: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return cached float32 vectors aligned with `texts` (None for misses)."""
+
+        keys = [self.make_key(model_name, prompt_name, t) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        now = time.time_ns()
+        with self._lock:
+            # sqlite limits bound parameters per statement, so look up in slices
+            for i in range(0, len(keys), 500):
+                part = list(dict.fromkeys(keys[i:i + 500]))
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=self._dtype).astype(np.float32)
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+            out = [found.get(k) for k in keys]
+            hits = sum(v is not None for v in out)
+            self.hits += hits
+            self.misses += len(out) - hits
+        return out
+
+    def put_many(self, model_name: str, prompt_name: str, texts: Sequence[str], vectors: np.ndarray) -> None:
+        now = time.time_ns()
+        rows = [
+            (self.make_key(model_name, prompt_name, t), np.asarray(v, dtype=self._dtype).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            cur = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings(key, vec, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+            if cur.rowcount > 0:
+                # all vectors of one model have the same size
+                self._size_bytes += cur.rowcount * len(rows[0][1])
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        target = int(self.max_bytes * self.low_watermark)
+        while self._size_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, length(vec) FROM embeddings ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._size_bytes = 0
+                break
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                self._size_bytes -= size
+                if self._size_bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+            self.evictions += len(victims)
+        logger.info("Embedding cache evicted down to %d bytes (evictions total %d)", self._size_bytes, self.evictions)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits, misses, evictions, size_bytes = self.hits, self.misses, self.evictions, self._size_bytes
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "evictions": evictions,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
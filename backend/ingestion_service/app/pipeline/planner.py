@@ -0,0 +1,181 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.pipeline.batcher import PendingChunk
+from app.pipeline.sources import SourceFile
+
+
+def _canonical_utf8(data: bytes) -> bytes:
+    """`data` itself when it is valid utf-8, else its lossy re-encoding.
+
+    Chunks are cut from this buffer, so byte offsets recorded for the chunk store
+    always point into exactly the bytes that get stored.
+    """
+    if data.isascii():
+        return data
+    try:
+        data.decode("utf-8")
+        return data
+    except UnicodeDecodeError:
+        return data.decode("utf-8", errors="replace").encode("utf-8")
+
+
+def _byte_span(text: str, start: int, end: int, base: int) -> Tuple[int, int]:
+    # char offsets in `text` -> byte offsets in the utf-8 buffer `text` starts at `base` of
+    if text.isascii():
+        return base + start, base + end
+    byte_start = base + len(text[:start].encode("utf-8"))
+    return byte_start, byte_start + len(text[start:end].encode("utf-8"))
+
+
+@dataclass(slots=True)
+class FilePlan:
+    """Compact chunk plan of one file.
+
+    File-level metadata is stored once; chunks reference their entity by index, so the
+    plan stays small when it crosses a process boundary.
+    """
+
+    file_hash: str
+    rel_path: str
+    language: str
+    package: str
+    imports: str
+    # (kind, name, start_line, end_line)
+    entities: List[Tuple[str, Optional[str], int, int]]
+    # (chunk_text, n_tokens, entity_index or -1, byte_start, byte_end)
+    chunks: List[Tuple[str, int, int, int, int]]
+    # utf-8 content the byte offsets refer to; only kept for the chunk store
+    data: Optional[bytes] = None
+
+    def to_pending(self, repo_name: str, external_bodies: bool = False) -> List[PendingChunk]:
+        """Build the points' payloads.
+
+        With external_bodies, the body and the file-level package/imports live in the
+        chunk store; the payload carries (file_hash, body_start, body_end) instead.
+        """
+        pending: List[PendingChunk] = []
+        for idx, (ctext, n_tokens, entity_idx, byte_start, byte_end) in enumerate(self.chunks):
+            payload = {
+                "repo": repo_name,
+                "file_path": self.rel_path,
+                "language": self.language,
+                "chunk_index": idx,
+            }
+            if external_bodies:
+                payload |= {"file_hash": self.file_hash, "body_start": byte_start, "body_end": byte_end}
+            else:
+                payload["body"] = ctext
+            if entity_idx >= 0:
+                kind, name, start, end = self.entities[entity_idx]
+                if not external_bodies:
+                    payload |= {"package": self.package, "imports": self.imports}
+                payload |= {
+                    "kind": kind,
+                    "name": name,
+                    "start_code_line": start,
+                    "end_code_line": end,
+                }
+            pending.append(PendingChunk(
+                file_hash=self.file_hash,
+                chunk_index=idx,
+                text=ctext,
+                n_tokens=n_tokens,
+                payload=payload,
+            ))
+        return pending
+
+
+def plan_file(source: SourceFile, treesitter, chunker, keep_data: bool = False) -> FilePlan:
+    """Read, parse and chunk a single file.
+
+    `chunker` is a Chunker; entities and files are tokenized exactly once.
+    With keep_data the plan carries the file content for the chunk store.
+    """
+
+    raw, file_hash = source.load()
+    data = _canonical_utf8(raw)
+    rel_path = source.rel_path
+    file_path = PurePosixPath(rel_path)
+    language = "Dockerfile" if file_path.name == "Dockerfile" else file_path.suffix.lstrip(".")
+
+    plan = FilePlan(
+        file_hash=file_hash,
+        rel_path=rel_path,
+        language=language,
+        package="",
+        imports="",
+        entities=[],
+        chunks=[],
+        data=data if keep_data else None,
+    )
+    extraction = treesitter.extract(data, file_path) if language == "go" else None
+    if extraction is not None:
+        # the tree holds byte offsets into `data`; only entity sources are ever decoded
+        plan.package = extraction.package or ""
+        plan.imports = "\n".join(extraction.imports)
+        sources = [extraction.src(e) for e in extraction.entities]
+        # one batched tokenizer call for all entities of the file
+        windows = chunker.split_many(sources, settings.max_tokens, settings.overlap)
+        for entity, src, spans in zip(extraction.entities, sources, windows):
+            entity_idx = len(plan.entities)
+            plan.entities.append((entity.kind, extraction.name(entity), entity.start_line, entity.end_line))
+            for start, end, n_tokens in spans:
+                plan.chunks.append((src[start:end], n_tokens, entity_idx, *_byte_span(src, start, end, entity.start_byte)))
+    else:
+        text = data.decode("utf-8")
+        for start, end, n_tokens in chunker.split_many([text], settings.max_tokens, settings.overlap)[0]:
+            plan.chunks.append((text[start:end], n_tokens, -1, *_byte_span(text, start, end, 0)))
+    return plan
+
+
+# ------------------ process pool ------------------
+
+# per-process state of pool workers, created once by _init_worker
+_worker_treesitter = None
+_worker_chunker = None
+
+
+def _init_worker(model_name: str) -> None:
+    global _worker_treesitter, _worker_chunker
+    from app.infra.treesitter_client import TreeSitterManager
+    from app.pipeline.chunker import Chunker
+
+    _worker_treesitter = TreeSitterManager()
+    _worker_chunker = Chunker(model_name)
+
+
+def _plan_in_worker(source: SourceFile, keep_data: bool) -> FilePlan:
+    return plan_file(source, _worker_treesitter, _worker_chunker, keep_data)
+
+
+class PlanPool:
+    """Process pool that parses and chunk-plans files on several cores.
+
+    Workers load only tree-sitter and the tokenizer (not the embedding model) and
+    return compact FilePlan objects. The pool is long-lived and shared by all jobs,
+    since starting a worker means loading the tokenizer.
+    """
+
+    def __init__(self, workers: int, model_name: str):
+        if workers <= 0:
+            raise ValueError("workers must be > 0")
+        self.workers = workers
+        # spawn, not fork: the parent holds torch / tokenizer threads that don't survive fork
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name,),
+        )
+
+    def plan(self, source: SourceFile, keep_data: bool = False) -> FilePlan:
+        # worktree files are read by the worker itself; streamed blobs travel with their content
+        return self._executor.submit(_plan_in_worker, source, keep_data).result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,64 +1,192 @@
-from hashlib import sha1
-from pathlib import Path
+import queue
+import threading
+import time
+from typing import AbstractSet, Callable, Dict, Iterable, List, Optional
+
 from app.core.config import settings
-from app.pipeline.traversal import iterate_source_files
+from app.pipeline.batcher import LengthBucketBatcher, PendingChunk
+from app.pipeline.chunk_store import ChunkStore
+from app.pipeline.planner import PlanPool, plan_file
+from app.pipeline.sources import SourceFile
+from app.pipeline.symbol_index import Symbol, plan_symbols
+from app.pipeline.stages import END, StageGroup
+
+
+def _upsert_batch(batch: List[PendingChunk], embeddings, qdrant) -> None:
+    # the (n, dim) array goes to Qdrant as is; no per-vector Python float lists
+    qdrant.add_vectors(
+        keys=[(chunk.file_hash, chunk.chunk_index) for chunk in batch],
+        vectors=embeddings,
+        payloads=[chunk.payload for chunk in batch],
+    )
+
+
+class _FileTracker:
+    """Counts the chunks of each file still to be handed to the uploader."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._remaining: Dict[str, int] = {}
+        self._ready: List[str] = []
+
+    def add(self, rel_path: str, n_chunks: int) -> None:
+        with self._lock:
+            if n_chunks:
+                self._remaining[rel_path] = n_chunks
+            else:
+                self._ready.append(rel_path)
+
+    def uploaded(self, batch: List[PendingChunk]) -> None:
+        with self._lock:
+            for chunk in batch:
+                path = chunk.payload["file_path"]
+                self._remaining[path] -= 1
+                if not self._remaining[path]:
+                    del self._remaining[path]
+                    self._ready.append(path)
+
+    def take_ready(self) -> List[str]:
+        with self._lock:
+            ready, self._ready = self._ready, []
+        return ready
+
+
+def process_repo_and_upsert(
+    files: Iterable[SourceFile],
+    repo_name: str,
+    treesitter,
+    embedder,
+    qdrant,
+    plan_pool: Optional[PlanPool] = None,
+    chunk_store: Optional[ChunkStore] = None,
+    symbols: Optional[List[Symbol]] = None,
+    stored_files: Optional[Dict[str, str]] = None,
+    skip_files: AbstractSet[str] = frozenset(),
+    on_checkpoint: Optional[Callable[[List[str]], None]] = None,
+    cancel: Optional[threading.Event] = None,
+):
+    """Index the repository files produced by `files` into `qdrant`.
+
+    `files` is a worktree walk or a stream of blobs read from git objects
+    (see app.pipeline.sources). Runs as a staged pipeline connected by bounded queues:
+      feed (iterate files) -> plan x N (read/parse/chunk) -> embed (this thread) -> upload
+    so file I/O and parsing, forward passes and Qdrant round-trips overlap.
+    Chunk order within a file is fixed, so point ids stay deterministic even though
+    files complete out of order.
 
+    With `plan_pool` the planner threads only dispatch files to the process pool,
+    so parsing and chunk planning use several cores.
 
-def process_repo_and_upsert(root_path: Path, repo_name: str, treesitter, embedder, qdrant):
+    With `chunk_store` file contents go to the store (before any of their points are
+    upserted) and points carry body offsets instead of bodies.
+
+    With `symbols` the named entities of all files are appended to that list
+    (see app.pipeline.symbol_index). With `stored_files` (and `chunk_store`) the
+    file_hash of every file put into the store is recorded by path (ChunkStore.set_refs).
+
+    Files in `skip_files` were finished by an earlier attempt: they are not embedded
+    again (only planned when their symbols or store refs are needed). With `on_checkpoint`, every
+    `checkpoint_interval_s` the upload stage waits until Qdrant acknowledged all queued
+    points and reports the files that are now completely uploaded.
+
+    Setting `cancel` stops every stage; the call then raises PipelineCancelled and
+    nothing is flushed.
+    """
     qdrant.init_collection(settings.vector_size)
 
-    for file_path in iterate_source_files(root_path):
-        text = file_path.read_text(encoding="utf-8", errors="ignore")
-        file_hash = sha1(text.encode('utf-8')).hexdigest()
-        rel_path = str(file_path.relative_to(root_path))
-        language = "Dockerfile" if file_path.name == "Dockerfile" else file_path.suffix.lstrip(".")
-
-        chunks = []
-        if language == "go":
-            file_data = treesitter.extract_go_entities(text, file_path)
-            package = file_data["package"] or ""
-            imports = "\n".join(file_data["imports"])
-            for entity in file_data["entities"]:
-                src = entity["src"]
-                if embedder.count_tokens(src) > settings.max_tokens:
-                    for _, _, ctext in embedder.chunk_by_tokens(src, settings.max_tokens, settings.overlap):
-                        chunks.append((rel_path, package, imports, entity, ctext))
-                else:
-                    chunks.append((rel_path, package, imports, entity, src))
-        else:
-            for _, _, ctext in embedder.chunk_by_tokens(text, settings.max_tokens, settings.overlap):
-                chunks.append((rel_path, "", "", None, ctext))
-
-        sentences = [c[4] for c in chunks]
-        if not sentences:
-            continue
-
-        embeddings = embedder.encode(sentences, prompt_name="code2code_document")
-
-        for idx, (rel_path, package, imports, entity, src) in enumerate(chunks):
-            payload = {
-                "repo": repo_name,
-                "file_path": rel_path,
-                "language": language,
-                "chunk_index": idx,
-                "body": src,
-            }
-            if entity:
-                payload |= {
-                    "package": package,
-                    "imports": imports,
-                    "kind": entity["kind"],
-                    "name": entity["name"],
-                    "start_code_line": entity["start"],
-                    "end_code_line": entity["end"],
-                }
-
-            qdrant.add_point_from_vector(
-                file_hash=file_hash,
-                chunk_index=idx,
-                vector=embeddings[idx].astype(float).tolist(),
-                payload=payload,
-            )
-
-    qdrant.flush()
+    if plan_pool is not None:
+        # two in-flight files per worker process keeps the pool saturated
+        n_planners = 2 * plan_pool.workers
+    else:
+        n_planners = max(1, settings.parse_workers)
+    files_q: queue.Queue = queue.Queue(maxsize=settings.pipeline_queue_size)
+    plans_q: queue.Queue = queue.Queue(maxsize=settings.pipeline_queue_size)
+    upload_q: queue.Queue = queue.Queue(maxsize=settings.upload_queue_size)
+    stages = StageGroup(cancel)
+
+    def feed():
+        for source in files:
+            stages.put(files_q, source)
+        for _ in range(n_planners):
+            stages.put(files_q, END)
+
+    external_bodies = chunk_store is not None
+    tracker = _FileTracker() if on_checkpoint is not None else None
+
+    def plan():
+        while (source := stages.get(files_q)) is not END:
+            skipped = source.rel_path in skip_files
+            if skipped and symbols is None and stored_files is None:
+                continue
+            if plan_pool is not None:
+                file_plan = plan_pool.plan(source, keep_data=external_bodies)
+            else:
+                file_plan = plan_file(source, treesitter, embedder.chunker, keep_data=external_bodies)
+            if external_bodies and file_plan.chunks:
+                chunk_store.put(file_plan.file_hash, file_plan.data, {
+                    "package": file_plan.package,
+                    "imports": file_plan.imports,
+                })
+                if stored_files is not None:
+                    stored_files[file_plan.rel_path] = file_plan.file_hash
+            if symbols is not None:
+                symbols.extend(plan_symbols(file_plan))
+            if skipped:
+                continue
+            if tracker is not None:
+                tracker.add(file_plan.rel_path, len(file_plan.chunks))
+            stages.put(plans_q, file_plan.to_pending(repo_name, external_bodies=external_bodies))
+        stages.put(plans_q, END)
+
+    def embed():
+        # chunks of many files are pooled and embedded in length-bucketed batches;
+        # each PendingChunk carries its own (file_hash, chunk_index) so vectors map back to owners
+        batcher = LengthBucketBatcher(
+            batch_size=settings.embed_batch_size,
+            bucket_width=settings.embed_bucket_width,
+        )
+
+        def encode(batch: List[PendingChunk]):
+            embeddings = embedder.encode([c.text for c in batch], prompt_name="code2code_document")
+            stages.put(upload_q, (batch, embeddings))
+
+        finished = 0
+        while finished < n_planners:
+            chunks = stages.get(plans_q)
+            if chunks is END:
+                finished += 1
+                continue
+            for chunk in chunks:
+                for batch in batcher.add(chunk):
+                    encode(batch)
+        for batch in batcher.drain():
+            encode(batch)
+        stages.put(upload_q, END)
+
+    def upload():
+        last_checkpoint = time.monotonic()
+        try:
+            while (item := stages.get(upload_q)) is not END:
+                _upsert_batch(*item, qdrant)
+                if tracker is None:
+                    continue
+                tracker.uploaded(item[0])
+                if time.monotonic() - last_checkpoint >= settings.checkpoint_interval_s:
+                    qdrant.sync()
+                    # only files handed over before the barrier are known to be stored
+                    done = tracker.take_ready()
+                    if done:
+                        on_checkpoint(done)
+                    last_checkpoint = time.monotonic()
+            qdrant.finish()
+        finally:
+            qdrant.close()
+
+    stages.spawn("ingest-feed", feed)
+    for i in range(n_planners):
+        stages.spawn(f"ingest-plan-{i}", plan)
+    stages.spawn("ingest-upload", upload)
+    stages.run(embed)
+    stages.join()
+
     return qdrant.total_upserted
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class _Request:
+    prompt_name: str
+    texts: List[str]
+    future: Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class EmbeddingScheduler:
+    """Single dispatcher thread that owns the model's forward passes.
+
+    - Concurrent requests with the same prompt are merged into one batch of up to
+      `max_batch` texts.
+    - Priority prompts (queries) always run before document work. A query waits at
+      most `window_ms` for other queries to join its batch, and at most one document
+      batch that is already running.
+    - Document requests are split into slices of `max_batch`, so a large ingest batch
+      never holds the model for longer than one slice.
+    """
+
+    def __init__(self, forward: Callable[[List[str], str], np.ndarray], max_batch: int = 64,
+                 window_ms: float = 5.0, priority_prompts: tuple[str, ...] = ("code2code_query",)):
+        if max_batch <= 0:
+            raise ValueError("max_batch must be > 0")
+        self._forward = forward
+        self.max_batch = max_batch
+        self.window_s = window_ms / 1000.0
+        self.priority_prompts = priority_prompts
+
+        self._cond = threading.Condition()
+        self._high: Deque[_Request] = deque()
+        self._low: Deque[_Request] = deque()
+        self._closed = False
+
+        self._stats: Dict[str, float] = {
+            "requests": 0,
+            "texts": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "last_batch_size": 0,
+            "query_wait_s_total": 0.0,
+            "query_requests": 0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name="embedding-scheduler", daemon=True)
+        self._thread.start()
+
+    # ------------------ public API ------------------
+    def encode(self, texts: List[str], prompt_name: str) -> np.ndarray:
+        """Blocking encode through the scheduler; returns a (len(texts), dim) array."""
+        futures = [
+            self.submit(texts[i:i + self.max_batch], prompt_name)
+            for i in range(0, len(texts), self.max_batch)
+        ]
+        parts = [f.result() for f in futures]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def submit(self, texts: List[str], prompt_name: str) -> Future:
+        future: Future = Future()
+        req = _Request(prompt_name=prompt_name, texts=list(texts), future=future)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("EmbeddingScheduler is closed")
+            (self._high if prompt_name in self.priority_prompts else self._low).append(req)
+            self._stats["requests"] += 1
+            self._cond.notify()
+        return future
+
+    def stats(self) -> dict:
+        with self._cond:
+            s = dict(self._stats)
+            s["queue_depth"] = {
+                "query_requests": len(self._high),
+                "query_texts": sum(len(r.texts) for r in self._high),
+                "document_requests": len(self._low),
+                "document_texts": sum(len(r.texts) for r in self._low),
+            }
+        batches = s["batches"]
+        s["avg_batch_size"] = s["texts"] / batches if batches else 0.0
+        queries = s.pop("query_requests")
+        s["avg_query_wait_ms"] = 1000.0 * s.pop("query_wait_s_total") / queries if queries else 0.0
+        return s
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    # ------------------ dispatcher ------------------
+    def _take(self, queue: Deque[_Request], prompt_name: str, size: int) -> List[_Request]:
+        """Pop queued requests with `prompt_name` while the batch stays within max_batch."""
+        taken: List[_Request] = []
+        for req in list(queue):
+            if req.prompt_name != prompt_name:
+                continue
+            if size + len(req.texts) > self.max_batch:
+                break
+            queue.remove(req)
+            taken.append(req)
+            size += len(req.texts)
+        return taken
+
+    def _next_batch(self) -> List[_Request] | None:
+        with self._cond:
+            while not self._high and not self._low:
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+            if self._high:
+                first = self._high.popleft()
+                batch = [first]
+                size = len(first.texts)
+                # give concurrent queries a short window to join the batch
+                deadline = time.monotonic() + self.window_s
+                while size < self.max_batch:
+                    joined = self._take(self._high, first.prompt_name, size)
+                    batch += joined
+                    size += sum(len(r.texts) for r in joined)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._closed:
+                        break
+                    self._cond.wait(remaining)
+                return batch
+
+            # document work: no waiting, just merge what is already queued
+            first = self._low.popleft()
+            return [first] + self._take(self._low, first.prompt_name, len(first.texts))
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            texts = [t for r in batch for t in r.texts]
+            started = time.monotonic()
+            try:
+                emb = np.asarray(self._forward(texts, batch[0].prompt_name))
+            except BaseException as e:
+                for r in batch:
+                    r.future.set_exception(e)
+                continue
+
+            with self._cond:
+                self._stats["batches"] += 1
+                self._stats["texts"] += len(texts)
+                self._stats["last_batch_size"] = len(texts)
+                self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(texts))
+                if batch[0].prompt_name in self.priority_prompts:
+                    self._stats["query_requests"] += len(batch)
+                    self._stats["query_wait_s_total"] += sum(started - r.enqueued_at for r in batch)
+
+            offset = 0
+            for r in batch:
+                r.future.set_result(emb[offset:offset + len(r.texts)])
+                offset += len(r.texts)
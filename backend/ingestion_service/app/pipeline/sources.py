@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+from hashlib import sha1
+from pathlib import Path
+from typing import AbstractSet, Iterator, Optional, Tuple
+
+from app.infra.git_objects import CatFileBatch, list_tree, prefetch_blobs
+from app.pipeline.traversal import is_binary_bytes, is_indexable_path, iterate_source_files
+
+
+def git_blob_sha(data: bytes) -> str:
+    """The id git gives a blob with this content; used as the file hash in point ids."""
+    return sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+@dataclass(slots=True)
+class SourceFile:
+    """One file to index: either a path on disk or content streamed from git objects."""
+
+    rel_path: str
+    path: Path | None = None
+    data: bytes | None = None
+    blob_sha: str | None = None
+
+    def load(self) -> Tuple[bytes, str]:
+        """Return (content, blob_sha), reading from disk if needed."""
+        data = self.data if self.data is not None else self.path.read_bytes()
+        return data, self.blob_sha or git_blob_sha(data)
+
+
+def iterate_worktree_files(root: Path, only: Optional[AbstractSet[str]] = None) -> Iterator[SourceFile]:
+    """Indexable files under `root`; with `only`, just those relative paths."""
+    for path in iterate_source_files(root):
+        rel_path = path.relative_to(root).as_posix()
+        if only is None or rel_path in only:
+            yield SourceFile(rel_path=rel_path, path=path)
+
+
+def iterate_git_blobs(git_dir: Path, commit: str, only: Optional[AbstractSet[str]] = None) -> Iterator[SourceFile]:
+    """Stream indexable files of `commit` straight from the object store, no checkout.
+
+    With `only`, just those paths are read (and fetched, for partial clones).
+    """
+
+    entries = [
+        (sha, path) for sha, path in list_tree(git_dir, commit)
+        if is_indexable_path(path) and (only is None or path in only)
+    ]
+    prefetch_blobs(git_dir, commit, (sha for sha, _ in entries))
+    with CatFileBatch(git_dir) as cat:
+        for sha, path in entries:
+            data = cat.read(sha)
+            if is_binary_bytes(data[:1024]):
+                continue
+            yield SourceFile(rel_path=path, data=data, blob_sha=sha)
@@ -0,0 +1,87 @@
+import queue
+import threading
+from typing import Any, Callable, List, Optional
+
+# end-of-stream marker passed through stage queues
+END = object()
+
+
+class StageAborted(Exception):
+    """Raised inside a stage when another stage has failed and the pipeline is shutting down."""
+
+
+class PipelineCancelled(Exception):
+    """The pipeline's cancel event was set (e.g. the worker lost the job's lease)."""
+
+
+class StageGroup:
+    """Runs pipeline stages on threads connected by bounded queues.
+
+    Bounded queues give backpressure: a fast producer blocks on put() until the
+    consumer catches up, so memory stays capped regardless of repository size.
+    The first exception raised by any stage stops all stages and is re-raised
+    from join(). Setting `cancel` stops them the same way with PipelineCancelled.
+    """
+
+    poll_interval_s = 0.1
+
+    def __init__(self, cancel: Optional[threading.Event] = None):
+        self._cancel = cancel
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def fail(self, exc: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = exc
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def run(self, fn: Callable[..., Any], *args) -> None:
+        """Run a stage in the calling thread."""
+        try:
+            fn(*args)
+        except StageAborted:
+            pass
+        except BaseException as e:
+            self.fail(e)
+
+    def spawn(self, name: str, fn: Callable[..., Any], *args) -> None:
+        """Run a stage on its own daemon thread."""
+        t = threading.Thread(target=self.run, args=(fn, *args), name=name, daemon=True)
+        self._threads.append(t)
+        t.start()
+
+    def _check(self) -> None:
+        if self._cancel is not None and self._cancel.is_set():
+            self.fail(PipelineCancelled("pipeline cancelled"))
+        if self._stop.is_set():
+            raise StageAborted()
+
+    def put(self, q: queue.Queue, item: Any) -> None:
+        while True:
+            self._check()
+            try:
+                q.put(item, timeout=self.poll_interval_s)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, q: queue.Queue) -> Any:
+        while True:
+            self._check()
+            try:
+                return q.get(timeout=self.poll_interval_s)
+            except queue.Empty:
+                continue
+
+    def join(self) -> None:
+        for t in self._threads:
+            t.join()
+        if self._error is not None:
+            raise self._error
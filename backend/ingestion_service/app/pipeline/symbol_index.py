@@ -0,0 +1,241 @@
+import bisect
+import json
+import os
+import re
+import threading
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterable, List, Optional, Tuple
+
+from app.pipeline.planner import FilePlan
+
+# receiver type of a method declaration: `func (c *Client) Do(` -> Client
+_RECEIVER_RE = re.compile(r"^\s*func\s*\(\s*(?:[A-Za-z_]\w*\s+)?\*?\s*([A-Za-z_]\w*)")
+
+# identifier shapes in a search query
+_BACKTICK_RE = re.compile(r"`([^`\n]+)`")
+_METHOD_RE = re.compile(r"\(\s*\*?\s*([A-Za-z_]\w*)\s*\)\s*\.\s*([A-Za-z_]\w*)")  # (*Client).Do
+_DOTTED_RE = re.compile(r"(?<![\w.])([A-Za-z_]\w+)\.([A-Za-z_]\w+)(?![\w.])")  # http.NewServer, Client.Do
+_CALL_RE = re.compile(r"(?<![\w.])([A-Za-z_]\w*)\(")  # NewServer(
+_WORD_RE = re.compile(r"(?<![\w.])[A-Za-z_]\w*(?![\w.])")
+# mixedCase / CamelCase with an inner hump, or snake_case: never plain prose
+_CODE_WORD_RE = re.compile(r"[a-z0-9][A-Z]|[A-Z]{2,}[a-z]|[A-Za-z0-9]_[A-Za-z0-9]")
+
+
+@dataclass(frozen=True, slots=True)
+class Symbol:
+    """One named Go entity and the point holding its first chunk."""
+
+    name: str
+    kind: str
+    package: str
+    receiver: str  # methods only
+    file_path: str
+    start_line: int
+    end_line: int
+    file_hash: str
+    chunk_index: int
+
+    def keys(self) -> List[str]:
+        # lookups are case-insensitive; qualified forms let `Client.Do` / `http.NewServer` match
+        keys = [self.name.lower()]
+        if self.receiver:
+            keys.append(f"{self.receiver}.{self.name}".lower())
+        elif self.package:
+            keys.append(f"{self.package}.{self.name}".lower())
+        return keys
+
+    def qualified_name(self) -> str:
+        return f"{self.receiver}.{self.name}" if self.receiver else self.name
+
+
+def plan_symbols(plan: FilePlan) -> List[Symbol]:
+    """Symbols of a planned file; each points at the first chunk of its entity."""
+
+    first_chunk: Dict[int, int] = {}
+    for idx, chunk in enumerate(plan.chunks):
+        first_chunk.setdefault(chunk[2], idx)
+
+    symbols: List[Symbol] = []
+    for entity_idx, (kind, name, start_line, end_line) in enumerate(plan.entities):
+        chunk_index = first_chunk.get(entity_idx)
+        if not name or chunk_index is None:
+            continue
+        receiver = ""
+        if kind == "method":
+            m = _RECEIVER_RE.match(plan.chunks[chunk_index][0])
+            receiver = m.group(1) if m else ""
+        symbols.append(Symbol(
+            name=name,
+            kind=kind,
+            package=plan.package,
+            receiver=receiver,
+            file_path=plan.rel_path,
+            start_line=start_line,
+            end_line=end_line,
+            file_hash=plan.file_hash,
+            chunk_index=chunk_index,
+        ))
+    return symbols
+
+
+def query_identifiers(query: str) -> List[str]:
+    """Identifiers a query asks about, most specific first; [] for prose-only queries.
+
+    Backticked spans, `(*T).M` / `pkg.Name` forms, call syntax and mixedCase or
+    snake_case words count as identifiers. A query that is a single word is taken as
+    one too.
+    """
+
+    found: List[str] = []
+
+    def scan(text: str, loose: bool) -> None:
+        for recv, name in _METHOD_RE.findall(text):
+            found.append(f"{recv}.{name}")
+        text = _METHOD_RE.sub(" ", text)
+        for left, right in _DOTTED_RE.findall(text):
+            found.append(f"{left}.{right}")
+        found.extend(_CALL_RE.findall(text))
+        for word in _WORD_RE.findall(text):
+            if loose or _CODE_WORD_RE.search(word):
+                found.append(word)
+
+    for span in _BACKTICK_RE.findall(query):
+        scan(span, loose=True)
+    rest = _BACKTICK_RE.sub(" ", query)
+    scan(rest, loose=len(rest.split()) == 1 and not found)
+    return list(dict.fromkeys(found))
+
+
+class SymbolTable:
+    """Sorted, case-insensitive symbol index of one collection.
+
+    `keys` is sorted and `refs[i]` is the symbol of `keys[i]`, so exact and prefix
+    lookups are a bisect plus a scan of the matching run.
+    """
+
+    def __init__(self, symbols: List[Symbol]):
+        self.symbols = symbols
+        entries = sorted((key, i) for i, s in enumerate(symbols) for key in s.keys())
+        self.keys = [k for k, _ in entries]
+        self.refs = [i for _, i in entries]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def lookup(self, identifier: str, limit: int, prefix_min_len: int = 3) -> List[Tuple[float, Symbol]]:
+        """(score, symbol) matches of `identifier`: exact first, then prefix matches.
+
+        Scores: 1.0 exact (same case), 0.9 exact ignoring case, 0.8 prefix.
+        """
+
+        key = identifier.lower()
+        matches: Dict[int, float] = {}
+        i = bisect.bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            s = self.symbols[self.refs[i]]
+            exact = identifier in (s.name, s.qualified_name(), f"{s.package}.{s.name}")
+            matches[self.refs[i]] = max(matches.get(self.refs[i], 0.0), 1.0 if exact else 0.9)
+            i += 1
+        if len(key) >= prefix_min_len:
+            while i < len(self.keys) and self.keys[i].startswith(key) and len(matches) < limit:
+                matches.setdefault(self.refs[i], 0.8)
+                i += 1
+        ranked = sorted(
+            matches.items(),
+            key=lambda m: (-m[1], len(self.symbols[m[0]].name), self.symbols[m[0]].file_path),
+        )
+        return [(score, self.symbols[idx]) for idx, score in ranked[:limit]]
+
+    def search(self, identifiers: Iterable[str], limit: int, prefix_min_len: int = 3) -> List[Tuple[float, Symbol]]:
+        """Merged lookups of several identifiers, best score per symbol."""
+
+        best: Dict[Symbol, float] = {}
+        for identifier in identifiers:
+            for score, symbol in self.lookup(identifier, limit, prefix_min_len):
+                if score > best.get(symbol, 0.0):
+                    best[symbol] = score
+        ranked = sorted(best.items(), key=lambda m: (-m[1], len(m[0].name), m[0].file_path))
+        return [(score, symbol) for symbol, score in ranked[:limit]]
+
+    # ------------------ serialization ------------------
+    def dump(self, path: Path) -> None:
+        # columnar rows plus the sorted key index; written to a temp file and renamed,
+        # so readers never see a partial table
+        doc = {
+            "version": 1,
+            "symbols": [list(astuple(s)) for s in self.symbols],
+            "keys": self.keys,
+            "refs": self.refs,
+        }
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(doc, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "SymbolTable":
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        table = cls.__new__(cls)
+        table.symbols = [Symbol(*row) for row in doc["symbols"]]
+        table.keys = doc["keys"]
+        table.refs = doc["refs"]
+        return table
+
+
+class SymbolIndex:
+    """Per-collection symbol tables under `root`, shared by ingest workers and the API.
+
+    Ingestion writes `<collection>.symbols.json`; readers keep the parsed table and
+    reload it when the file changes.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # collection -> (file mtime_ns, table)
+        self._tables: Dict[str, Tuple[int, SymbolTable]] = {}
+
+    def _path(self, collection: str) -> Path:
+        # collection names come from API requests: keep them from escaping `root`
+        if not collection or collection in (".", "..") or any(c in collection for c in "/\\\0"):
+            raise ValueError(f"invalid collection name {collection!r}")
+        path = self.root / f"{collection}.symbols.json"
+        if path.resolve().parent != self.root.resolve():
+            raise ValueError(f"invalid collection name {collection!r}")
+        return path
+
+    def write(self, collection: str, symbols: List[Symbol]) -> SymbolTable:
+        table = SymbolTable(symbols)
+        table.dump(self._path(collection))
+        return table
+
+    def update(self, collection: str, paths: AbstractSet[str], symbols: List[Symbol]) -> SymbolTable:
+        """Replace the symbols of `paths` (changed or deleted files) with `symbols`."""
+        current = self.get(collection)
+        kept = [s for s in current.symbols if s.file_path not in paths] if current is not None else []
+        return self.write(collection, kept + symbols)
+
+    def delete(self, collection: str) -> None:
+        self._path(collection).unlink(missing_ok=True)
+        with self._lock:
+            self._tables.pop(collection, None)
+
+    def get(self, collection: str) -> Optional[SymbolTable]:
+        path = self._path(collection)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._tables.get(collection)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        table = SymbolTable.load(path)
+        with self._lock:
+            self._tables[collection] = (mtime, table)
+        return table
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"loaded": {c: len(t) for c, (_, t) in self._tables.items()}}
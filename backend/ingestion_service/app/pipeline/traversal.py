@@ -1,34 +1,69 @@
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from typing import List
 
+DEFAULT_EXTENSIONS = [".go", ".mod", ".md", ".yaml", ".yml", ".json", ".toml", ".ts", ".tsx", ".css", ".html"]
+DEFAULT_EXCLUDE_DIRS = [".git", "vendor", "node_modules", "bin", ".venv", "__pycache__"]
+# files matched by name regardless of extension
+DEFAULT_FILE_NAMES = ["Dockerfile"]
+
+
+def is_binary_bytes(chunk: bytes) -> bool:
+    # quick heuristic on the first KB of a file
+    if b"\0" in chunk:
+        return True
+    # high non-text ratio
+    nontext = sum(1 for b in chunk if b < 9 or (b > 13 and b < 32))
+    return (nontext / max(1, len(chunk))) > 0.3
+
 
 def is_binary(path: Path) -> bool:
-    # quick heuristic
     try:
         with open(path, "rb") as f:
-            chunk = f.read(1024)
-            if b"\0" in chunk:
-                return True
-            # high non-text ratio
-            nontext = sum(1 for b in chunk if b < 9 or (b > 13 and b < 32))
-            return (nontext / max(1, len(chunk))) > 0.3
+            return is_binary_bytes(f.read(1024))
     except Exception:
         return True
 
 
+def is_indexable_path(rel_path: str, extentions: List[str] = None, exclude_dirs: List[str] = None) -> bool:
+    """Path-based part of the traversal rules (binary check is separate)."""
+    if extentions is None:
+        extentions = DEFAULT_EXTENSIONS
+    if exclude_dirs is None:
+        exclude_dirs = DEFAULT_EXCLUDE_DIRS
+    path = PurePosixPath(rel_path)
+    if any(part in exclude_dirs for part in path.parts):
+        return False
+    # special-case Dockerfile and other name-based files (no suffix)
+    return path.name in DEFAULT_FILE_NAMES or path.suffix.lower() in extentions
+
+
 def iterate_source_files(root: Path, extentions: List[str] = None, exclude_dirs: List[str] = None):
     """
     Iterator function, returns appropriate files
     """
-    if extentions is None:
-        extentions = [".go", ".mod", ".md", ".yaml", ".yml", ".json", ".toml", ".ts", ".tsx", ".css", ".html"]
-    if exclude_dirs is None:
-        exclude_dirs = [".git", "vendor", "node_modules", "bin", ".venv", "__pycache__"]
     for path in root.rglob("*"):
         if path.is_file():
-            if any(part in exclude_dirs for part in path.parts):
-                continue
-            # special-case Dockerfile and other name-based files (no suffix)
-            if path.name == "Dockerfile" or path.suffix.lower() in extentions:
-                if not is_binary(path):
-                    yield path
\ No newline at end of file
+            rel_path = path.relative_to(root).as_posix()
+            if is_indexable_path(rel_path, extentions, exclude_dirs) and not is_binary(path):
+                yield path
+
+
+def sparse_checkout_patterns(extentions: List[str] = None, exclude_dirs: List[str] = None) -> List[str]:
+    """
+    Non-cone `git sparse-checkout` patterns selecting the same files as iterate_source_files,
+    so a sparse clone never materializes files the traversal would skip anyway.
+    """
+    if extentions is None:
+        extentions = DEFAULT_EXTENSIONS
+    if exclude_dirs is None:
+        exclude_dirs = DEFAULT_EXCLUDE_DIRS
+
+    def any_case(s: str) -> str:
+        # traversal compares suffixes case-insensitively, sparse patterns are case-sensitive
+        return "".join(f"[{c.lower()}{c.upper()}]" if c.isalpha() else c for c in s)
+
+    patterns = [f"*{any_case(ext)}" for ext in extentions]
+    patterns += list(DEFAULT_FILE_NAMES)
+    # negations must come last: the last matching pattern wins
+    patterns += [f"!**/{d}/**" for d in exclude_dirs if d != ".git"]
+    return patterns
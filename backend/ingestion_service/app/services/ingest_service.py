@@ -1,11 +1,23 @@
-from dataclasses import dataclass
+import logging
+import threading
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
-from shutil import rmtree
 
 from app.api.models import RepoIngestRequest
+from app.core.config import settings
+from app.infra.git_client import ChangeSet, RepoCheckout
 from app.pipeline.processor import process_repo_and_upsert
 from app.utils.url_converter import repo_url_to_slug, get_repo_name
 from app.infra.repos_client import ReposServiceClient
+from app.pipeline.chunk_store import ChunkStore
+from app.pipeline.planner import PlanPool
+from app.pipeline.stages import PipelineCancelled
+from app.pipeline.symbol_index import SymbolIndex
+from app.services.job_checkpoint import JobCheckpoint
+from app.services.search_cache import SearchCache
+from app.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 @dataclass(frozen=True)
 class IngestJob:
@@ -20,14 +32,43 @@ class IngestJob:
     repository_id: int
     state_id: int
 
+    full: bool = False
+    # remote head of the branch when the job was created; None if it could not be resolved
+    commit: str | None = None
+
+    @property
+    def coalesce_key(self) -> str | None:
+        # jobs with the same key produce the same collection; full re-indexes are never shared
+        if self.commit is None or self.full:
+            return None
+        return f"{self.slug}@{self.branch or ''}@{self.commit}"
+
+    def to_payload(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "IngestJob":
+        return cls(**payload)
+
 
 class IngestService:
-    def __init__(self, git, treesitter, embedder, qdrant_factory, repos_client : ReposServiceClient):
+    def __init__(self, git, treesitter, embedder, qdrant_factory, repos_client : ReposServiceClient,
+                 plan_pool: PlanPool | None = None, search_cache: SearchCache | None = None,
+                 chunk_store: ChunkStore | None = None, symbol_index: SymbolIndex | None = None,
+                 versions_factory=None, single_flight: SingleFlight | None = None):
         self.git = git
         self.treesitter = treesitter
         self.embedder = embedder
         self.qdrant_factory = qdrant_factory
         self.repos = repos_client
+        self.plan_pool = plan_pool
+        self.search_cache = search_cache
+        self.chunk_store = chunk_store
+        self.symbol_index = symbol_index
+        # alias -> CollectionVersions; None: upsert into the collection in place
+        self.versions_factory = versions_factory
+        # local job queue: concurrent jobs with the same coalesce key run once
+        self.single_flight = single_flight
 
     def create_ingest_job(self, req: RepoIngestRequest) -> IngestJob:
         repo_url = str(req.repo_url)
@@ -52,6 +93,10 @@ class IngestService:
         )
         state_id = state["id"]
 
+        commit = None
+        if settings.ingest_coalescing:
+            commit = self.git.resolve_remote(repo_url, req.branch, settings.git_ls_remote_timeout_s)
+
         return IngestJob(
             repo_url=repo_url,
             branch=req.branch,
@@ -61,6 +106,60 @@ class IngestService:
             collection=collection,
             repository_id=repository_id,
             state_id=state_id,
+            full=req.full,
+            commit=commit,
+        )
+
+    def reuse_indexed(self, job: IngestJob) -> dict | None:
+        """Finish the job from the existing collection when it already holds the job's commit.
+
+        Collections are shared by every user of a repository, so when the latest finished
+        index of the repository is at `job.commit`, the job's state only has to be marked
+        done with that result. Returns the updated state, or None when the job must run.
+        """
+        if job.coalesce_key is None:
+            return None
+        try:
+            latest = self.repos.get_latest_indexed_state(job.repository_id)
+            if latest is None or latest["indexed_commit"] != job.commit:
+                return None
+            versions = self.versions_factory(job.collection) if self.versions_factory is not None else None
+            live = versions.current() if versions is not None else self.qdrant_factory(job.collection).exists()
+            if not live:
+                return None
+            state = latest if latest["id"] == job.state_id else self._adopt(job, latest)
+        except Exception as e:
+            # only a shortcut: the job simply runs
+            logger.warning("could not check the indexed commit of %s: %s", job.slug, e)
+            return None
+        logger.info("%s is already indexed at %s; state %d reuses it", job.slug, job.commit[:12], job.state_id)
+        return state
+
+    def _adopt(self, job: IngestJob, source: dict) -> dict:
+        # the result of an ingest that indexed the same collection at the same commit;
+        # the job keeps its own branch, the source's is recorded as indexed_branch
+        return self.repos.patch_index_state(job.state_id, {
+            "status": "done",
+            "vectors_upserted": source["vectors_upserted"],
+            "last_error": None,
+            "indexed_at": source["indexed_at"],
+            "indexed_commit": source["indexed_commit"],
+            "branch": job.branch,
+            "indexed_branch": source["indexed_branch"],
+        })
+
+    def enqueue_ingest_job(self, job: IngestJob) -> dict:
+        """Hand the job to the durable queue in repos_service; a worker picks it up."""
+        self.repos.patch_index_state(job.state_id, {
+            "status": "queued",
+            "last_error": None,
+        })
+        return self.repos.enqueue_ingest_job(
+            user_id=job.user_id,
+            repository_id=job.repository_id,
+            state_id=job.state_id,
+            payload=job.to_payload(),
+            coalesce_key=job.coalesce_key,
         )
 
     def run_ingest_job(self, job: IngestJob) -> None:
@@ -68,10 +167,112 @@ class IngestService:
         ВАЖНО: эта функция запускается через BackgroundTasks.
         Она НЕ должна кидать исключения наружу (клиент уже получил 202 + id).
         Ошибки отражаем статусом 'failed' в repos_service.
+
+        With single flight, a job whose coalesce key is already running only waits for
+        that job: its state is given the shared result when the running job ends.
+        """
+        key = job.coalesce_key if self.single_flight is not None else None
+        if key is not None:
+            # before joining: the leader may finish (and settle this state) right after
+            self.repos.patch_index_state(job.state_id, {"status": "queued", "last_error": None})
+            if not self.single_flight.join(key, job):
+                logger.info("%s is being indexed at %s; state %d waits for it", job.slug, job.commit[:12], job.state_id)
+                return
+
+        error = None
+        try:
+            self.execute_ingest_job(job)
+        except Exception as e:
+            error = str(e)
+            self.mark_job_failed(job, error, retrying=False)
+        finally:
+            if key is not None:
+                self._settle_followers(job, self.single_flight.finish(key), error)
+
+    def _settle_followers(self, job: IngestJob, followers: list[IngestJob], error: str | None) -> None:
+        if not followers:
+            return
+        latest = None
+        if error is None:
+            try:
+                latest = self.repos.get_latest_indexed_state(job.repository_id)
+            except Exception as e:
+                error = f"could not read the result of the shared ingest: {e}"
+        for follower in followers:
+            try:
+                if latest is not None:
+                    self._adopt(follower, latest)
+                else:
+                    self.mark_job_failed(follower, error or "shared ingest produced no result", retrying=False)
+            except Exception as e:
+                logger.warning("could not update state %d from the shared ingest: %s", follower.state_id, e)
+
+    def _indexed_commit(self, job: IngestJob) -> str | None:
+        """Commit the collection holds, when it is of the job's branch.
+
+        The collection is shared by every user of the repository, so it holds what the
+        latest finished ingest of any of them indexed, not what the job's own state last saw.
+        """
+        latest = self.repos.get_latest_indexed_state(job.repository_id)
+        if latest is None:
+            return None
+        if latest["indexed_branch"] != job.branch:
+            logger.info("%s was last indexed from branch %r; re-indexing %r fully",
+                        job.slug, latest["indexed_branch"], job.branch)
+            return None
+        return latest["indexed_commit"]
+
+    def _changes(self, job: IngestJob, checkout: RepoCheckout, live_exists: bool) -> ChangeSet | None:
+        """What to re-index incrementally, or None for a full run."""
+        if job.full or not live_exists:
+            return None
+        indexed_commit = self._indexed_commit(job)
+        if not indexed_commit:
+            return None
+        if self.symbol_index is not None and self.symbol_index.get(job.collection) is None:
+            # the symbol table could only be patched, not rebuilt, by an incremental run
+            return None
+        changes = checkout.changes_since(indexed_commit)
+        if changes is None:
+            logger.info("indexed commit %s of %s is not available; re-indexing fully", indexed_commit, job.slug)
+        return changes
+
+    def execute_ingest_job(self, job: IngestJob, checkpoint: JobCheckpoint | None = None,
+                           cancel: threading.Event | None = None) -> int:
+        """Index the repository and record the result on its index state.
+
+        With collection versions, a full run builds a fresh `<collection>__v<ms>` and then
+        atomically switches the `<collection>` alias to it; searches never see a partial
+        rebuild, and a failed build is dropped. Otherwise points are upserted in place.
+
+        When the latest finished ingest of the repository (by any user) recorded the
+        commit the collection was indexed at, and it was of the job's branch, only files
+        changed since then are indexed, in place (in the live version behind the alias):
+        points of modified and deleted files are deleted by file_path, added and modified
+        files are processed. Copying every unchanged point into a new version would cost
+        more than the diff itself. The new commit is recorded together with status 'done',
+        so a failed run is simply repeated from the old one.
+
+        With a `checkpoint` (durable jobs), progress is recorded while the job runs. A
+        retry of the same commit and diff continues the same target collection: files
+        completed earlier are not embedded again, and the deletion of changed files'
+        points is not repeated.
+
+        A job whose commit the collection already holds is finished without indexing
+        (see reuse_indexed).
+
+        Setting `cancel` (the worker lost the job's lease) aborts the pipeline with
+        PipelineCancelled; the alias is then never switched.
+
+        Raises on failure; the caller decides whether the job is failed or retried.
         """
         state_id = job.state_id
         repository_id = job.repository_id
 
+        reused = self.reuse_indexed(job)
+        if reused is not None:
+            return reused["vectors_upserted"]
+
         # mark processing
         self.repos.patch_index_state(state_id, {
             "status": "processing",
@@ -80,34 +281,144 @@ class IngestService:
             "indexed_at": None,
         })
 
-        repo_path = None
+        checkout = self.git.open(job.repo_url, job.branch, job.commit)
+        versions = self.versions_factory(job.collection) if self.versions_factory is not None else None
+        target = None
+        switched = False
+        symbols = [] if self.symbol_index is not None else None
+        stored_files = {} if self.chunk_store is not None else None
         try:
-            repo_path = self.git.clone(job.repo_url, job.branch)
+            live = versions.current() if versions is not None else (
+                job.collection if self.qdrant_factory(job.collection).exists() else None
+            )
+            changes = self._changes(job, checkout, live is not None)
+            base = changes.base if changes is not None else None
+
+            resume = checkpoint is not None and checkpoint.matches(commit=checkout.commit, base=base)
+            if versions is not None and changes is None:
+                saved_target = checkpoint.saved_meta.get("target") if resume else None
+                resume = saved_target is not None and versions.exists(saved_target)
+                target = saved_target if resume else versions.new_version()
+            done_files = checkpoint.saved_files if resume else frozenset()
+            if resume:
+                logger.info("resuming %s at %s: %d files already done", job.slug, checkout.commit[:12], len(done_files))
+            elif checkpoint is not None:
+                checkpoint.start({"commit": checkout.commit, "base": base, "target": target})
 
-            qdrant = self.qdrant_factory(job.collection)
+            if changes is not None:
+                logger.info(
+                    "incremental re-index of %s %s..%s: %d changed, %d removed files",
+                    job.slug, changes.base[:12], checkout.commit[:12], len(changes.changed), len(changes.removed),
+                )
+            # incremental runs write to the live collection (the version behind the alias)
+            qdrant = self.qdrant_factory(target or live or job.collection)
+            if changes is not None and not (resume and checkpoint.saved_meta.get("prepared")):
+                # before the upload: new points of modified files share their file_path
+                qdrant.delete_files(sorted(changes.removed))
+                if checkpoint is not None:
+                    checkpoint.update(prepared=True)
             total = process_repo_and_upsert(
-                root_path=repo_path,
+                files=checkout.files(changes.changed if changes is not None else None),
                 repo_name=job.repo_name,
                 treesitter=self.treesitter,
                 embedder=self.embedder,
                 qdrant=qdrant,
+                plan_pool=self.plan_pool,
+                chunk_store=self.chunk_store,
+                symbols=symbols,
+                stored_files=stored_files,
+                skip_files=done_files,
+                on_checkpoint=checkpoint.record if checkpoint is not None else None,
+                cancel=cancel,
             )
+            if cancel is not None and cancel.is_set():
+                raise PipelineCancelled("ingest cancelled")
+            if target is not None:
+                versions.switch(target)
+                switched = True
+            if symbols is not None:
+                # written only after every point is uploaded, so lookups never miss their chunk
+                if changes is not None:
+                    self.symbol_index.update(job.collection, changes.changed | changes.removed, symbols)
+                else:
+                    self.symbol_index.write(job.collection, symbols)
+            if stored_files is not None:
+                self.chunk_store.set_refs(
+                    job.collection, stored_files, changes.changed | changes.removed if changes is not None else None,
+                )
+            indexed_commit = checkout.commit
+        except BaseException:
+            # a checkpointed build is kept for the retry (gc() removes it if it never comes)
+            if target is not None and not switched and checkpoint is None:
+                versions.drop(target)
+            raise
+        finally:
+            checkout.close()
+            # the collection changed (even if only partially): cached search results are stale
+            if self.search_cache is not None:
+                self.search_cache.invalidate(job.collection)
+            if versions is not None:
+                try:
+                    versions.gc()
+                except Exception as e:
+                    logger.warning("collection GC for %s failed: %s", job.collection, e)
+            self._prune_chunk_store()
+
+        # success
+        self.repos.patch_index_state(state_id, {
+            "status": "done",
+            "vectors_upserted": total,
+            "last_error": None,
+            "indexed_at": datetime.now(timezone.utc).isoformat(),
+            "indexed_commit": indexed_commit,
+            "branch": job.branch,
+            "indexed_branch": job.branch,
+        })
+
+        self.repos.touch_repository_indexed(repository_id)
+        return total
 
-            # success
-            self.repos.patch_index_state(state_id, {
-                "status": "done",
-                "vectors_upserted": total,
-                "last_error": None,
-                "indexed_at": datetime.now(timezone.utc).isoformat(),
-            })
+    def index_stats(self, collection: str) -> dict:
+        """Points of a logical collection (a repository) and where they are stored."""
+        versions = self.versions_factory(collection) if self.versions_factory is not None else None
+        physical = versions.current() if versions is not None else None
+        qdrant = self.qdrant_factory(physical or collection)
+        stats = qdrant.stats()
+        stats["symbols"] = None
+        if self.symbol_index is not None:
+            table = self.symbol_index.get(collection)
+            stats["symbols"] = len(table) if table is not None else 0
+        return stats
 
-            self.repos.touch_repository_indexed(repository_id)
+    def delete_index(self, collection: str) -> None:
+        """Delete everything indexed for a logical collection: its points (every version,
+        or its tenant of a shared collection), its symbol table and cached searches."""
+        if self.symbol_index is not None:
+            # first: rejects a collection name that is not a safe file name (ValueError)
+            self.symbol_index.delete(collection)
+        if self.versions_factory is not None:
+            self.versions_factory(collection).delete_all()
+        else:
+            self.qdrant_factory(collection).delete_all()
+        if self.search_cache is not None:
+            self.search_cache.invalidate(collection)
+        if self.chunk_store is not None:
+            self.chunk_store.drop_refs(collection)
+            self._prune_chunk_store()
+        logger.info("deleted the index of %s", collection)
 
+    def _prune_chunk_store(self) -> None:
+        # bodies of replaced files and deleted collections; a failure only delays the cleanup
+        if self.chunk_store is None:
+            return
+        try:
+            self.chunk_store.prune()
         except Exception as e:
-            self.repos.patch_index_state(state_id, {
-                "status": "failed",
-                "last_error": str(e),
-            })
-        finally:
-            if repo_path and repo_path.exists():
-                rmtree(repo_path, ignore_errors=True)
+            logger.warning("chunk store prune failed: %s", e)
+
+    def mark_job_failed(self, job: IngestJob, error: str, retrying: bool) -> None:
+        # a job that will be retried goes back to 'queued', keeping the error for visibility
+        self.repos.patch_index_state(job.state_id, {
+            "status": "queued" if retrying else "failed",
+            "last_error": error,
+        })
@@ -0,0 +1,37 @@
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from app.infra.repos_client import ReposServiceClient
+
+
+class JobCheckpoint:
+    """Progress of one durable ingest job, stored on the job row in repos_service.
+
+    `meta` identifies what the attempt builds (commit, diff base, target collection,
+    finished preparation steps); `files` are the paths whose points are all uploaded.
+    A retried or re-claimed job resumes only when its meta matches: anything else
+    starts a new checkpoint. Writes require the job's lease, so a worker that lost
+    its job cannot touch the checkpoint of the one that took it over.
+    """
+
+    def __init__(self, repos: ReposServiceClient, job_id: int, worker_id: str, saved: Optional[Dict[str, Any]]):
+        self.repos = repos
+        self.job_id = job_id
+        self.worker_id = worker_id
+        saved = saved or {}
+        self.saved_meta: Dict[str, Any] = saved.get("meta") or {}
+        self.saved_files: FrozenSet[str] = frozenset(saved.get("files") or ())
+
+    def matches(self, **meta: Any) -> bool:
+        return bool(self.saved_meta) and all(self.saved_meta.get(k) == v for k, v in meta.items())
+
+    def start(self, meta: Dict[str, Any]) -> None:
+        self.repos.checkpoint_ingest_job(self.job_id, self.worker_id, meta=meta, reset=True)
+        self.saved_meta = dict(meta)
+        self.saved_files = frozenset()
+
+    def update(self, **meta: Any) -> None:
+        self.repos.checkpoint_ingest_job(self.job_id, self.worker_id, meta=meta)
+        self.saved_meta.update(meta)
+
+    def record(self, files: List[str]) -> None:
+        self.repos.checkpoint_ingest_job(self.job_id, self.worker_id, files=files)
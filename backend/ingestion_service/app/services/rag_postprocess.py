@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# (score, point payload) before bodies are hydrated, (score, payload, body) after
+ScoredPayload = Tuple[float, Dict[str, Any]]
+ScoredChunk = Tuple[float, Dict[str, Any], str]
+
+
+def _window_group(payload: Dict[str, Any]) -> tuple:
+    # windows of one entity (or of one non-Go file) share file and entity location
+    return (
+        payload.get("file_hash"),
+        payload.get("file_path"),
+        payload.get("name"),
+        payload.get("start_code_line"),
+    )
+
+
+def _join_overlapping(a: str, b: str) -> str:
+    """`a` followed by `b` without the text they share (b starts inside a's tail)."""
+
+    probe = b[:64]
+    pos = a.find(probe) if probe else -1
+    while pos >= 0:
+        if b.startswith(a[pos:]):
+            return a[:pos] + b
+        pos = a.find(probe, pos + 1)
+    return a + "\n" + b
+
+
+def _merge_run(run: List[ScoredPayload]) -> ScoredPayload:
+    score = max(s for s, _ in run)
+    merged = dict(run[0][1])
+    if "body_start" in merged:
+        # offset-only points: one span over the whole run, hydrated with a single read
+        merged["body_end"] = max(p["body_end"] for _, p in run)
+    else:
+        body = merged.get("body", "")
+        for _, p in run[1:]:
+            body = _join_overlapping(body, p.get("body", ""))
+        merged["body"] = body
+    return score, merged
+
+
+def merge_windows(hits: List[ScoredPayload]) -> List[ScoredPayload]:
+    """Merge hits that are consecutive windows of the same file and entity.
+
+    Token windows overlap by `overlap` tokens, so neighbouring hits repeat text.
+    A run of consecutive chunk indices becomes one hit spanning the run, scored
+    by its best window. The result is ordered by score.
+    """
+
+    groups: Dict[tuple, List[ScoredPayload]] = {}
+    for hit in hits:
+        groups.setdefault(_window_group(hit[1]), []).append(hit)
+
+    merged: List[ScoredPayload] = []
+    for group in groups.values():
+        if len(group) == 1 or any(p.get("chunk_index") is None for _, p in group):
+            merged.extend(group)
+            continue
+        group.sort(key=lambda h: h[1]["chunk_index"])
+        run = [group[0]]
+        for hit in group[1:]:
+            if hit[1]["chunk_index"] == run[-1][1]["chunk_index"]:
+                run[-1] = max(run[-1], hit, key=lambda h: h[0])
+            elif hit[1]["chunk_index"] == run[-1][1]["chunk_index"] + 1:
+                run.append(hit)
+            else:
+                merged.append(_merge_run(run) if len(run) > 1 else run[0])
+                run = [hit]
+        merged.append(_merge_run(run) if len(run) > 1 else run[0])
+    merged.sort(key=lambda h: -h[0])
+    return merged
+
+
+def dedupe_bodies(chunks: List[ScoredChunk]) -> List[ScoredChunk]:
+    """Drop hits whose body repeats a better-scored one (vendored or copied files)."""
+
+    seen = set()
+    out: List[ScoredChunk] = []
+    for chunk in chunks:
+        if chunk[2] in seen:
+            continue
+        seen.add(chunk[2])
+        out.append(chunk)
+    return out
+
+
+def cutoff(chunks: List[ScoredChunk], score_gap: Optional[float] = None,
+           token_budget: Optional[int] = None, chars_per_token: float = 4.0) -> List[ScoredChunk]:
+    """Trim the tail of score-ordered hits; the best hit is always kept.
+
+    score_gap: stop at the first drop between neighbouring scores larger than this.
+    token_budget: stop before the (estimated) tokens of all bodies exceed the budget.
+    """
+
+    out: List[ScoredChunk] = []
+    tokens = 0.0
+    for chunk in chunks:
+        if out:
+            if score_gap is not None and out[-1][0] - chunk[0] > score_gap:
+                break
+            if token_budget is not None and tokens + len(chunk[2]) / chars_per_token > token_budget:
+                break
+        out.append(chunk)
+        tokens += len(chunk[2]) / chars_per_token
+    return out
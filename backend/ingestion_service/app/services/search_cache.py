@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+def normalize_query(query: str) -> str:
+    # whitespace-only normalization: identifiers and case stay significant for code search
+    return " ".join(query.split())
+
+
+class _LRU:
+    """Thread-safe LRU map with an optional per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_s: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl_s is not None and time.monotonic() - item[0] > self.ttl_s:
+                del self._data[key]
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SearchCache:
+    """Two-level cache for /rag/search.
+
+    L1: normalized query text (+ prompt) -> query vector. Vectors never go stale for a model.
+    L2: (collection, version, generation, query, top_k, filters) -> search hits.
+        invalidate(collection) bumps the collection's generation, so entries cached before a
+        re-index in this process are never served again and age out of the LRU. Re-indexes
+        done by other processes (durable workers) change `version`: the physical collection
+        behind the alias, which callers resolve and memoize with get_version/put_version
+        for `version_ttl_s`. Where no such version exists (collections updated in place by
+        another process) results must not be cached: `cache_results=False`.
+    """
+
+    def __init__(self, vector_max_entries: int = 4096, result_max_entries: int = 1024,
+                 result_ttl_s: Optional[float] = 300.0, cache_results: bool = True,
+                 version_ttl_s: float = 2.0):
+        self.vectors = _LRU(vector_max_entries)
+        self.results = _LRU(result_max_entries, ttl_s=result_ttl_s)
+        self.cache_results = cache_results
+        self._versions = _LRU(result_max_entries, ttl_s=version_ttl_s)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ------------------ L1: query vectors ------------------
+    def get_vector(self, query: str, prompt_name: str) -> Any:
+        return self.vectors.get((prompt_name, normalize_query(query)))
+
+    def put_vector(self, query: str, prompt_name: str, vector: Any) -> None:
+        self.vectors.put((prompt_name, normalize_query(query)), vector)
+
+    # ------------------ L2: search results ------------------
+    def get_version(self, collection: str) -> Optional[str]:
+        return self._versions.get(collection)
+
+    def put_version(self, collection: str, version: str) -> None:
+        self._versions.put(collection, version)
+
+    def result_key(self, collection: str, query: str, top_k: int, filters: Hashable = None,
+                   version: Optional[str] = None) -> Optional[tuple]:
+        """Key of one search request; None when results are not cached.
+
+        Build it once per request, before searching, and use it for both get_results and
+        put_results: the key captures the collection's generation at lookup time, so hits
+        computed across an invalidate() are stored under the old generation and never served.
+        """
+        if not self.cache_results:
+            return None
+        with self._lock:
+            generation = self._generations.get(collection, 0)
+        return collection, version, generation, normalize_query(query), top_k, filters
+
+    def get_results(self, key: Optional[tuple]) -> Any:
+        return self.results.get(key) if key is not None else None
+
+    def put_results(self, key: Optional[tuple], results: Any) -> None:
+        if key is not None:
+            self.results.put(key, results)
+
+    def invalidate(self, collection: str) -> None:
+        """Drop cached results of a collection (call after it was re-indexed)."""
+        with self._lock:
+            self._generations[collection] = self._generations.get(collection, 0) + 1
+        self._versions.pop(collection)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"query_vectors": self.vectors.stats(), "search_results": self.results.stats()}
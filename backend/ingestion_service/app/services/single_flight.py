@@ -0,0 +1,42 @@
+import threading
+from typing import Dict, Generic, List, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """In-process registry of running work by key; duplicates wait for the first one.
+
+    join() makes the caller the leader of a key, or attaches it as a follower of the
+    running leader. The leader calls finish() when done and hands its result to the
+    followers it gets back; a later join() of the key starts a new flight.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> followers of the running leader
+        self._flights: Dict[str, List[T]] = {}
+        self.coalesced = 0
+
+    def join(self, key: str, item: T) -> bool:
+        """True: the caller leads the key and must call finish(); False: it follows."""
+        with self._lock:
+            followers = self._flights.get(key)
+            if followers is None:
+                self._flights[key] = []
+                return True
+            followers.append(item)
+            self.coalesced += 1
+            return False
+
+    def finish(self, key: str) -> List[T]:
+        with self._lock:
+            return self._flights.pop(key, [])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "waiting": sum(len(f) for f in self._flights.values()),
+                "coalesced": self.coalesced,
+            }
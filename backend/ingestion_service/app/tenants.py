@@ -0,0 +1,143 @@
+"""Tooling for the shared (multi-tenant) collection mode.
+
+    python -m app.tenants migrate [--drop-source] [SLUG ...]
+    python -m app.tenants stats [SLUG ...]
+    python -m app.tenants delete SLUG [SLUG ...]
+
+migrate moves per-repository collections (their current version) into the shared
+collection(s) of INGEST_SHARED_COLLECTION / INGEST_SHARED_COLLECTION_SHARDS, one tenant
+per repository slug. Vectors and payloads are copied as stored; nothing is re-embedded
+and symbol tables stay valid. Without slugs every per-repository collection is moved.
+Re-running is safe (point ids are deterministic). With --drop-source the source
+collection and its versions are deleted once the tenant holds all of its points.
+Requires INGEST_COLLECTION_MODE=shared.
+
+stats prints the point counts of the given repositories, or of every tenant of the
+shared collections (every per-repository collection in per_repo mode).
+
+delete removes a repository's points and symbol table. Search results cached by a
+running API expire after INGEST_SEARCH_RESULT_TTL_S.
+"""
+import argparse
+import json
+import logging
+import sys
+
+from app.api.deps import (
+    get_collection_versions,
+    get_qdrant,
+    get_qdrant_registry,
+    get_symbol_index,
+    use_collection_versions,
+)
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.infra.qdrant_tenants import TENANT_KEY, shared_collections
+from app.infra.qdrant_versions import CollectionVersions
+from app.services.ingest_service import IngestService
+
+logger = logging.getLogger("ingestion_service.tenants")
+
+# upper bound of tenants listed per shared collection
+_MAX_TENANTS = 1_000_000
+
+
+def _client():
+    return get_qdrant_registry().get(str(settings.qdrant_url), settings.qdrant_api_key)
+
+
+def _admin() -> IngestService:
+    # only the index bookkeeping of the service is used: no model, git or repos_service
+    return IngestService(
+        git=None, treesitter=None, embedder=None, qdrant_factory=get_qdrant, repos_client=None,
+        versions_factory=get_collection_versions if use_collection_versions() else None,
+        symbol_index=get_symbol_index(),
+    )
+
+
+def _per_repo_names() -> list[str]:
+    shared = set(shared_collections(settings.shared_collection, settings.shared_collection_shards))
+    return [n for n in CollectionVersions.logical_names(_client()) if n not in shared]
+
+
+def migrate(slug: str, drop_source: bool) -> bool:
+    client = _client()
+    versions = get_collection_versions(slug)
+    source = versions.current()
+    if source is None:
+        logger.warning("%s: no per-repository collection to migrate", slug)
+        return False
+
+    target = get_qdrant(slug)
+    target.init_collection(settings.vector_size)
+    try:
+        copied = target.copy_points(source)
+        target.finish()
+    finally:
+        target.close()
+
+    expected = client.count(source, exact=True).count
+    stored = target.stats()["points"]
+    if stored < expected:
+        logger.error("%s: tenant holds %d of %d points of '%s'; source kept", slug, stored, expected, source)
+        return False
+    logger.info("%s: copied %d points from '%s' to '%s'", slug, copied, source, target.collection_name)
+    if drop_source:
+        versions.delete_all()
+    return True
+
+
+def tenant_stats() -> list[dict]:
+    client = _client()
+    rows = []
+    for name in shared_collections(settings.shared_collection, settings.shared_collection_shards):
+        if not client.collection_exists(name):
+            continue
+        facets = client.facet(name, key=TENANT_KEY, limit=_MAX_TENANTS, exact=True)
+        rows.extend({"collection": name, "tenant": hit.value, "points": hit.count} for hit in facets.hits)
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.tenants", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    p_migrate = commands.add_parser("migrate", help="move per-repository collections into the shared collection")
+    p_migrate.add_argument("slugs", nargs="*")
+    p_migrate.add_argument("--drop-source", action="store_true")
+    p_stats = commands.add_parser("stats", help="point counts per repository")
+    p_stats.add_argument("slugs", nargs="*")
+    p_delete = commands.add_parser("delete", help="delete the index of repositories")
+    p_delete.add_argument("slugs", nargs="+")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+
+    if args.command == "migrate":
+        if settings.collection_mode != "shared":
+            parser.error("migrate needs INGEST_COLLECTION_MODE=shared")
+        slugs = args.slugs or _per_repo_names()
+        failed = [slug for slug in slugs if not migrate(slug, args.drop_source)]
+        logger.info("migrated %d of %d repositories", len(slugs) - len(failed), len(slugs))
+        return 1 if failed else 0
+
+    if args.command == "stats":
+        if args.slugs:
+            admin = _admin()
+            rows = [{"slug": slug, **admin.index_stats(slug)} for slug in args.slugs]
+        elif settings.collection_mode == "shared":
+            rows = tenant_stats()
+        else:
+            admin = _admin()
+            rows = [{"slug": name, **admin.index_stats(name)} for name in _per_repo_names()]
+        for row in rows:
+            print(json.dumps(row, default=str))
+        return 0
+
+    admin = _admin()
+    for slug in args.slugs:
+        admin.delete_index(slug)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Ingestion worker: claims jobs from the durable queue in repos_service and runs them.
+
+    python -m app.worker
+
+Runs independently of the HTTP tier (INGEST_JOB_QUEUE=durable); start as many as needed.
+Each claimed job is leased to this worker and the lease is renewed by a heartbeat while
+the job runs. A worker that dies stops heartbeating, so its job is requeued once the
+lease expires.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+from typing import Any
+
+import requests
+
+from app.api.deps import get_ingest_service, get_plan_pool, get_repos_client
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.infra.repos_client import ReposServiceClient
+from app.services.ingest_service import IngestJob, IngestService
+from app.services.job_checkpoint import JobCheckpoint
+
+logger = logging.getLogger("ingestion_service.worker")
+
+
+def _is_lease_lost(e: BaseException) -> bool:
+    # repos_service answers 409 when the caller no longer holds the job's lease
+    return isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code == 409
+
+
+class _Heartbeat:
+    """Renews a job's lease in the background until stopped.
+
+    `lost` is set once repos_service rejects a renewal: the lease expired and the job
+    may already run on another worker, so the running pipeline is cancelled.
+    """
+
+    def __init__(self, repos: ReposServiceClient, job_id: int, worker_id: str, lease_s: int, interval_s: float):
+        self._repos = repos
+        self._job_id = job_id
+        self._worker_id = worker_id
+        self._lease_s = lease_s
+        self._interval_s = interval_s
+        self._stopped = threading.Event()
+        self.lost = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval_s):
+            try:
+                self._repos.heartbeat_ingest_job(self._job_id, self._worker_id, self._lease_s)
+            except Exception as e:
+                if _is_lease_lost(e):
+                    logger.error("Job %d: lease lost, cancelling the job", self._job_id)
+                    self.lost.set()
+                    return
+                # transient: the job keeps running and the next renewal may succeed
+                logger.warning("Job %d: heartbeat failed: %s", self._job_id, e)
+
+
+class IngestWorker:
+    def __init__(self, service: IngestService, repos: ReposServiceClient, worker_id: str,
+                 lease_s: int, heartbeat_s: float, poll_s: float):
+        if heartbeat_s >= lease_s:
+            raise ValueError("heartbeat interval must be shorter than the lease")
+        self.service = service
+        self.repos = repos
+        self.worker_id = worker_id
+        self.lease_s = lease_s
+        self.heartbeat_s = heartbeat_s
+        self.poll_s = poll_s
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        """Stop after the current job."""
+        self._stopped.set()
+
+    def run_forever(self) -> None:
+        logger.info("Worker %s: polling for jobs", self.worker_id)
+        while not self._stopped.is_set():
+            try:
+                claimed = self.repos.claim_ingest_job(self.worker_id, self.lease_s)
+            except Exception as e:
+                logger.warning("Worker %s: claim failed: %s", self.worker_id, e)
+                claimed = None
+            if claimed is None:
+                self._stopped.wait(self.poll_s)
+                continue
+            self.run_one(claimed)
+        logger.info("Worker %s: stopped", self.worker_id)
+
+    def run_one(self, claimed: dict[str, Any]) -> None:
+        job_id = claimed["id"]
+        job = IngestJob.from_payload(claimed["payload"])
+        logger.info("Job %d: started (%s, attempt %d/%d)",
+                    job_id, job.repo_url, claimed["attempts"], claimed["max_attempts"])
+
+        # progress of earlier attempts comes with the claimed job
+        checkpoint = JobCheckpoint(self.repos, job_id, self.worker_id, claimed.get("checkpoint"))
+        heartbeat = _Heartbeat(self.repos, job_id, self.worker_id, self.lease_s, self.heartbeat_s)
+        heartbeat.start()
+        try:
+            total = self.service.execute_ingest_job(job, checkpoint, cancel=heartbeat.lost)
+        except Exception as e:
+            heartbeat.stop()
+            if heartbeat.lost.is_set() or _is_lease_lost(e):
+                # the job belongs to another worker now: neither the job nor its state is ours to update
+                logger.warning("Job %d: abandoned after losing its lease", job_id)
+                return
+            logger.exception("Job %d: failed", job_id)
+            self._fail(job_id, job, str(e))
+            return
+        heartbeat.stop()
+
+        try:
+            self.repos.complete_ingest_job(job_id, self.worker_id)
+            logger.info("Job %d: done (%d vectors)", job_id, total)
+        except Exception as e:
+            logger.warning("Job %d: could not mark complete: %s", job_id, e)
+
+    def _fail(self, job_id: int, job: IngestJob, error: str) -> None:
+        retrying = True
+        try:
+            released = self.repos.fail_ingest_job(job_id, self.worker_id, error)
+            retrying = released["status"] == "queued"
+        except Exception as e:
+            # lease expiry will requeue the job
+            logger.warning("Job %d: could not release: %s", job_id, e)
+        try:
+            self.service.mark_job_failed(job, error, retrying=retrying)
+        except Exception as e:
+            logger.warning("Job %d: could not update index state: %s", job_id, e)
+
+
+def main() -> None:
+    setup_logging()
+
+    base_id = settings.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    service = get_ingest_service()
+    workers = [
+        IngestWorker(
+            service=service,
+            repos=get_repos_client(),
+            worker_id=base_id if settings.worker_concurrency == 1 else f"{base_id}-{i}",
+            lease_s=settings.job_lease_s,
+            heartbeat_s=settings.job_heartbeat_s,
+            poll_s=settings.job_poll_s,
+        )
+        for i in range(settings.worker_concurrency)
+    ]
+
+    def _shutdown(signum, frame) -> None:
+        logger.info("Received signal %d, finishing current jobs...", signum)
+        for w in workers:
+            w.stop()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    threads = [
+        threading.Thread(target=w.run_forever, name=f"worker-{i}")
+        for i, w in enumerate(workers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    pool = get_plan_pool()
+    if pool is not None:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import sqlite3
+
+from app.pipeline.chunk_store import ChunkStore
+
+
+def _store(tmp_path, **kwargs):
+    return ChunkStore(tmp_path, prune_grace_s=0, **kwargs)
+
+
+def test_prune_keeps_referenced_records(tmp_path):
+    store = _store(tmp_path)
+    store.put("h1", b"one", {})
+    store.put("h2", b"two", {})
+    store.set_refs("c", {"a.go": "h1", "b.go": "h2"})
+    assert store.prune() == 0
+    assert store.read_many([("h1", 0, 3), ("h2", 0, 3)]) == ["one", "two"]
+    store.close()
+
+
+def test_incremental_refs_release_replaced_files(tmp_path):
+    store = _store(tmp_path)
+    store.put("h1", b"one", {})
+    store.put("h2", b"two", {})
+    store.set_refs("c", {"a.go": "h1", "b.go": "h2"})
+    # a.go modified, b.go deleted
+    store.put("h3", b"three", {})
+    store.set_refs("c", {"a.go": "h3"}, replaced_paths={"a.go", "b.go"})
+    assert store.prune() == 2
+    assert store.read_many([("h1", 0, 3), ("h2", 0, 3), ("h3", 0, 5)]) == [None, None, "three"]
+    store.close()
+
+
+def test_records_shared_by_collections_outlive_one_of_them(tmp_path):
+    store = _store(tmp_path)
+    store.put("h1", b"one", {})
+    store.set_refs("c1", {"a.go": "h1"})
+    store.set_refs("c2", {"vendor/a.go": "h1"})
+    store.drop_refs("c1")
+    assert store.prune() == 0
+    store.drop_refs("c2")
+    assert store.prune() == 1
+    store.close()
+
+
+def test_prune_respects_grace_period(tmp_path):
+    store = ChunkStore(tmp_path, prune_grace_s=3600)
+    store.put("h1", b"one", {})  # e.g. written by an ingest that is still running
+    assert store.prune() == 0
+    store.close()
+
+
+def test_prune_removes_empty_segments(tmp_path):
+    writer = _store(tmp_path, segment_max_bytes=4)
+    writer.put("h1", b"one", {})
+    writer.put("h2", b"two", {})  # rolls over to a second segment
+    writer.set_refs("c", {"b.go": "h2"})
+    assert len(list((tmp_path / "segments").glob("*.seg"))) == 2
+    assert writer.prune() == 1
+    assert len(list((tmp_path / "segments").glob("*.seg"))) == 1
+    writer.close()
+
+    # another process prunes the writer's open segment: the next put opens a new one
+    writer = _store(tmp_path)
+    writer.put("h3", b"three", {})
+    other = _store(tmp_path)
+    assert other.prune() == 1
+    writer.put("h4", b"four", {})
+    assert writer.read_many([("h4", 0, 4)]) == ["four"]
+    writer.close()
+    other.close()
+
+
+def test_records_of_legacy_stores_are_not_pruned(tmp_path):
+    conn = sqlite3.connect(tmp_path / "index.sqlite")
+    conn.execute(
+        "CREATE TABLE files (key TEXT PRIMARY KEY, segment TEXT NOT NULL, offset INTEGER NOT NULL,"
+        " length INTEGER NOT NULL, meta TEXT NOT NULL) WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO files VALUES ('h1', 's', 0, 3, '{}')")
+    conn.commit()
+    conn.close()
+    store = _store(tmp_path)
+    assert store.prune() == 0
+    store.close()
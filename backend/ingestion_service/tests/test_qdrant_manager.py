@@ -0,0 +1,94 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.infra.qdrant_client import QdrantManager
+
+
+class StubClient:
+    """Records upserts; optionally fails every wait=False (background) upsert."""
+
+    def __init__(self, fail_background: bool = False):
+        self.fail_background = fail_background
+        self.upserts = []
+        self._lock = threading.Lock()
+
+    def upsert(self, collection_name, points, wait):
+        if self.fail_background and not wait:
+            raise ValueError("rejected")
+        with self._lock:
+            self.upserts.append((len(points.ids), wait))
+
+
+def _manager(client, batch_size=64, upload_workers=2):
+    return QdrantManager(None, None, "c", batch_size=batch_size, client=client,
+                         upload_workers=upload_workers, max_retries=0)
+
+
+def _add(mgr, n, start=0):
+    keys = [("f", i) for i in range(start, start + n)]
+    mgr.add_vectors(keys, np.ones((n, 4), dtype=np.float32), [{} for _ in keys])
+
+
+def test_finish_uploads_job_smaller_than_one_batch():
+    client = StubClient()
+    mgr = _manager(client)
+    _add(mgr, 10)
+    mgr.finish()
+    mgr.close()
+    assert client.upserts == [(10, True)]
+    assert mgr.total_upserted == 10
+
+
+def test_finish_after_flush_waits_for_background_upload():
+    client = StubClient()
+    mgr = _manager(client)
+    _add(mgr, 10)
+    mgr.flush()  # hands the partial batch to the background uploader
+    mgr.finish()
+    mgr.close()
+    assert client.upserts[0] == (10, False)
+    # barrier: the last batch again, with wait=True
+    assert client.upserts[-1] == (10, True)
+    assert mgr.total_upserted == 10
+
+
+def test_finish_raises_failed_background_upload():
+    mgr = _manager(StubClient(fail_background=True), batch_size=4)
+    with pytest.raises(ValueError):
+        # a dispatch after the first failed upload already raises it
+        _add(mgr, 10)
+        mgr.finish()
+    mgr.close()
+
+
+def test_close_releases_slots_of_cancelled_uploads():
+    release = threading.Event()
+
+    class BlockingClient(StubClient):
+        def upsert(self, collection_name, points, wait):
+            release.wait()
+            super().upsert(collection_name, points, wait)
+
+    mgr = QdrantManager(None, None, "c", batch_size=4, client=BlockingClient(),
+                        upload_workers=1, max_in_flight=2, max_retries=0)
+    _add(mgr, 8)  # one upload running (blocked), one queued
+    queued = mgr._futures[-1]
+    closer = threading.Thread(target=mgr.close)
+    closer.start()
+    while not queued.cancelled():
+        closer.join(0.01)
+    release.set()
+    closer.join()
+    assert mgr._in_flight.acquire(blocking=False)
+    assert mgr._in_flight.acquire(blocking=False)
+
+
+def test_finish_without_upload_workers():
+    client = StubClient()
+    mgr = _manager(client, batch_size=4, upload_workers=0)
+    _add(mgr, 10)
+    mgr.finish()
+    assert client.upserts == [(4, True), (4, True), (2, True)]
+    assert mgr.total_upserted == 10
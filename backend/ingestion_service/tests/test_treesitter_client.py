@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import threading
+
+from app.infra.treesitter_client import TreeSitterManager
+
+
+GO_SRC = b"package main\n\nfunc A() {}\n\nfunc B() int { return 1 }\n"
+
+
+def test_parser_is_reused_within_a_thread():
+    mgr = TreeSitterManager()
+    assert mgr.get_parser_for_path(Path("a.go")) is mgr.get_parser_for_path(Path("b.go"))
+
+
+def test_threads_get_their_own_parser():
+    mgr = TreeSitterManager()
+    barrier = threading.Barrier(4)
+
+    def parser_id(_):
+        barrier.wait()
+        return id(mgr.get_parser_for_path(Path("a.go")))
+
+    with ThreadPoolExecutor(4) as pool:
+        ids = list(pool.map(parser_id, range(4)))
+    assert len(set(ids)) == 4
+
+
+def test_concurrent_extract():
+    mgr = TreeSitterManager()
+
+    def extract(_):
+        ext = mgr.extract(GO_SRC, Path("main.go"))
+        return ext.package, [ext.name(e) for e in ext.entities]
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(extract, range(64)))
+    assert results == [("main", ["A", "B"])] * 64
@@ -0,0 +1,74 @@
+"""ingest jobs queue
+
+Revision ID: 5c1e0a7d2b94
+Revises: db86ee148162
+Create Date: 2026-10-18 10:12:40.118093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ENUM as PgEnum, JSONB
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e0a7d2b94'
+down_revision: Union[str, Sequence[str], None] = 'db86ee148162'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DB_SCHEMA = "repos"
+
+job_status_enum = PgEnum(
+    'queued', 'running', 'done', 'failed',
+    name='ingest_job_status',
+    schema=DB_SCHEMA,
+    create_type=False,
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.text(f"""
+    DO $$
+    BEGIN
+        CREATE TYPE "{DB_SCHEMA}".ingest_job_status AS ENUM ('queued','running','done','failed');
+    EXCEPTION
+        WHEN duplicate_object THEN null;
+    END $$;
+    """))
+
+    op.create_table('ingest_jobs',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('repository_id', sa.BigInteger(), nullable=False),
+    sa.Column('state_id', sa.BigInteger(), nullable=False),
+    sa.Column('payload', JSONB(), nullable=False),
+    sa.Column('status', job_status_enum, nullable=False, server_default='queued'),
+    sa.Column('attempts', sa.Integer(), nullable=False, server_default="0"),
+    sa.Column('max_attempts', sa.Integer(), nullable=False, server_default="3"),
+    sa.Column('run_after', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('lease_owner', sa.Text(), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    schema=DB_SCHEMA
+    )
+
+    op.create_index("ix_ingest_jobs_claim", "ingest_jobs", ["status", "run_after"], schema=DB_SCHEMA)
+    op.create_index(
+        "uq_ingest_jobs_active_state", "ingest_jobs", ["state_id"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+        schema=DB_SCHEMA,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ingest_jobs', schema=DB_SCHEMA)
+    op.execute(f'DROP TYPE IF EXISTS {DB_SCHEMA}.ingest_job_status')
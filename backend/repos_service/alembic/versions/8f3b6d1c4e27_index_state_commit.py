@@ -0,0 +1,30 @@
+"""repo index state indexed commit
+
+Revision ID: 8f3b6d1c4e27
+Revises: 5c1e0a7d2b94
+Create Date: 2026-10-18 13:41:07.552310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3b6d1c4e27'
+down_revision: Union[str, Sequence[str], None] = '5c1e0a7d2b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DB_SCHEMA = "repos"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('repo_index_states', sa.Column('indexed_commit', sa.Text(), nullable=True), schema=DB_SCHEMA)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('repo_index_states', 'indexed_commit', schema=DB_SCHEMA)
@@ -0,0 +1,32 @@
+"""repo index state indexed branch
+
+Revision ID: a3c8e5f17b42
+Revises: e4a9c3f8d612
+Create Date: 2026-10-18 21:05:12.418730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c8e5f17b42'
+down_revision: Union[str, Sequence[str], None] = 'e4a9c3f8d612'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DB_SCHEMA = "repos"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('repo_index_states', sa.Column('indexed_branch', sa.Text(), nullable=True), schema=DB_SCHEMA)
+    # until now `branch` was written together with indexed_commit and recorded its branch
+    op.execute(f"UPDATE {DB_SCHEMA}.repo_index_states SET indexed_branch = branch WHERE indexed_commit IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('repo_index_states', 'indexed_branch', schema=DB_SCHEMA)
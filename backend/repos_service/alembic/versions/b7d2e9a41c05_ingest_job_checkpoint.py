@@ -0,0 +1,31 @@
+"""ingest job checkpoint
+
+Revision ID: b7d2e9a41c05
+Revises: 8f3b6d1c4e27
+Create Date: 2026-10-18 15:02:31.904116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e9a41c05'
+down_revision: Union[str, Sequence[str], None] = '8f3b6d1c4e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DB_SCHEMA = "repos"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ingest_jobs', sa.Column('checkpoint', JSONB(), nullable=True), schema=DB_SCHEMA)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('ingest_jobs', 'checkpoint', schema=DB_SCHEMA)
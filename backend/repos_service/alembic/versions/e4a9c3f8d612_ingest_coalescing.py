@@ -0,0 +1,41 @@
+"""ingest job coalescing
+
+Revision ID: e4a9c3f8d612
+Revises: b7d2e9a41c05
+Create Date: 2026-10-18 16:20:48.337915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c3f8d612'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e9a41c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DB_SCHEMA = "repos"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ingest_jobs', sa.Column('coalesce_key', sa.Text(), nullable=True), schema=DB_SCHEMA)
+    op.create_index(
+        "uq_ingest_jobs_active_coalesce_key", "ingest_jobs", ["coalesce_key"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+        schema=DB_SCHEMA,
+    )
+    op.add_column('repo_index_states', sa.Column('following_job_id', sa.BigInteger(), nullable=True), schema=DB_SCHEMA)
+    op.create_index("ix_repo_index_states_following", "repo_index_states", ["following_job_id"], schema=DB_SCHEMA)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_repo_index_states_following", table_name="repo_index_states", schema=DB_SCHEMA)
+    op.drop_column('repo_index_states', 'following_job_id', schema=DB_SCHEMA)
+    op.drop_index("uq_ingest_jobs_active_coalesce_key", table_name="ingest_jobs", schema=DB_SCHEMA)
+    op.drop_column('ingest_jobs', 'coalesce_key', schema=DB_SCHEMA)
@@ -4,8 +4,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.db.repository.repos import ReposRepository
 from app.db.repository.repo_index_states import RepoIndexStatesRepository
+from app.db.repository.ingest_jobs import IngestJobsRepository
 from app.services.repos_service import ReposService
 from app.services.repo_index_service import RepoIndexService
+from app.services.ingest_jobs_service import IngestJobsService
 
 
 def get_repos_service(
@@ -18,3 +20,9 @@ def get_repo_index_service(
     db: AsyncSession = Depends(get_db),
 ) -> RepoIndexService:
     return RepoIndexService(RepoIndexStatesRepository(db))
+
+
+def get_ingest_jobs_service(
+    db: AsyncSession = Depends(get_db),
+) -> IngestJobsService:
+    return IngestJobsService(IngestJobsRepository(db), RepoIndexStatesRepository(db))
@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from app.api.deps import get_ingest_jobs_service
+from app.schemas.ingest_jobs import (
+    IngestJobCheckpointIn,
+    IngestJobCheckpointOut,
+    IngestJobClaimIn,
+    IngestJobCompleteIn,
+    IngestJobCreateIn,
+    IngestJobFailIn,
+    IngestJobHeartbeatIn,
+    IngestJobOut,
+)
+from app.services.ingest_jobs_service import IngestJobsService, JobLeaseError
+
+router = APIRouter(prefix="/ingest-jobs", tags=["ingest-jobs"])
+
+
+@router.post("", response_model=IngestJobOut, status_code=201)
+async def enqueue_job(
+    payload: IngestJobCreateIn,
+    service: IngestJobsService = Depends(get_ingest_jobs_service),
+):
+    return await service.enqueue(**payload.model_dump())
+
+
+@router.post("/claim", response_model=IngestJobOut, responses={204: {"description": "No job available"}})
+async def claim_job(
+    payload: IngestJobClaimIn,
+    service: IngestJobsService = Depends(get_ingest_jobs_service),
+):
+    job = await service.claim(worker_id=payload.worker_id, lease_s=payload.lease_s)
+    if job is None:
+        return Response(status_code=204)
+    return job
+
+
+@router.get("/{job_id}", response_model=IngestJobOut)
+async def get_job(
+    job_id: int,
+    service: IngestJobsService = Depends(get_ingest_jobs_service),
+):
+    try:
+        return await service.get_job(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/{job_id}/heartbeat", response_model=IngestJobOut)
+async def heartbeat_job(
+    job_id: int,
+    payload: IngestJobHeartbeatIn,
+    service: IngestJobsService = Depends(get_ingest_jobs_service),
+):
+    try:
+        return await service.heartbeat(job_id, worker_id=payload.worker_id, lease_s=payload.lease_s)
+    except JobLeaseError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/{job_id}/checkpoint", response_model=IngestJobCheckpointOut)
+async def checkpoint_job(
+    job_id: int,
+    payload: IngestJobCheckpointIn,
+    service: IngestJobsService = Depends(get_ingest_jobs_service),
+):
+    try:
+        job = await service.checkpoint(
+            job_id, worker_id=payload.worker_id, meta=payload.meta, files=payload.files, reset=payload.reset,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except JobLeaseError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return IngestJobCheckpointOut(id=job.id, files=len(job.checkpoint["files"]))
+
+
+@router.post("/{job_id}/complete", response_model=IngestJobOut)
+async def complete_job(
+    job_id: int,
+    payload: IngestJobCompleteIn,
+    service: IngestJobsService = Depends(get_ingest_jobs_service),
+):
+    try:
+        return await service.complete(job_id, worker_id=payload.worker_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except JobLeaseError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/{job_id}/fail", response_model=IngestJobOut)
+async def fail_job(
+    job_id: int,
+    payload: IngestJobFailIn,
+    service: IngestJobsService = Depends(get_ingest_jobs_service),
+):
+    try:
+        return await service.fail(job_id, worker_id=payload.worker_id, error=payload.error, retryable=payload.retryable)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except JobLeaseError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -25,6 +25,17 @@ async def get_state_by_user_repo(
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@router.get("/latest-indexed", response_model=RepoIndexStateOut)
+async def get_latest_indexed_state(
+    repository_id: int = Query(..., ge=1),
+    service: RepoIndexService = Depends(get_repo_index_service),
+):
+    # the most recent finished index of the repository (of any user): what its collection holds
+    try:
+        return await service.get_latest_indexed(repository_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 @router.get("/{state_id}", response_model=RepoIndexStateOut, name="get_repo_status")
 async def get_repo_status(
     state_id: int,
@@ -1,5 +1,5 @@
-from sqlalchemy import BigInteger, DateTime, Integer, Text, UniqueConstraint, func
-from sqlalchemy.dialects.postgresql import ENUM as PgEnum
+from sqlalchemy import BigInteger, DateTime, Index, Integer, Text, UniqueConstraint, func, text
+from sqlalchemy.dialects.postgresql import ENUM as PgEnum, JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from app.core.config import settings
 
@@ -14,6 +14,12 @@ RepoIndexStatus = PgEnum(
     schema=settings.db_schema,
 )
 
+IngestJobStatus = PgEnum(
+    "queued", "running", "done", "failed",
+    name="ingest_job_status",
+    schema=settings.db_schema,
+)
+
 
 class Repository(Base):
     __tablename__ = "repositories"
@@ -33,6 +39,7 @@ class RepoIndexState(Base):
     __tablename__ = "repo_index_states"
     __table_args__ = (
         UniqueConstraint("user_id", "repository_id", name="uq_repo_index_state"),
+        Index("ix_repo_index_states_following", "following_job_id"),
         {"schema": settings.db_schema},
     )
 
@@ -47,6 +54,58 @@ class RepoIndexState(Base):
     vectors_upserted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # commit the collection reflects; re-ingests only index the diff against it
+    indexed_commit: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # branch indexed_commit was indexed from (None: the default branch); `branch` is the one
+    # this state asked for, which differs when it reused another state's index of the commit
+    indexed_branch: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # set while this state waits for another state's job indexing the same (slug, branch, commit)
+    following_job_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     indexed_at: Mapped[object | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[object] = mapped_column(DateTime, nullable=False, server_default=func.now())
     updated_at: Mapped[object] = mapped_column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+
+class IngestJob(Base):
+    """Durable ingest job; claimed by ingestion workers with SELECT ... FOR UPDATE SKIP LOCKED."""
+
+    __tablename__ = "ingest_jobs"
+    __table_args__ = (
+        Index("ix_ingest_jobs_claim", "status", "run_after"),
+        # at most one live job per index state
+        Index(
+            "uq_ingest_jobs_active_state", "state_id",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        # single flight: at most one live job per (slug, branch, commit)
+        Index(
+            "uq_ingest_jobs_active_coalesce_key", "coalesce_key",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        {"schema": settings.db_schema},
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    repository_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    state_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    coalesce_key: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # job description owned by the ingestion service (repo url, branch, collection, ...)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+
+    status: Mapped[str] = mapped_column(IngestJobStatus, nullable=False, server_default="queued")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    run_after: Mapped[object] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    lease_owner: Mapped[str | None] = mapped_column(Text, nullable=True)
+    lease_expires_at: Mapped[object | None] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # progress kept across attempts: {"meta": {...}, "files": [completed paths]}
+    checkpoint: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+
+    started_at: Mapped[object | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[object | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[object] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    updated_at: Mapped[object] = mapped_column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.db.models import IngestJob
+
+
+class IngestJobsRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_id(self, job_id: int) -> IngestJob | None:
+        res = await self.db.execute(
+            select(IngestJob).where(IngestJob.id == job_id)
+        )
+        return res.scalar_one_or_none()
+
+    async def get_active_for_state(self, state_id: int) -> IngestJob | None:
+        res = await self.db.execute(
+            select(IngestJob).where(
+                IngestJob.state_id == state_id,
+                IngestJob.status.in_(("queued", "running")),
+            )
+        )
+        return res.scalar_one_or_none()
+
+    async def get_active_for_key(self, coalesce_key: str) -> IngestJob | None:
+        # locked, so the job cannot finish between a follower attaching and committing
+        res = await self.db.execute(
+            select(IngestJob)
+            .where(
+                IngestJob.coalesce_key == coalesce_key,
+                IngestJob.status.in_(("queued", "running")),
+            )
+            .with_for_update()
+        )
+        return res.scalar_one_or_none()
+
+    async def create(self, job: IngestJob) -> IngestJob:
+        self.db.add(job)
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def save(self, job: IngestJob) -> IngestJob:
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def rollback(self) -> None:
+        await self.db.rollback()
+
+    async def release_expired_leases(self, error: str) -> list[tuple[int, int]]:
+        """Requeue running jobs whose worker stopped heartbeating; fail those out of attempts.
+
+        Returns (job id, state id) of the jobs that were failed for good.
+        """
+        expired = (IngestJob.status == "running") & (IngestJob.lease_expires_at < func.now())
+        failed = await self.db.execute(
+            update(IngestJob)
+            .where(expired, IngestJob.attempts >= IngestJob.max_attempts)
+            .values(status="failed", lease_owner=None, lease_expires_at=None,
+                    last_error=error, finished_at=func.now())
+            .returning(IngestJob.id, IngestJob.state_id)
+        )
+        failed_jobs = [(job_id, state_id) for job_id, state_id in failed.all()]
+        await self.db.execute(
+            update(IngestJob)
+            .where(expired)
+            .values(status="queued", lease_owner=None, lease_expires_at=None,
+                    last_error=error, run_after=func.now())
+        )
+        await self.db.commit()
+        return failed_jobs
+
+    async def claim(self, worker_id: str, lease_s: int) -> IngestJob | None:
+        """Lease the next runnable job to `worker_id`.
+
+        Fair share: jobs of users with fewer running jobs come first, then oldest first.
+        SKIP LOCKED lets concurrent workers claim different rows without blocking.
+        """
+        running = aliased(IngestJob)
+        user_running = (
+            select(func.count())
+            .where(running.user_id == IngestJob.user_id, running.status == "running")
+            .scalar_subquery()
+        )
+        res = await self.db.execute(
+            select(IngestJob)
+            .where(IngestJob.status == "queued", IngestJob.run_after <= func.now())
+            .order_by(user_running, IngestJob.run_after, IngestJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True, of=IngestJob)
+        )
+        job = res.scalar_one_or_none()
+        if job is None:
+            await self.db.rollback()
+            return None
+
+        job.status = "running"
+        job.attempts += 1
+        job.lease_owner = worker_id
+        job.lease_expires_at = func.now() + timedelta(seconds=lease_s)
+        job.started_at = func.now()
+        return await self.save(job)
+
+    async def renew_lease(self, job_id: int, worker_id: str, lease_s: int) -> IngestJob | None:
+        res = await self.db.execute(
+            update(IngestJob)
+            .where(
+                IngestJob.id == job_id,
+                IngestJob.status == "running",
+                IngestJob.lease_owner == worker_id,
+            )
+            .values(lease_expires_at=func.now() + timedelta(seconds=lease_s))
+            .returning(IngestJob)
+        )
+        job = res.scalar_one_or_none()
+        await self.db.commit()
+        return job
@@ -1,4 +1,4 @@
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import RepoIndexState
@@ -33,6 +33,34 @@ class RepoIndexStatesRepository:
         )
         return res.scalar_one_or_none()
 
+    async def get_latest_indexed(self, repository_id: int) -> RepoIndexState | None:
+        # collections are per repository, so the latest finished state tells what it holds
+        res = await self.db.execute(
+            select(RepoIndexState)
+            .where(
+                RepoIndexState.repository_id == repository_id,
+                RepoIndexState.status == "done",
+                RepoIndexState.indexed_commit.is_not(None),
+            )
+            .order_by(RepoIndexState.indexed_at.desc().nulls_last(), RepoIndexState.id.desc())
+            .limit(1)
+        )
+        return res.scalar_one_or_none()
+
+    async def follow(self, state_id: int, job_id: int | None) -> None:
+        """Attach a state to another state's job (None: detach); committed by the caller."""
+        await self.db.execute(
+            update(RepoIndexState)
+            .where(RepoIndexState.id == state_id)
+            .values(following_job_id=job_id, status="queued", last_error=None)
+        )
+
+    async def list_following(self, job_id: int) -> list[RepoIndexState]:
+        res = await self.db.execute(
+            select(RepoIndexState).where(RepoIndexState.following_job_id == job_id)
+        )
+        return list(res.scalars().all())
+
     async def create(self, state: RepoIndexState) -> RepoIndexState:
         self.db.add(state)
         await self.db.commit()
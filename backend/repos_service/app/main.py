@@ -3,6 +3,7 @@ from fastapi import FastAPI
 
 from app.api.routes.repos import router as repos_router
 from app.api.routes.repo_index_states import router as repo_index_states_router
+from app.api.routes.ingest_jobs import router as ingest_jobs_router
 from app.core.config import settings
 
 
@@ -15,6 +16,7 @@ def create_app() -> FastAPI:
 
     app.include_router(repos_router)
     app.include_router(repo_index_states_router)
+    app.include_router(ingest_jobs_router)
     return app
 
 
@@ -0,0 +1,70 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class IngestJobCreateIn(BaseModel):
+    user_id: int
+    repository_id: int
+    state_id: int
+    payload: dict
+    # jobs with the same key (slug, branch, commit) are run once; later states follow the live one
+    coalesce_key: str | None = None
+
+
+class IngestJobClaimIn(BaseModel):
+    worker_id: str
+    lease_s: int | None = None
+
+
+class IngestJobHeartbeatIn(BaseModel):
+    worker_id: str
+    lease_s: int | None = None
+
+
+class IngestJobCompleteIn(BaseModel):
+    worker_id: str
+
+
+class IngestJobFailIn(BaseModel):
+    worker_id: str
+    error: str
+    retryable: bool = True
+
+
+class IngestJobCheckpointIn(BaseModel):
+    worker_id: str
+    # merged into the stored meta (replaces it with reset)
+    meta: dict | None = None
+    # paths completed since the previous checkpoint
+    files: list[str] = []
+    # start a new checkpoint: drop the stored meta and files
+    reset: bool = False
+
+
+class IngestJobCheckpointOut(BaseModel):
+    id: int
+    files: int
+
+
+class IngestJobOut(BaseModel):
+    id: int
+    user_id: int
+    repository_id: int
+    state_id: int
+    coalesce_key: str | None
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    lease_owner: str | None
+    lease_expires_at: datetime | None
+    last_error: str | None
+    checkpoint: dict | None
+    started_at: datetime | None
+    finished_at: datetime | None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
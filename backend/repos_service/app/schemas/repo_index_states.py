@@ -12,6 +12,11 @@ class RepoIndexStatePatchIn(BaseModel):
     vectors_upserted: int | None = None
     last_error: str | None = None
     indexed_at: str | None = None  # ISO string, упростим
+    indexed_commit: str | None = None
+    # the state's branch and the branch indexed_commit was indexed from (None: the default
+    # branch); only stored together with indexed_commit
+    branch: str | None = None
+    indexed_branch: str | None = None
 
 class RepoIndexStateOut(BaseModel):
     id: int
@@ -22,6 +27,9 @@ class RepoIndexStateOut(BaseModel):
     status: str
     vectors_upserted: int
     last_error: str | None
+    indexed_commit: str | None
+    indexed_branch: str | None
+    following_job_id: int | None
     indexed_at: datetime | None
     created_at: datetime
     updated_at: datetime
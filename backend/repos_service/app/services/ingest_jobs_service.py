@@ -0,0 +1,155 @@
+from datetime import timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.models import IngestJob
+from app.db.repository.ingest_jobs import IngestJobsRepository
+from app.db.repository.repo_index_states import RepoIndexStatesRepository
+
+
+class JobLeaseError(Exception):
+    """The caller does not hold the job's lease (it expired and the job was requeued or reassigned)."""
+
+
+class IngestJobsService:
+    def __init__(self, repo: IngestJobsRepository, states: RepoIndexStatesRepository):
+        self.repo = repo
+        self.states = states
+
+    async def enqueue(self, user_id: int, repository_id: int, state_id: int, payload: dict,
+                      coalesce_key: str | None = None) -> IngestJob:
+        """Queue a job for the state, or attach the state to a live job with the same key.
+
+        Jobs with the same `coalesce_key` index the same repository commit into the same
+        collection, so only one of them runs at a time: a later state follows the live
+        job and gets its result when it completes (or fails for good).
+        """
+        for _ in range(2):
+            # a state already waiting for / being indexed is not queued twice
+            active = await self.repo.get_active_for_state(state_id)
+            if active:
+                return active
+            if coalesce_key is not None:
+                leader = await self.repo.get_active_for_key(coalesce_key)
+                if leader:
+                    await self.states.follow(state_id, leader.id)
+                    return await self.repo.save(leader)
+
+            # the state runs its own job now; it no longer waits for another one
+            await self.states.follow(state_id, None)
+            created = IngestJob(
+                user_id=user_id,
+                repository_id=repository_id,
+                state_id=state_id,
+                coalesce_key=coalesce_key,
+                payload=payload,
+                status="queued",
+                attempts=0,
+                max_attempts=settings.job_max_attempts,
+            )
+            try:
+                return await self.repo.create(created)
+            except IntegrityError:
+                # a concurrent request queued the same state or key first: attach to it
+                await self.repo.rollback()
+        raise RuntimeError(f"Could not enqueue a job for state {state_id}")
+
+    async def get_job(self, job_id: int) -> IngestJob:
+        job = await self.repo.get_by_id(job_id)
+        if not job:
+            raise ValueError("IngestJob not found")
+        return job
+
+    async def claim(self, worker_id: str, lease_s: int | None) -> IngestJob | None:
+        failed_jobs = await self.repo.release_expired_leases("worker lease expired")
+        for job_id, state_id in failed_jobs:
+            await self._fail_state(state_id, "worker lease expired")
+            await self._settle_followers(job_id, "worker lease expired")
+        return await self.repo.claim(worker_id, lease_s or settings.job_lease_s)
+
+    async def heartbeat(self, job_id: int, worker_id: str, lease_s: int | None) -> IngestJob:
+        job = await self.repo.renew_lease(job_id, worker_id, lease_s or settings.job_lease_s)
+        if not job:
+            raise JobLeaseError(f"Worker {worker_id!r} does not hold the lease of job {job_id}")
+        return job
+
+    async def checkpoint(self, job_id: int, worker_id: str, meta: dict | None, files: list[str], reset: bool) -> IngestJob:
+        """Record progress of a running job; a retried job resumes from it."""
+
+        job = await self._leased(job_id, worker_id)
+        current = {} if reset or not job.checkpoint else job.checkpoint
+        merged_meta = (meta or {}) if reset else {**current.get("meta", {}), **(meta or {})}
+        # a new dict, so the JSONB column is seen as changed
+        job.checkpoint = {"meta": merged_meta, "files": current.get("files", []) + files}
+        return await self.repo.save(job)
+
+    async def complete(self, job_id: int, worker_id: str) -> IngestJob:
+        job = await self._leased(job_id, worker_id)
+        job.status = "done"
+        job.lease_owner = None
+        job.lease_expires_at = None
+        job.last_error = None
+        job.finished_at = func.now()
+        job = await self.repo.save(job)
+        await self._settle_followers(job.id)
+        return job
+
+    async def fail(self, job_id: int, worker_id: str, error: str, retryable: bool) -> IngestJob:
+        """Release a failed job: requeue it with exponential backoff, or fail it for good."""
+
+        job = await self._leased(job_id, worker_id)
+        job.lease_owner = None
+        job.lease_expires_at = None
+        job.last_error = error
+        if retryable and job.attempts < job.max_attempts:
+            backoff = min(settings.job_retry_base_s * 2 ** (job.attempts - 1), settings.job_retry_max_s)
+            job.status = "queued"
+            job.run_after = func.now() + timedelta(seconds=backoff)
+        else:
+            job.status = "failed"
+            job.finished_at = func.now()
+        job = await self.repo.save(job)
+        if job.status == "failed":
+            await self._settle_followers(job.id, error)
+        return job
+
+    async def _leased(self, job_id: int, worker_id: str) -> IngestJob:
+        job = await self.repo.get_by_id(job_id)
+        if not job:
+            raise ValueError("IngestJob not found")
+        if job.status != "running" or job.lease_owner != worker_id:
+            raise JobLeaseError(f"Worker {worker_id!r} does not hold the lease of job {job_id}")
+        return job
+
+    async def _fail_state(self, state_id: int, error: str) -> None:
+        state = await self.states.get_by_id(state_id)
+        if state:
+            state.status = "failed"
+            state.last_error = error
+            await self.states.save(state)
+
+    async def _settle_followers(self, job_id: int, error: str | None = None) -> None:
+        """Give states following a finished job its result: the leader state's, or `error`."""
+
+        followers = await self.states.list_following(job_id)
+        if not followers:
+            return
+        job = await self.repo.get_by_id(job_id)
+        leader = await self.states.get_by_id(job.state_id) if job else None
+        for state in followers:
+            state.following_job_id = None
+            if error is None and leader is not None and leader.status == "done":
+                state.status = "done"
+                state.vectors_upserted = leader.vectors_upserted
+                state.indexed_commit = leader.indexed_commit
+                state.indexed_branch = leader.indexed_branch
+                # the coalesce key includes the branch: the job's is the one the follower asked for
+                state.branch = job.payload.get("branch")
+                state.indexed_at = leader.indexed_at
+                state.last_error = None
+            else:
+                state.status = "failed"
+                state.last_error = error or (leader.last_error if leader is not None else None)
+            await self.states.save(state)
@@ -34,7 +34,9 @@ class RepoIndexService:
         )
         return await self.repo.create(created)
 
-    async def patch(self, state_id: int, status: str | None, vectors_upserted: int | None, last_error: str | None, indexed_at: str | None) -> RepoIndexState:
+    async def patch(self, state_id: int, status: str | None, vectors_upserted: int | None, last_error: str | None, indexed_at: str | None,
+                    indexed_commit: str | None = None, branch: str | None = None,
+                    indexed_branch: str | None = None) -> RepoIndexState:
         state = await self.repo.get_by_id(state_id)
         if not state:
             raise ValueError("RepoIndexState not found")
@@ -48,9 +50,21 @@ class RepoIndexService:
         if indexed_at is not None:
             # ISO string -> datetime
             state.indexed_at = datetime.fromisoformat(indexed_at.replace("Z", "+00:00"))
+        if indexed_commit is not None:
+            # set in the same commit as status 'done', so the SHA never runs ahead of the collection
+            state.indexed_commit = indexed_commit
+            # None is a real value here (the default branch), so both are only written with the commit
+            state.branch = branch
+            state.indexed_branch = indexed_branch
 
         return await self.repo.save(state)
 
+    async def get_latest_indexed(self, repository_id: int) -> RepoIndexState:
+        state = await self.repo.get_latest_indexed(repository_id)
+        if not state:
+            raise ValueError("Repository is not indexed")
+        return state
+
     async def get_by_user_repo(self, *, user_id: int, repository_id: int) -> RepoIndexState:
         state = await self.repo.get_by_user_repo(user_id=user_id, repository_id=repository_id)
         if not state: